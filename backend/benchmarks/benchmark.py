@@ -0,0 +1,53 @@
+"""
+Shared helpers for the ``bench_*`` management commands.
+
+Benchmarks run in-process against a throwaway test database through Django's
+test clients, so they need no running server and never touch real data.
+"""
+import contextlib
+import math
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+
+@contextlib.contextmanager
+def test_database(file_backed=False):
+    """
+    Create a fresh test database for the duration of the block.
+    
+    SQLite test databases live in shared memory by default, which cannot take
+    concurrent writers; pass ``file_backed=True`` to use a temporary file instead.
+    Throttling is off inside the block, since benchmarks replay far more requests
+    per user than the configured rates allow.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    original_test_name = test_settings.get('NAME')
+    temp_dir = None
+    if file_backed and connection.vendor == 'sqlite':
+        temp_dir = tempfile.mkdtemp(prefix='bench-')
+        test_settings['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(THROTTLE_ENABLED=False):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        test_settings['NAME'] = original_test_name
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)  # Also any -wal/-shm files left by worker threads
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
@@ -0,0 +1,220 @@
+"""
+Load-testing harness for the API.
+
+Virtual users log in with signed Telegram payloads and then drive a weighted
+mix of auth/play/stats/history requests from a thread pool. Requests go
+either in-process through Django's test client (fully offline, also counts
+DB queries per request) or over HTTP to a running server.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.benchmark import percentile
+
+ENDPOINTS = {
+    'auth': ('POST', '/api/auth/telegram/'),
+    'play': ('POST', '/api/game/play/'),
+    'stats': ('GET', '/api/game/stats/'),
+    'history': ('GET', '/api/game/history/'),
+}
+
+CHOICES = ('rock', 'paper', 'scissors')
+
+
+def sign_login_payload(telegram_id, bot_token, auth_date=None):
+    """Build a Login Widget payload whose hash passes ``validate_telegram_data`` for ``bot_token``."""
+    data = {
+        'id': str(telegram_id),
+        'first_name': 'Bench',
+        'last_name': str(telegram_id),
+        'username': f'bench_{telegram_id}',
+        'auth_date': str(auth_date or int(time.time())),
+    }
+    if not bot_token:
+        data['hash'] = 'mock_hash'
+        return data
+    secret = hashlib.sha256(bot_token.encode()).digest()
+    check_string = '\n'.join(f"{key}={data[key]}" for key in sorted(data))
+    data['hash'] = hmac.new(secret, check_string.encode(), hashlib.sha256).hexdigest()
+    return data
+
+
+def parse_mix(mix):
+    """Parse ``"auth=1,play=5"`` into ``{'auth': 1, 'play': 5}``."""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class InProcessTransport:
+    """Sends requests through Django's test client and counts the queries each one runs."""
+
+    counts_queries = True
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, token=None, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(raise_request_exception=False)
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'POST':
+                response = client.post(path, body or {}, content_type='application/json', headers=headers)
+            else:
+                response = client.get(path, headers=headers)
+        return response.status_code, response.content, len(queries)
+
+
+class HttpTransport:
+    """Sends requests to a running server; query counts are not available."""
+
+    counts_queries = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token=None, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('Authorization', f'Token {token}')
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read(), None
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), None
+
+
+class LoadTest:
+    """
+    Runs a mixed workload and collects per-endpoint samples.
+    
+    Args:
+        transport: InProcessTransport or HttpTransport
+        bot_token (str): Bot token the server validates login hashes against
+        users (int): Number of virtual users
+        seed (int): Seed for the request mix, so runs are reproducible
+    """
+
+    def __init__(self, transport, bot_token, users=10, seed=0):
+        self.transport = transport
+        self.bot_token = bot_token
+        self.users = users
+        self.random = random.Random(seed)
+        self.tokens = []
+
+    def _login(self, telegram_id):
+        payload = sign_login_payload(telegram_id, self.bot_token)
+        status, content, queries = self.transport.request('POST', ENDPOINTS['auth'][1], body=payload)
+        return status, content, queries
+
+    def setup(self, first_telegram_id=9_000_000_000):
+        """Log every virtual user in once (untimed) to obtain their tokens."""
+        for index in range(self.users):
+            status, content, _ = self._login(first_telegram_id + index)
+            if status != 200:
+                raise RuntimeError(f"Login failed with {status}: {content[:200]!r}")
+            self.tokens.append(json.loads(content)['token'])
+        self.first_telegram_id = first_telegram_id
+
+    def _plan(self, weights, requests):
+        names = list(weights)
+        picks = self.random.choices(names, weights=[weights[name] for name in names], k=requests)
+        plan = []
+        for name in picks:
+            user = self.random.randrange(self.users)
+            body = None
+            if name == 'play':
+                body = {'user_choice': self.random.choice(CHOICES)}
+            plan.append((name, user, body))
+        return plan
+
+    def _execute(self, step):
+        name, user, body = step
+        start = time.perf_counter()
+        if name == 'auth':
+            status, _, queries = self._login(self.first_telegram_id + user)
+        else:
+            method, path = ENDPOINTS[name]
+            status, _, queries = self.transport.request(method, path, token=self.tokens[user], body=body)
+        return name, time.perf_counter() - start, queries, 200 <= status < 300
+
+    def run(self, weights, requests, concurrency):
+        """Run ``requests`` requests with ``concurrency`` workers and return the summary per endpoint."""
+        plan = self._plan(weights, requests)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(self._execute, plan))
+        elapsed = time.perf_counter() - start
+        return summarize(samples, elapsed)
+
+
+def summarize(samples, elapsed):
+    """Aggregate ``(endpoint, latency, queries, ok)`` samples into per-endpoint statistics."""
+    grouped = {}
+    for name, latency, queries, ok in samples:
+        grouped.setdefault(name, []).append((latency, queries, ok))
+    grouped['all'] = [(latency, queries, ok) for _, latency, queries, ok in samples]
+
+    summary = {}
+    for name, rows in grouped.items():
+        latencies = [latency for latency, _, _ in rows]
+        queries = [q for _, q, _ in rows if q is not None]
+        summary[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, _, ok in rows if not ok),
+            'throughput': len(rows) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries_per_request': sum(queries) / len(queries) if queries else None,
+        }
+    return summary
+
+
+def compare(summary, baseline, tolerance):
+    """
+    Compare a summary with a stored baseline.
+    
+    Returns:
+        list: Human-readable regressions; empty when the run is within tolerance
+    """
+    regressions = []
+    for name, current in summary.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f"{name}: {current['errors']} errors (baseline {previous.get('errors', 0)})")
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']:.1f}ms > baseline {previous['p95_ms']:.1f}ms +{tolerance:.0%}")
+        if current['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: {current['throughput']:.0f} req/s < baseline {previous['throughput']:.0f} req/s -{tolerance:.0%}")
+        if (
+            current['queries_per_request'] is not None
+            and previous.get('queries_per_request') is not None
+            and current['queries_per_request'] > previous['queries_per_request'] + 0.01
+        ):
+            regressions.append(
+                f"{name}: {current['queries_per_request']:.2f} queries/request > baseline {previous['queries_per_request']:.2f}"
+            )
+    return regressions
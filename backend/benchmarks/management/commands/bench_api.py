@@ -0,0 +1,91 @@
+"""
+Mixed-workload load test for the API endpoints.
+
+By default the run is fully offline: a throwaway database is created and
+requests go through Django's test client, which also reports DB queries per
+request. With ``--url`` the same workload is sent to a running server (its
+TELEGRAM_BOT_TOKEN must match ``--bot-token``, or be empty).
+
+Usage:
+    LOG_LEVEL=WARNING python manage.py bench_api --requests 2000 --concurrency 8
+    python manage.py bench_api --save-baseline benchmarks/baseline.json
+    python manage.py bench_api --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from benchmarks.benchmark import test_database
+from benchmarks.harness import HttpTransport, InProcessTransport, LoadTest, compare, parse_mix
+
+BENCH_BOT_TOKEN = '123456:bench-token'
+
+
+class Command(BaseCommand):
+    help = "Drive a mixed auth/play/stats/history workload and report latency, throughput and queries per request"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--users', type=int, default=20, help="Number of virtual Telegram users")
+        parser.add_argument('--mix', default='auth=1,play=4,stats=4,history=2', help="Endpoint weights")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--url', help="Base URL of a running server instead of the in-process test client")
+        parser.add_argument('--bot-token', help="Bot token used to sign login payloads")
+        parser.add_argument('--baseline', help="JSON file with a previous summary to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown vs. the baseline")
+        parser.add_argument('--save-baseline', help="Write this run's summary to a JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            weights = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['url']:
+            bot_token = options['bot_token'] if options['bot_token'] is not None else settings.TELEGRAM_BOT_TOKEN
+            summary = self._run(HttpTransport(options['url']), bot_token, weights, options)
+        else:
+            bot_token = options['bot_token'] or BENCH_BOT_TOKEN
+            with test_database(file_backed=True), override_settings(TELEGRAM_BOT_TOKEN=bot_token):
+                summary = self._run(InProcessTransport(), bot_token, weights, options)
+                if settings.GAME_WRITE_BEHIND:
+                    # Write queued rounds into the throwaway database, not whichever one is configured at exit
+                    from game.writebehind import get_round_log
+                    get_round_log().flush()
+
+        self._report(summary)
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare(summary, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def _run(self, transport, bot_token, weights, options):
+        load_test = LoadTest(transport, bot_token, users=options['users'], seed=options['seed'])
+        load_test.setup()
+        return load_test.run(weights, options['requests'], options['concurrency'])
+
+    def _report(self, summary):
+        self.stdout.write(
+            f"{'endpoint':<9} {'requests':>8} {'errors':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+        )
+        for name in sorted(summary, key=lambda name: (name == 'all', name)):
+            row = summary[name]
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f"{name:<9} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8.0f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                f"{queries if queries is None else format(queries, '.2f'):>8}"
+            )
@@ -0,0 +1,93 @@
+"""
+Load-test comparison of the sync (WSGI) and async (ASGI) endpoints.
+
+The WSGI side drives the DRF views through ``django.test.Client`` (WSGIHandler)
+from a thread pool; the ASGI side drives the async views through
+``django.test.AsyncClient`` (ASGIHandler) with concurrent tasks on one event
+loop. Both use the same throwaway test database and the same request mix.
+
+Usage:
+    python manage.py bench_asgi --requests 1000 --concurrency 20
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from rest_framework.authtoken.models import Token
+
+from benchmarks.benchmark import percentile, test_database
+from game.models import Game, GameStats
+from telegram_auth.models import TelegramUser
+
+ENDPOINTS = {
+    'profile': ('/api/auth/profile/', '/api/auth/async/profile/'),
+    'stats': ('/api/game/stats/', '/api/game/async/stats/'),
+    'history': ('/api/game/history/', '/api/game/async/history/'),
+}
+
+
+class Command(BaseCommand):
+    help = "Compare throughput and latency of the WSGI (DRF) and ASGI (async) read endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Requests per endpoint and server path")
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="Comma-separated subset of: " + ', '.join(ENDPOINTS))
+
+    def _run_wsgi(self, path, headers, count, concurrency):
+        def call(_):
+            start = time.perf_counter()
+            response = Client().get(path, headers=headers)
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(call, range(count)))
+        return latencies, time.perf_counter() - start
+
+    async def _run_asgi(self, path, headers, count, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await AsyncClient().get(path, headers=headers)
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(call() for _ in range(count)))
+        return list(latencies), time.perf_counter() - start
+
+    def _report(self, name, latencies, elapsed):
+        self.stdout.write(
+            f"{name:<18} {len(latencies) / elapsed:>8,.0f} req/s  "
+            f"p50 {percentile(latencies, 50) * 1000:>7.1f}ms  "
+            f"p95 {percentile(latencies, 95) * 1000:>7.1f}ms"
+        )
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        concurrency = options['concurrency']
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+
+        with test_database():
+            user = User.objects.create_user(username='bench_asgi')
+            TelegramUser.objects.create(user=user, telegram_id=1, first_name='Bench', auth_date=int(time.time()))
+            Game.objects.bulk_create(
+                Game(user=user, user_choice='rock', computer_choice='paper', result='lose', status='completed')
+                for _ in range(200)
+            )
+            # Up front: concurrent first stats reads would all try to create it
+            GameStats.objects.create(user=user, total_games=200, losses=200)
+            token = Token.objects.create(user=user)
+            headers = {'Authorization': f'Token {token.key}'}
+
+            for name in endpoints:
+                sync_path, async_path = ENDPOINTS[name]
+                self._report(f"{name} wsgi", *self._run_wsgi(sync_path, headers, count, concurrency))
+                self._report(f"{name} asgi", *asyncio.run(self._run_asgi(async_path, headers, count, concurrency)))
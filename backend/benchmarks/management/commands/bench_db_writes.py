@@ -0,0 +1,78 @@
+"""
+Concurrent ``play_game`` writes against a file-backed SQLite database.
+
+Runs the same workload once per database profile, each on a fresh database:
+``default`` is Django's stock SQLite configuration (rollback journal, deferred
+transactions, 5 second busy timeout) and ``tuned`` the options ``core.db.sqlite``
+builds for the server. Every request goes through the test client on its own
+worker thread and connection, so writers really contend for the database lock;
+failed requests are mostly "database is locked" errors.
+
+The default mix is mostly plays plus the logins (read-then-write transactions)
+and history reads a real client sends alongside them.
+
+Usage:
+    LOG_LEVEL=WARNING python manage.py bench_db_writes --requests 2000 --concurrency 16
+    python manage.py bench_db_writes --mix play=1
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from benchmarks.benchmark import test_database
+from benchmarks.harness import InProcessTransport, LoadTest, parse_mix
+from benchmarks.management.commands.bench_api import BENCH_BOT_TOKEN
+from core import db
+
+PROFILES = (
+    ('default', {}),
+    ('tuned', db.sqlite('')['OPTIONS']),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent play_game throughput under the stock and tuned SQLite profiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--users', type=int, default=20, help="Number of virtual Telegram users")
+        parser.add_argument('--mix', default='play=4,auth=1,history=1', help="Endpoint weights")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("bench_db_writes compares SQLite profiles; unset DATABASE_URL to run it")
+        try:
+            weights = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # Worker threads open their own connections from these settings
+        database = connections.settings[connection.alias]
+        original_options = database.get('OPTIONS', {})
+        self.stdout.write(
+            f"{'profile':<8} {'requests':>8} {'errors':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        try:
+            for name, profile_options in PROFILES:
+                database['OPTIONS'] = dict(profile_options)
+                connection.close()
+                connection.settings_dict['OPTIONS'] = database['OPTIONS']
+                row = self._run(weights, options)['all']
+                self.stdout.write(
+                    f"{name:<8} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8.0f} "
+                    f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}"
+                )
+        finally:
+            database['OPTIONS'] = original_options
+            connection.close()
+            connection.settings_dict['OPTIONS'] = original_options
+
+    def _run(self, weights, options):
+        settings = override_settings(TELEGRAM_BOT_TOKEN=BENCH_BOT_TOKEN, GAME_WRITE_BEHIND=False)
+        with test_database(file_backed=True), settings:
+            load_test = LoadTest(InProcessTransport(), BENCH_BOT_TOKEN, users=options['users'], seed=options['seed'])
+            load_test.setup()
+            return load_test.run(weights, options['requests'], options['concurrency'])
@@ -0,0 +1,131 @@
+"""
+Micro-benchmark for Telegram login signature verification.
+
+``InitDataVerifier`` derives the secret from the bot token once instead of on
+every login, and computes the HMAC with the one-shot ``hmac.digest()``. To
+measure just that, each scheme is timed twice with the same checks (auth_date,
+constant-time comparison): once deriving the secret per call through an
+``hmac.new()`` object, as before, and once with the cached verifier. The
+original ``validate_telegram_data`` is listed for reference; it skipped the
+auth_date check and compared with ``==``, so it is not a like-for-like baseline.
+
+Usage:
+    python manage.py bench_initdata --iterations 100000
+"""
+import hashlib
+import hmac
+import time
+from urllib.parse import parse_qsl, urlencode
+
+from django.core.management.base import BaseCommand
+
+from telegram_auth.verification import InitDataVerifier
+
+BOT_TOKEN = '123456:benchmark-token'
+
+
+def legacy_validate(data, bot_token):
+    """The verification code as it was before InitDataVerifier existed."""
+    sorted_data = sorted([(k, v) for k, v in data.items() if k != 'hash'])
+    data_check_string = '\n'.join([f"{k}={v}" for k, v in sorted_data])
+    secret_key = hashlib.sha256(bot_token.encode()).digest()
+    computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return computed_hash == data.get('hash')
+
+
+def sign(data, secret):
+    check_string = '\n'.join(f"{k}={data[k]}" for k in sorted(data))
+    return hmac.new(secret, check_string.encode(), hashlib.sha256).hexdigest()
+
+
+def per_call_check(verifier, secret, data):
+    """``InitDataVerifier._check`` as it was before caching: ``secret`` is derived by the caller on every login."""
+    received_hash = data.get('hash')
+    if not received_hash:
+        return False
+    try:
+        auth_date = int(data.get('auth_date', 0))
+    except (TypeError, ValueError):
+        return False
+    if int(time.time()) - auth_date > verifier.max_age:
+        return False
+    computed_hash = hmac.new(secret, verifier._data_check_string(data).encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(computed_hash, str(received_hash))
+
+
+class Command(BaseCommand):
+    help = "Measure Telegram login verifications per second with the secret derived per call and cached"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+
+    def _rates(self, funcs, iterations, rounds=10):
+        """Verifications per second of each function: the fastest of ``rounds`` interleaved rounds, as timeit does."""
+        per_round = max(1, iterations // rounds)
+        best = [float('inf')] * len(funcs)
+        for _ in range(rounds):
+            # Interleaved, so a burst of other load on the machine slows every function alike
+            for i, func in enumerate(funcs):
+                start = time.perf_counter()
+                for _ in range(per_round):
+                    func()
+                best[i] = min(best[i], time.perf_counter() - start)
+        return [per_round / elapsed for elapsed in best]
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        verifier = InitDataVerifier(BOT_TOKEN)
+
+        widget_data = {
+            'id': '123456789',
+            'first_name': 'Bench',
+            'last_name': 'User',
+            'username': 'bench_user',
+            'photo_url': 'https://t.me/i/userpic/320/bench.jpg',
+            'auth_date': str(int(time.time())),
+        }
+        widget_data['hash'] = sign(widget_data, hashlib.sha256(BOT_TOKEN.encode()).digest())
+
+        webapp_fields = {
+            'auth_date': str(int(time.time())),
+            'query_id': 'AAHdF6IQAAAAAN0XohDhrOrc',
+            'user': '{"id":123456789,"first_name":"Bench","username":"bench_user"}',
+        }
+        webapp_secret = hmac.new(b'WebAppData', BOT_TOKEN.encode(), hashlib.sha256).digest()
+        webapp_fields['hash'] = sign(webapp_fields, webapp_secret)
+        init_data = urlencode(webapp_fields)
+
+        token = BOT_TOKEN.encode()
+
+        def widget_per_call():
+            return per_call_check(verifier, hashlib.sha256(token).digest(), widget_data)
+
+        def init_data_per_call():
+            fields = dict(parse_qsl(init_data, keep_blank_values=True))
+            return per_call_check(verifier, hmac.new(b'WebAppData', token, hashlib.sha256).digest(), fields)
+
+        assert legacy_validate(widget_data, BOT_TOKEN)
+        assert widget_per_call() and verifier.verify(widget_data)[0]
+        assert init_data_per_call() and verifier.verify_init_data(init_data)[0]
+
+        groups = [
+            ('Login Widget', [
+                ('original validate_telegram_data', lambda: legacy_validate(widget_data, BOT_TOKEN)),
+                ('secret derived per call', widget_per_call),
+                ('InitDataVerifier.verify', lambda: verifier.verify(widget_data)),
+            ]),
+            ('Mini App initData', [
+                ('secret derived per call', init_data_per_call),
+                ('InitDataVerifier.verify_init_data', lambda: verifier.verify_init_data(init_data)),
+            ]),
+        ]
+        for title, benchmarks in groups:
+            self.stdout.write(title)
+            names, funcs = zip(*benchmarks)
+            results = list(zip(names, self._rates(funcs, iterations)))
+            # Speedups are against the per-call derivation with the same checks
+            baseline = dict(results)['secret derived per call']
+            for name, rate in results:
+                self.stdout.write(
+                    f"  {name:<36} {rate:>10,.0f} verifications/s  {1e6 / rate:6.2f} us  ({rate / baseline:.2f}x)"
+                )
@@ -0,0 +1,130 @@
+"""
+Latency of the health probes through Django's WSGI and ASGI handlers.
+
+Compares the previous health check (a DRF ``@api_view`` behind the whole
+middleware stack) with the liveness and readiness probes answered by
+``core.fastpath`` in front of Django, and with the same probes served as Django
+views. Requests are fed straight to the applications, as gunicorn or uvicorn
+would, so the numbers include no client or network overhead.
+
+Usage:
+    python manage.py bench_probes --requests 5000
+"""
+import asyncio
+import time
+from io import BytesIO
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+from django.test.utils import override_settings
+from django.urls import include, path
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+
+from benchmarks.benchmark import percentile, test_database
+from core.fastpath import FastPathASGI, FastPathWSGI
+from core.probes import database_check
+
+
+@api_view(['GET', 'HEAD'])
+@permission_classes([AllowAny])
+def legacy_health_check(request):
+    return JsonResponse({"status": "ok"}, status=200)
+
+
+# ROOT_URLCONF for the run: the project's routes plus the previous health check
+urlpatterns = [
+    path('legacy/health-check/', legacy_health_check),
+    path('', include('core.urls')),
+]
+
+CASES = (
+    ('legacy DRF health-check', '/legacy/health-check/', False),
+    ('liveness, Django view', '/api/health-check/', False),
+    ('liveness, fast path', '/api/health-check/', True),
+    ('readiness, Django view', '/api/ready/', False),
+    ('readiness, fast path', '/api/ready/', True),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare health probe latency with and without the fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help="Timed requests per case and server")
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        with test_database(), override_settings(ROOT_URLCONF=__name__):
+            self.stdout.write(f"{'case':<26} {'server':<6} {'p50':>9} {'p95':>9} {'req/s':>9}")
+            for name, url, fast in CASES:
+                database_check.reset()
+                for server, run in (('wsgi', self._wsgi), ('asgi', self._asgi)):
+                    samples = run(url, n, fast)
+                    self.stdout.write(
+                        f"{name:<26} {server:<6} {percentile(samples, 50) * 1e6:>7.0f}us "
+                        f"{percentile(samples, 95) * 1e6:>7.0f}us {len(samples) / sum(samples):>9.0f}"
+                    )
+
+    def _wsgi(self, url, n, fast):
+        handler = FastPathWSGI(WSGIHandler()) if fast else WSGIHandler()
+        statuses = []
+
+        def start_response(status, headers):
+            statuses.append(status)
+
+        samples = []
+        for _ in range(n + n // 10):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': url, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'REMOTE_ADDR': '127.0.0.1', 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http',
+            }
+            start = time.perf_counter()
+            response = handler(environ, start_response)
+            b''.join(response)
+            if hasattr(response, 'close'):  # Required of the server by PEP 3333
+                response.close()
+            samples.append(time.perf_counter() - start)
+        self._check(url, statuses[-1])
+        return samples[n // 10:]  # Drop warm-up requests
+
+    def _asgi(self, url, n, fast):
+        handler = FastPathASGI(ASGIHandler()) if fast else ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url, 'root_path': '', 'query_string': b'',
+            'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+
+        async def run():
+            statuses = []
+            disconnect = asyncio.Event()
+
+            async def receive():
+                if not received:
+                    received.append(True)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            samples = []
+            for _ in range(n + n // 10):
+                received = []
+                start = time.perf_counter()
+                await handler(scope, receive, send)
+                samples.append(time.perf_counter() - start)
+            self._check(url, statuses[-1])
+            return samples[n // 10:]
+
+        return asyncio.run(run())
+
+    def _check(self, url, status):
+        if not str(status).startswith('200'):
+            raise CommandError(f"{url} answered {status}")
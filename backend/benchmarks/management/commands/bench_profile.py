@@ -0,0 +1,66 @@
+"""
+Benchmark of the profile endpoint with and without the token cache.
+
+Runs against a throwaway test database through DRF's test client, so no
+server or existing data is needed.
+
+Usage:
+    python manage.py bench_profile --requests 2000
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from benchmarks.benchmark import test_database
+from telegram_auth import views
+from telegram_auth.authentication import CachedTokenAuthentication, token_cache
+from telegram_auth.models import TelegramUser
+
+
+class Command(BaseCommand):
+    help = "Measure GET /api/auth/profile/ requests per second with TokenAuthentication vs CachedTokenAuthentication"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def _run(self, client, count):
+        client.get('/api/auth/profile/')  # Warm up
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(count):
+                response = client.get('/api/auth/profile/')
+            elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.content
+        return count / elapsed, len(queries) / count
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        view_class = views.get_user_profile.cls
+        original_classes = view_class.authentication_classes
+        with test_database():
+            try:
+                user = User.objects.create_user(username='bench_profile')
+                TelegramUser.objects.create(user=user, telegram_id=1, first_name='Bench', auth_date=int(time.time()))
+                token = Token.objects.create(user=user)
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+                results = []
+                for auth_class in (TokenAuthentication, CachedTokenAuthentication):
+                    view_class.authentication_classes = [auth_class]
+                    token_cache.clear()
+                    results.append((auth_class.__name__, *self._run(client, count)))
+            finally:
+                view_class.authentication_classes = original_classes
+
+        baseline = results[0][1]
+        for name, rate, queries in results:
+            self.stdout.write(
+                f"{name:<28} {rate:>9,.0f} req/s  {queries:.2f} queries/request  ({rate / baseline:.2f}x)"
+            )
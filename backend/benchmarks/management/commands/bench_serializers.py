@@ -0,0 +1,106 @@
+"""
+Serialization throughput of the read endpoints, DRF serializers vs ``ValuesSerializer``.
+
+For each payload the command times, per 1,000 rows, the old path (model
+instances through a ``ModelSerializer`` rendered by ``JSONRenderer``) and the new
+one (``values_list()`` rows or loaded instances through a ``ValuesSerializer``
+rendered by ``ORJSONRenderer``), split into fetch+serialize and render. Before
+timing, it checks that both paths render byte-identical JSON.
+
+Usage:
+    python manage.py bench_serializers --rows 1000 --repeat 50
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.benchmark import percentile, test_database
+from core.renderers import ORJSONRenderer, orjson
+from game.engine import RPS
+from game.models import Game, GameStats
+from game.serializers import GameReadSerializer, GameSerializer, GameStatsReadSerializer, GameStatsSerializer
+from telegram_auth.models import TelegramUser
+from telegram_auth.serializers import TelegramUserReadSerializer, TelegramUserSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare serialization throughput of DRF serializers and the read-only ValuesSerializers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help="Rows per payload")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed runs per path")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson is not installed: ORJSONRenderer falls back to the stdlib encoder")
+        rows = options['rows']
+        with test_database():
+            user = self._populate(rows)
+            games = Game.objects.filter(user=user).order_by('-created_at', '-id')
+            stats = list(GameStats.objects.all()[:rows])
+            profiles = list(TelegramUser.objects.select_related('user')[:rows])
+
+            payloads = {
+                'game history': (
+                    lambda: GameSerializer(games[:rows], many=True).data,
+                    lambda: GameReadSerializer.from_rows(GameReadSerializer.values(games)[:rows]),
+                ),
+                'game stats': (
+                    lambda: [GameStatsSerializer(obj).data for obj in stats],
+                    lambda: [GameStatsReadSerializer.from_instance(obj) for obj in stats],
+                ),
+                'user profile': (
+                    lambda: [TelegramUserSerializer(obj).data for obj in profiles],
+                    lambda: [TelegramUserReadSerializer.from_instance(obj) for obj in profiles],
+                ),
+            }
+            self.stdout.write(
+                f"{'payload':<14} {'path':<6} {'serialize':>12} {'render':>12} {'total':>12} {'rows/s':>10}"
+            )
+            for name, (drf, fast) in payloads.items():
+                if JSONRenderer().render(drf()) != ORJSONRenderer().render(fast()):
+                    raise CommandError(f"{name}: rendered output differs between the two paths")
+                for path, serialize, renderer in (('drf', drf, JSONRenderer()), ('fast', fast, ORJSONRenderer())):
+                    serialize_times, render_times = [], []
+                    for _ in range(options['repeat']):
+                        start = time.perf_counter()
+                        data = serialize()
+                        middle = time.perf_counter()
+                        renderer.render(data)
+                        end = time.perf_counter()
+                        serialize_times.append(middle - start)
+                        render_times.append(end - middle)
+                    serialize_ms = percentile(serialize_times, 50) * 1000 * 1000 / rows
+                    render_ms = percentile(render_times, 50) * 1000 * 1000 / rows
+                    total_ms = serialize_ms + render_ms
+                    self.stdout.write(
+                        f"{name:<14} {path:<6} {serialize_ms:>10.2f}ms {render_ms:>10.2f}ms "
+                        f"{total_ms:>10.2f}ms {1000 / total_ms * 1000:>10.0f}"
+                    )
+            self.stdout.write("Times are medians per 1,000 rows; 'game history' serialize includes the query")
+
+    def _populate(self, rows):
+        users = User.objects.bulk_create(
+            User(username=f"bench{i}", email=f"bench{i}@example.com") for i in range(rows)
+        )
+        TelegramUser.objects.bulk_create(
+            TelegramUser(
+                user=user, telegram_id=100_000 + i, username=f"bench{i}", first_name="Bench",
+                last_name=f"User {i}", photo_url=f"https://t.me/i/userpic/{i}.jpg", auth_date=1_700_000_000 + i,
+            )
+            for i, user in enumerate(users)
+        )
+        GameStats.objects.bulk_create(
+            GameStats(user=user, total_games=i * 3, wins=i, losses=i, draws=i) for i, user in enumerate(users)
+        )
+        moves = RPS.random_moves(rows * 2)
+        Game.objects.bulk_create(
+            Game(
+                user=users[0], user_choice=user_choice, computer_choice=computer_choice,
+                result=RPS.resolve(user_choice, computer_choice), status='completed',
+            )
+            for user_choice, computer_choice in zip(moves[::2], moves[1::2])
+        )
+        return users[0]
@@ -0,0 +1,116 @@
+"""
+Storage footprint and history query time of the ``game_game`` table.
+
+Fills a throwaway test database with ``--games`` rounds spread over ``--users``
+players, then reports the on-disk size of the table and its indexes and the
+latency of the queries behind the history endpoint. Run it before and after a
+schema change to compare.
+
+Usage:
+    python manage.py bench_storage --games 200000 --users 100
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from benchmarks.benchmark import percentile, test_database
+from game.models import Game
+from game.pagination import GameHistoryPagination
+
+TABLE = Game._meta.db_table
+
+
+class Command(BaseCommand):
+    help = "Measure the size of the game table and the time of history queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=200_000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--queries', type=int, default=2000, help="Timed queries per query type")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with test_database():
+            user_ids = self._populate(options['games'], options['users'], rng)
+            sizes = self._sizes()
+            if sizes:
+                for name, size in sizes:
+                    self.stdout.write(f"{name:<32} {size / 1024:>10.0f} KiB")
+                self.stdout.write(f"{'bytes per row (table)':<32} {sizes[0][1] / options['games']:>10.1f}")
+            else:
+                self.stdout.write(f"Table sizes are not available on {connection.vendor}")
+
+            page_size = GameHistoryPagination.page_size
+            queries = {
+                'history first page': lambda user_id: list(
+                    Game.objects.filter(user_id=user_id).order_by('-created_at', '-id')[:page_size]
+                ),
+                'history page 10': lambda user_id: list(
+                    Game.objects.filter(user_id=user_id).order_by('-created_at', '-id')[page_size * 9:page_size * 10]
+                ),
+                'wins of a user': lambda user_id: Game.objects.filter(user_id=user_id, result='win').count(),
+            }
+            for name, query in queries.items():
+                samples = []
+                for _ in range(options['queries']):
+                    user_id = rng.choice(user_ids)
+                    start = time.perf_counter()
+                    query(user_id)
+                    samples.append(time.perf_counter() - start)
+                self.stdout.write(
+                    f"{name:<32} p50 {percentile(samples, 50) * 1000:.3f}ms  p95 {percentile(samples, 95) * 1000:.3f}ms"
+                )
+
+    def _populate(self, games, users, rng):
+        user_ids = [
+            user.id for user in User.objects.bulk_create(User(username=f"bench{i}") for i in range(users))
+        ]
+        moves = [choice for choice, _ in Game.CHOICES]
+        batch = []
+        for _ in range(games):
+            user_choice, computer_choice = rng.choice(moves), rng.choice(moves)
+            batch.append(Game(
+                user_id=rng.choice(user_ids),
+                user_choice=user_choice,
+                computer_choice=computer_choice,
+                result=Game.resolve(user_choice, computer_choice),
+                status='completed',
+            ))
+            if len(batch) == 5000:
+                Game.objects.bulk_create(batch)
+                batch = []
+        Game.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return user_ids
+
+    def _sizes(self):
+        """Return ``[(name, bytes)]`` for the table followed by each of its indexes."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s ORDER BY name", [TABLE]
+                )
+                names = [TABLE] + [row[0] for row in cursor.fetchall()]
+                sizes = []
+                for name in names:
+                    cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [name])
+                    sizes.append((name, cursor.fetchone()[0] or 0))
+                return sizes
+            if connection.vendor == 'postgresql':
+                cursor.execute("VACUUM ANALYZE " + connection.ops.quote_name(TABLE))
+                cursor.execute(
+                    "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass ORDER BY 1", [TABLE]
+                )
+                names = [row[0] for row in cursor.fetchall()]
+                cursor.execute("SELECT pg_table_size(%s)", [TABLE])
+                sizes = [(TABLE, cursor.fetchone()[0])]
+                for name in names:
+                    cursor.execute("SELECT pg_relation_size(%s)", [name])
+                    sizes.append((name, cursor.fetchone()[0]))
+                return sizes
+        return []
@@ -0,0 +1,42 @@
+"""
+Bulk-simulate rounds with the game engine, without touching the database.
+
+Useful to check a ruleset's balance or to time the engine's batch path.
+
+Usage:
+    python manage.py simulate_games --rounds 1000000 --variant rpsls --seed 1
+    python manage.py simulate_games --rounds 100000 --strategy rock
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game import engine
+
+
+class Command(BaseCommand):
+    help = "Simulate many rounds against a random computer and print the result distribution"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=1_000_000)
+        parser.add_argument('--variant', default='rps', choices=sorted(engine.RULESETS))
+        parser.add_argument('--strategy', help="Always play this move instead of a random one")
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        ruleset = engine.RULESETS[options['variant']]
+        rounds = options['rounds']
+        user_codes = None
+        if options['strategy']:
+            if not ruleset.is_move(options['strategy']):
+                raise CommandError(f"Unknown move {options['strategy']!r}; {ruleset.name} has: {', '.join(ruleset.moves)}")
+            user_codes = [ruleset.codes[options['strategy']]] * rounds
+
+        start = time.perf_counter()
+        user_codes, computer_codes, results = ruleset.simulate(rounds, user_codes=user_codes, seed=options['seed'])
+        counts = ruleset.tally(results)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"{ruleset.name}: {rounds} rounds in {elapsed * 1000:.1f}ms")
+        for result in engine.RESULTS:
+            self.stdout.write(f"  {result:<5} {counts[result]:>10}  {counts[result] / rounds:.2%}")
@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+
+from .harness import compare, parse_mix, summarize
+
+
+class ParseMixTests(SimpleTestCase):
+    def test_weights(self):
+        self.assertEqual(parse_mix('auth=1, play=5,stats'), {'auth': 1.0, 'play': 5.0, 'stats': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('play=1,login=2')
+
+
+class CompareTests(SimpleTestCase):
+    def setUp(self):
+        samples = [('play', 0.010, 2, True), ('play', 0.020, 2, True), ('stats', 0.001, 0, True)]
+        self.baseline = summarize(samples, elapsed=1.0)
+
+    def test_summary(self):
+        self.assertEqual(self.baseline['all']['requests'], 3)
+        self.assertEqual(self.baseline['play']['p95_ms'], 20.0)
+        self.assertEqual(self.baseline['play']['queries_per_request'], 2)
+
+    def test_within_tolerance(self):
+        samples = [('play', 0.011, 2, True), ('play', 0.021, 2, True), ('stats', 0.001, 0, True)]
+        self.assertEqual(compare(summarize(samples, elapsed=1.0), self.baseline, tolerance=0.1), [])
+
+    def test_regressions(self):
+        samples = [('play', 0.010, 3, True), ('play', 0.050, 3, False), ('stats', 0.001, 0, True)]
+        regressions = compare(summarize(samples, elapsed=1.0), self.baseline, tolerance=0.1)
+        self.assertTrue(any(r.startswith('play: 1 errors') for r in regressions))
+        self.assertTrue(any(r.startswith('play: p95 50.0ms') for r in regressions))
+        self.assertTrue(any(r.startswith('play: 3.00 queries/request') for r in regressions))
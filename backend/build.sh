@@ -8,5 +8,8 @@ pip install -r requirements.txt
 # Create staticfiles directory
 mkdir -p staticfiles
 
+# Fail on production settings errors (e.g. a missing METRICS_TOKEN)
+python manage.py check --deploy --fail-level ERROR
+
 # Apply database migrations
-python manage.py migrate 
\ No newline at end of file
+python manage.py migrate
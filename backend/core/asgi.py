@@ -9,8 +9,24 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Replay rounds that a previous worker queued but never flushed before serving new ones
+if settings.GAME_WRITE_BEHIND:
+    from game.writebehind import get_round_log
+    get_round_log()
+
+# The ASGI profile drops WhiteNoise from MIDDLEWARE; serve /static/ (admin assets) here instead
+if settings.SERVER_PROFILE == 'asgi':
+    application = ASGIStaticFilesHandler(application)
+
+# Health probes are answered before Django's handler (see core.fastpath)
+if settings.FAST_PATHS:
+    from core.fastpath import FastPathASGI
+    application = FastPathASGI(application)
@@ -0,0 +1,49 @@
+"""
+System checks of the deployment settings shared by the local apps.
+"""
+import os
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Cache alias settings that every worker must share: (setting, cache name, what breaks otherwise)
+SHARED_CACHES = (
+    ('GAME_STATS_CACHE_ALIAS', 'GameStats cache', 'the workers serve each other stale counters'),
+    ('TOKEN_AUTH_REVOCATION_CACHE_ALIAS', 'token revocation cache',
+     'a logged-out token stays valid on the other workers'),
+)
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """Several production workers must share the caches in SHARED_CACHES."""
+    workers = int(os.environ.get('WEB_CONCURRENCY', '1') or '1')  # gunicorn's worker count
+    if settings.DEBUG or workers <= 1:
+        return []
+    errors = []
+    for setting, name, consequence in SHARED_CACHES:
+        alias = getattr(settings, setting)
+        if settings.CACHES[alias]['BACKEND'] in PER_PROCESS_CACHES:
+            errors.append(Error(
+                f"The {name} '{alias}' is local to each of the {workers} worker processes, so {consequence}.",
+                hint=f"Set REDIS_URL (or point {setting} at a shared cache), or run a single worker.",
+                id='core.E001',
+            ))
+    return errors
+
+
+@register(deploy=True)
+def check_metrics_token(app_configs, **kwargs):
+    """/api/metrics/ must not be public in production (``build.sh`` runs ``check --deploy``)."""
+    if settings.DEBUG or settings.METRICS_TOKEN:
+        return []
+    return [Error(
+        "METRICS_TOKEN is not set, so anyone can read /api/metrics/.",
+        hint="Set METRICS_TOKEN and have the scraper send 'Authorization: Bearer <token>'.",
+        id='core.E002',
+    )]
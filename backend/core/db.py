@@ -0,0 +1,83 @@
+"""
+Database profiles used by ``core.settings``.
+
+``sqlite()`` tunes SQLite for a web server with concurrent writers:
+
+- WAL journal, so readers never block the writer and vice versa
+- ``synchronous=NORMAL``: in WAL mode a commit no longer fsyncs; a power loss can
+  drop the last transactions but never corrupts the database
+- memory-mapped reads (``SQLITE_MMAP_SIZE``)
+- a busy timeout (``SQLITE_BUSY_TIMEOUT``): a writer waits for the lock instead of
+  failing straight away with "database is locked"
+- ``BEGIN IMMEDIATE`` transactions: ``atomic()`` blocks take the write lock when
+  they start. A deferred transaction that reads first and then writes cannot
+  wait for the lock, so under contention it fails with "database is locked"
+  however long the busy timeout is. In turn, even an ``atomic()`` block that
+  only reads serializes with every writer, so keep read-mostly paths out of
+  them (the Telegram login only opens one to create a user).
+
+``from_url()`` parses ``DATABASE_URL`` and, for PostgreSQL when ``psycopg_pool`` is
+installed, gives each process a psycopg 3 connection pool (Django's ``pool`` option) sized
+by ``DB_POOL_MIN_SIZE`` / ``DB_POOL_MAX_SIZE``, instead of one persistent
+connection per thread. Without it (psycopg2), it keeps persistent connections.
+SQLite URLs get the ``sqlite()`` profile.
+
+``replicas()`` turns ``DATABASE_REPLICA_URLS`` into read-replica aliases (see
+``core.replicas``).
+"""
+import importlib.util
+import os
+
+import dj_database_url
+
+
+def sqlite(name):
+    """Settings for a SQLite database file ``name``."""
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'OPTIONS': {
+            'init_command': ';'.join(pragmas),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', '20')),  # Seconds a writer waits for the lock
+        },
+    }
+
+
+def from_url(url):
+    """Settings for ``url`` (any database dj-database-url understands), pooled on PostgreSQL with psycopg 3."""
+    config = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        return sqlite(config['NAME'])
+    pooled = (
+        config['ENGINE'] == 'django.db.backends.postgresql'
+        and os.environ.get('DB_POOL', 'True') == 'True'
+        and importlib.util.find_spec('psycopg_pool') is not None
+    )
+    if pooled:
+        # The pool keeps and health-checks the connections; Django must not hold them itself
+        config['CONN_MAX_AGE'] = 0
+        config['CONN_HEALTH_CHECKS'] = False
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),  # Per process: cover every worker thread
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),  # Seconds to wait for a free connection
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '600')),  # Seconds before idle extras are closed
+        }
+    return config
+
+
+def replicas(urls):
+    """Settings for the comma-separated replica ``urls``, keyed by alias (``replica1``, ``replica2``, ...)."""
+    aliases = {}
+    for url in filter(None, (url.strip() for url in urls.split(','))):
+        config = from_url(url)
+        config['TEST'] = {'MIRROR': 'default'}  # Tests read the primary's test database
+        aliases[f'replica{len(aliases) + 1}'] = config
+    return aliases
@@ -0,0 +1,57 @@
+"""
+Answers the probes in ``FAST_PATHS`` in front of Django.
+
+``core.wsgi`` and ``core.asgi`` wrap their applications in ``FastPathWSGI`` and
+``FastPathASGI``. A GET or HEAD request for one of those paths is answered by
+calling its probe directly: no request object, no request_started/finished
+signals, middleware, URL resolving or DRF. Anything else is passed through
+untouched. Under ASGI, a probe's async version (``aprobe``) is awaited when it
+has one; otherwise the probe is called inline on the event loop, so it must not
+block. See ``core.probes``.
+"""
+from http import HTTPStatus
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _load_probes():
+    return {path: import_string(probe) for path, probe in settings.FAST_PATHS.items()}
+
+
+class FastPathWSGI:
+    def __init__(self, application):
+        self.application = application
+        self.probes = _load_probes()
+
+    def __call__(self, environ, start_response):
+        probe = self.probes.get(environ.get('PATH_INFO'))
+        if probe is None or environ['REQUEST_METHOD'] not in SAFE_METHODS:
+            return self.application(environ, start_response)
+        status, body = probe()
+        start_response(f"{status} {HTTPStatus(status).phrase}", [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+        ])
+        return [body] if environ['REQUEST_METHOD'] == 'GET' else []
+
+
+class FastPathASGI:
+    def __init__(self, application):
+        self.application = application
+        self.probes = _load_probes()
+
+    async def __call__(self, scope, receive, send):
+        probe = self.probes.get(scope['path']) if scope['type'] == 'http' else None
+        if probe is None or scope['method'] not in SAFE_METHODS:
+            return await self.application(scope, receive, send)
+        aprobe = getattr(probe, 'aprobe', None)
+        status, body = await aprobe() if aprobe is not None else probe()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': body if scope['method'] == 'GET' else b''})
@@ -0,0 +1,37 @@
+"""
+Non-blocking log handler.
+
+Request threads only put records on an in-memory queue; a single background
+listener thread formats them and writes them to the stream. A slow stdout or
+log collector therefore never stalls a worker that is serving a request.
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueStreamHandler(QueueHandler):
+    """QueueHandler that drains into a StreamHandler on its own listener thread."""
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.stop_listener)
+
+    def setFormatter(self, fmt):
+        # Formatting with the configured format happens on the listener thread
+        self.target.setFormatter(fmt)
+
+    def stop_listener(self):
+        # Called by close() and again by atexit; only the first call flushes and stops the thread
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self.stop_listener()
+        # Reconfiguring logging closes this handler; don't keep it alive until exit
+        atexit.unregister(self.stop_listener)
+        super().close()
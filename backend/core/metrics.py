@@ -0,0 +1,227 @@
+"""
+Per-process request metrics in Prometheus text format.
+
+Every thread records into its own shard, so the request path never takes a lock
+or contends with other workers; ``/api/metrics/`` merges the shards when it is
+scraped. Values are per process: with several gunicorn/uvicorn workers each one
+reports its own series and Prometheus should scrape them individually (or sum
+them with a ``sum without(instance)`` style query).
+
+Per-request DB and serializer time are collected through a context variable,
+which asgiref copies into ``sync_to_async`` threads, so queries issued by async
+views are attributed to the right request as well. DB time comes from a
+connection execute wrapper; serializer time from ``TimedSerializerMixin``,
+which the apps' DRF serializers include.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Wall time spent handling the request.', TIME_BUCKETS),
+    'http_request_db_queries': ('Database queries executed per request.', QUERY_BUCKETS),
+    'http_request_db_duration_seconds': ('Time spent in database queries per request.', TIME_BUCKETS),
+    'http_request_serializer_duration_seconds': ('Time spent validating and serializing data per request.', TIME_BUCKETS),
+    'http_response_size_bytes': ('Size of the response body.', SIZE_BUCKETS),
+}
+
+
+class RequestStats:
+    """Accumulates DB and serializer timings for the request that is being handled."""
+
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+current_request = ContextVar('current_request_stats', default=None)
+
+
+class Registry:
+    """Histograms and counters keyed by ``(view, method)``, sharded per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._collectors = []
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe_request(self, view, method, status, duration, stats, size):
+        """Record one finished request; ``size`` may be None for streaming responses."""
+        shard = self._shard()
+        labels = (view, method)
+        self._observe(shard, 'http_request_duration_seconds', labels, duration)
+        self._observe(shard, 'http_request_db_queries', labels, stats.queries)
+        self._observe(shard, 'http_request_db_duration_seconds', labels, stats.db_time)
+        self._observe(shard, 'http_request_serializer_duration_seconds', labels, stats.serializer_time)
+        if size is not None:
+            self._observe(shard, 'http_response_size_bytes', labels, size)
+        key = ('http_requests_total', (view, method, str(status)))
+        shard[key] = shard.get(key, 0) + 1
+
+    @staticmethod
+    def _observe(shard, name, labels, value):
+        key = (name, labels)
+        series = shard.get(key)
+        if series is None:
+            # [bucket counts..., +Inf count, sum]
+            series = shard[key] = [0] * (len(HISTOGRAMS[name][1]) + 1) + [0.0]
+        series[bisect_left(HISTOGRAMS[name][1], value)] += 1
+        series[-1] += value
+
+    def register_collector(self, collector):
+        """Add a callable returning ``(name, type, help, value)`` tuples to include in every scrape."""
+        self._collectors.append(collector)
+
+    def merged(self):
+        with self._shards_lock:
+            shards = [shard.copy() for shard in self._shards]
+        merged = {}
+        for shard in shards:
+            for key, value in shard.items():
+                if isinstance(value, list):
+                    total = merged.setdefault(key, [0] * (len(value) - 1) + [0.0])
+                    for i, v in enumerate(value):
+                        total[i] += v
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        merged = self.merged()
+        lines = []
+
+        lines.append('# HELP http_requests_total Requests handled, by view, method and status code.')
+        lines.append('# TYPE http_requests_total counter')
+        for (name, labels), value in sorted(merged.items()):
+            if name == 'http_requests_total':
+                view, method, status = labels
+                lines.append(f'http_requests_total{{{_labels(view=view, method=method, status=status)}}} {value}')
+
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (series_name, labels), series in sorted(merged.items()):
+                if series_name != name:
+                    continue
+                view, method = labels
+                base = _labels(view=view, method=method)
+                cumulative = 0
+                for bound, count in zip(buckets, series):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{base},le="{_number(bound)}"}} {cumulative}')
+                cumulative += series[len(buckets)]
+                lines.append(f'{name}_bucket{{{base},le="+Inf"}} {cumulative}')
+                lines.append(f'{name}_sum{{{base}}} {_number(series[-1])}')
+                lines.append(f'{name}_count{{{base}}} {cumulative}')
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, value in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.append(f'{name} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def _install_execute_wrapper(sender, connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+@contextmanager
+def serializer_timer():
+    """Add the time spent in the block to the request's serializer time; nested blocks are not counted twice."""
+    stats = current_request.get()
+    if stats is None or stats.serializer_depth:
+        yield
+        return
+    stats.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_time += time.perf_counter() - start
+        stats.serializer_depth -= 1
+
+
+class TimedSerializerMixin:
+    """
+    Counts a DRF serializer's validation and output toward the request's serializer time.
+
+    ``run_validation()`` and ``to_representation()`` cover ``is_valid()`` and ``.data``
+    of single serializers and, item by item, of ``many=True`` ones.
+    """
+
+    def run_validation(self, *args, **kwargs):
+        with serializer_timer():
+            return super().run_validation(*args, **kwargs)
+
+    def to_representation(self, *args, **kwargs):
+        with serializer_timer():
+            return super().to_representation(*args, **kwargs)
+
+
+_installed = False
+
+
+def install():
+    """Hook query timing into Django's connections. Safe to call more than once."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from django.db import connections
+
+    connection_created.connect(_install_execute_wrapper, dispatch_uid='core.metrics.execute_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _install_execute_wrapper(None, connection)
@@ -0,0 +1,128 @@
+"""
+Liveness and readiness probes.
+
+A probe takes no arguments and returns ``(status, body)``, so ``core.fastpath``
+can answer it in front of Django (see ``FAST_PATHS``); ``as_view`` serves the
+same probe as a regular Django view. A probe that can block has an ``aprobe``
+attribute, an async version that ``FastPathASGI`` awaits instead.
+
+``liveness`` only shows the process is serving requests. ``readiness`` also runs
+``SELECT 1`` on every configured database except the read replicas, whose
+readers fall back to the primary (see ``core.replicas``). The result is cached for
+``READINESS_CACHE_TTL`` seconds, so a probe costs at most one query per TTL per
+process however often the load balancer calls it. The query runs on a dedicated
+thread with its own connection: the probe behaves the same under WSGI and ASGI,
+and a database that hangs delays a probe by at most ``READINESS_TIMEOUT`` seconds.
+Under ASGI a cached result is answered on the event loop, and a refresh waits
+in a worker thread, so a hung database never stalls the loop.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+logger = logging.getLogger(__name__)
+
+_LIVE = b'{"status":"ok"}'
+
+
+def liveness():
+    """200 while the process can serve requests."""
+    return 200, _LIVE
+
+
+class DatabaseCheck:
+    """Cached result of ``SELECT 1`` against every primary database alias."""
+
+    def __init__(self, ttl, timeout):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='readiness')
+
+    def status(self):
+        """Return ``{alias: None or error name}``, refreshing it at most once per TTL."""
+        with self._lock:
+            if self._result is None or time.monotonic() >= self._expires_at:
+                try:
+                    self._result = self._executor.submit(self._check).result(self.timeout)
+                except TimeoutError:
+                    logger.warning("Readiness check timed out after %ss", self.timeout)
+                    self._result = dict.fromkeys(self.aliases(), 'timeout')
+                self._expires_at = time.monotonic() + self.ttl
+            return self._result
+
+    async def astatus(self):
+        """Async version of ``status``: waits for a refresh in a worker thread, not on the event loop."""
+        result = self._result
+        if result is not None and time.monotonic() < self._expires_at:
+            return result
+        return await asyncio.to_thread(self.status)
+
+    @staticmethod
+    def aliases():
+        return [alias for alias in settings.DATABASES if alias not in settings.DATABASE_REPLICAS]
+
+    def _check(self):
+        result = {}
+        for alias in self.aliases():
+            connection = connections[alias]
+            # This thread never sees request_finished: honour CONN_MAX_AGE and drop broken connections here
+            connection.close_if_unusable_or_obsolete()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                result[alias] = None
+            except Exception as e:
+                logger.warning("Readiness check of database %r failed: %s", alias, e)
+                result[alias] = type(e).__name__
+            # As at the end of a request: with CONN_MAX_AGE = 0 (always the case with a pool) give it back
+            connection.close_if_unusable_or_obsolete()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._result = None
+
+
+database_check = DatabaseCheck(ttl=settings.READINESS_CACHE_TTL, timeout=settings.READINESS_TIMEOUT)
+
+
+def _readiness_response(result):
+    ready = not any(result.values())
+    body = {
+        'status': 'ok' if ready else 'unavailable',
+        'databases': {alias: error or 'ok' for alias, error in result.items()},
+    }
+    return 200 if ready else 503, json.dumps(body, separators=(',', ':')).encode()
+
+
+def readiness():
+    """200 when every database answers, 503 otherwise, with the state of each."""
+    return _readiness_response(database_check.status())
+
+
+async def areadiness():
+    """Async version of ``readiness``."""
+    return _readiness_response(await database_check.astatus())
+
+
+readiness.aprobe = areadiness
+
+
+def as_view(probe):
+    """Wrap a probe in a Django view answering GET and HEAD."""
+    @require_safe
+    def view(request):
+        status, body = probe()
+        return HttpResponse(body, status=status, content_type='application/json')
+    return view
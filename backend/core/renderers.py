@@ -0,0 +1,35 @@
+"""
+Fast JSON rendering for DRF responses.
+
+``ORJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` with its
+default settings (compact, unescaped unicode, UTC datetimes as ``Z``), using
+orjson for the encoding. Indented output (browsable API, ``; indent=``) and
+non-default JSON settings go through the stdlib path, as does everything when
+orjson is not installed.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to DRF's stdlib encoder
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in ``JSONRenderer`` backed by orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        # Same strict-javascript-subset escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
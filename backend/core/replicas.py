@@ -0,0 +1,178 @@
+"""
+Read replicas for read-only endpoints.
+
+Replicas are extra database aliases built from ``DATABASE_REPLICA_URLS`` (see
+``core.db.replicas``); they are listed in ``DATABASE_REPLICAS``. A view wrapped
+in ``replica_reads`` runs its queries on a randomly chosen replica through
+``ReplicaRouter``. Everything else, including every write, keeps using the
+primary (``default``).
+
+Read-your-writes: after a user writes (``pin_primary``), their reads stay on the
+primary for ``REPLICA_STICKY_SECONDS``, which should cover the replication lag.
+The pins live in the ``REPLICA_PIN_CACHE_ALIAS`` cache. That cache is per process
+unless ``REDIS_URL`` is set, so with several workers the pins only hold within
+each worker.
+
+Fallback: when a query on a replica fails with a connection-level error, the
+replica is skipped for ``REPLICA_RETRY_INTERVAL`` seconds. The view then runs
+again on the primary, which is safe because it only reads.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+# Replica alias the current request reads from, or None for the primary
+current_replica = ContextVar('current_replica', default=None)
+
+
+class ReplicaSet:
+    """Picks a replica for a user, honouring pins and replicas that recently failed."""
+
+    def __init__(self):
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+    @staticmethod
+    def _key(user_id):
+        return f'replica-pin:{user_id}'
+
+    def available(self):
+        now = time.monotonic()
+        return [alias for alias in settings.DATABASE_REPLICAS if self._down_until.get(alias, 0) <= now]
+
+    def choose(self, user_id):
+        """Return a replica alias for ``user_id``'s reads, or None to read from the primary."""
+        aliases = self.available()
+        if not aliases or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if self.cache.get(self._key(user_id)) is not None:
+            return None
+        return random.choice(aliases)
+
+    async def achoose(self, user_id):
+        """Async version of ``choose``."""
+        aliases = self.available()
+        if not aliases or await self.cache.aget(self._key(user_id)) is not None:
+            return None
+        return random.choice(aliases)
+
+    def pin(self, user_id):
+        if settings.DATABASE_REPLICAS:
+            self.cache.set(self._key(user_id), 1, settings.REPLICA_STICKY_SECONDS)
+
+    async def apin(self, user_id):
+        if settings.DATABASE_REPLICAS:
+            await self.cache.aset(self._key(user_id), 1, settings.REPLICA_STICKY_SECONDS)
+
+    def mark_down(self, alias, error):
+        logger.warning(
+            "Read replica %r failed, reading from the primary for %ss: %s",
+            alias, settings.REPLICA_RETRY_INTERVAL, error,
+        )
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_INTERVAL
+
+    def reset(self):
+        with self._lock:
+            self._down_until.clear()
+
+
+replicas = ReplicaSet()
+
+
+def pin_primary(user_id):
+    """Keep ``user_id``'s reads on the primary for ``REPLICA_STICKY_SECONDS``, after they wrote."""
+    replicas.pin(user_id)
+
+
+async def apin_primary(user_id):
+    """Async version of ``pin_primary``."""
+    await replicas.apin(user_id)
+
+
+def replica_reads(view):
+    """
+    Run a read-only view against a replica, unless the user wrote recently.
+
+    Apply it below ``@api_view`` (or the async auth decorator), so
+    ``request.user`` is already authenticated.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = await replicas.achoose(request.user.id)
+            if alias is None:
+                return await view(request, *args, **kwargs)
+            token = current_replica.set(alias)
+            try:
+                return await view(request, *args, **kwargs)
+            except (OperationalError, InterfaceError) as e:
+                replicas.mark_down(alias, e)
+            finally:
+                current_replica.reset(token)
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = replicas.choose(request.user.id)
+        if alias is None:
+            return view(request, *args, **kwargs)
+        token = current_replica.set(alias)
+        try:
+            return view(request, *args, **kwargs)
+        except (OperationalError, InterfaceError) as e:
+            replicas.mark_down(alias, e)
+        finally:
+            current_replica.reset(token)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Sends reads inside ``replica_reads`` to the chosen replica, and all writes to the primary.
+
+    Objects loaded from a replica are written back to, and follow their
+    relations on, the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = current_replica.get()
+        if alias is not None:
+            return alias
+        return self._primary_for(hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._primary_for(hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False  # Replicas get their schema from the primary
+        return None
+
+    @staticmethod
+    def _primary_for(instance):
+        if instance is not None and instance._state.db in settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return None
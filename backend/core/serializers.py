@@ -0,0 +1,82 @@
+"""
+Read-only serializers for hot GET endpoints.
+
+A ``ValuesSerializer`` declares its output fields once. At class creation it
+builds a function that turns a row tuple into the output dict (nested dicts
+included) with ``itemgetter`` and ``zip``, so there is no per-field ``Field``
+machinery at request time. Rows come either from ``values_list()`` (``.values(queryset)``)
+or from objects that are already loaded (``.from_instance``).
+
+Datetimes are left as ``datetime`` objects for the renderer, which formats them
+like DRF's ``DateTimeField`` does with ``TIME_ZONE = 'UTC'``.
+"""
+from operator import attrgetter, itemgetter
+
+
+class ValuesSerializer:
+    """
+    Subclasses set ``fields`` to output names, in output order. An entry is either
+    a name that is also the attribute/ORM path, or ``(name, source)``. Dotted
+    names produce nested objects (``'user.id'`` -> ``{'user': {'id': ...}}``) and
+    dotted sources follow relations (``'user.username'`` -> ``user__username``).
+    """
+
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        names, sources = [], []
+        for field in cls.fields:
+            name, source = field if isinstance(field, tuple) else (field, field)
+            names.append(name)
+            sources.append(source)
+        cls.lookups = tuple(source.replace('.', '__') for source in sources)
+        cls._getter = attrgetter(*sources)
+        cls.from_row = staticmethod(_row_builder(names))
+
+    @classmethod
+    def values(cls, queryset):
+        """``values_list()`` of ``queryset`` in the order ``from_row`` expects (named rows, so paginators can read them)."""
+        return queryset.values_list(*cls.lookups, named=True)
+
+    @classmethod
+    def from_rows(cls, rows):
+        from_row = cls.from_row
+        return [from_row(row) for row in rows]
+
+    @classmethod
+    def from_instance(cls, instance):
+        row = cls._getter(instance)
+        return cls.from_row(row if len(cls.lookups) > 1 else (row,))
+
+
+def _row_builder(names):
+    """Build ``from_row(row) -> dict`` for the given (possibly dotted) output names."""
+    tree = {}
+    for index, name in enumerate(names):
+        *parents, leaf = name.split('.')
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = index
+    return _node_builder(tree)
+
+
+def _node_builder(node):
+    keys = tuple(node)
+    indexes = tuple(node.values())
+    if not any(isinstance(index, dict) for index in indexes):
+        if indexes == tuple(range(len(indexes))):
+            # The whole row, in order (every flat serializer): zip it with the keys
+            return lambda row: dict(zip(keys, row))
+        # One itemgetter picks the object's columns out of the row
+        getter = itemgetter(*indexes)
+        if len(keys) == 1:
+            key = keys[0]
+            return lambda row: {key: getter(row)}
+        return lambda row: dict(zip(keys, getter(row)))
+    parts = tuple(
+        (key, _node_builder(value) if isinstance(value, dict) else itemgetter(value))
+        for key, value in node.items()
+    )
+    return lambda row: {key: part(row) for key, part in parts}
@@ -11,10 +11,11 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
-import dj_database_url
 from pathlib import Path
 from dotenv import load_dotenv
 
+from core import db
+
 # Load environment variables from .env file if it exists
 load_dotenv()
 
@@ -51,11 +52,19 @@ INSTALLED_APPS = [
     'whitenoise.runserver_nostatic',  # Add WhiteNoise for static files
     
     # Local apps
+    'core',
     'telegram_auth',
     'game',
 ]
 
+# Load-testing and benchmark management commands (the benchmarks app); development only by default
+BENCHMARKS = os.environ.get('BENCHMARKS', str(DEBUG)) == 'True'
+if BENCHMARKS:
+    INSTALLED_APPS.append('benchmarks')
+
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',  # Per-view Prometheus metrics, served at /api/metrics/
+    'core.middleware.RequestTimingMiddleware',  # Per-request timing log
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise middleware
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -67,6 +76,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Deployment profile: 'wsgi' (gunicorn sync workers, see Procfile) or 'asgi' (uvicorn workers, see Procfile.asgi).
+# WhiteNoise is sync-only and would force every async request through a thread hop, so under ASGI
+# static files are served by core.asgi instead.
+SERVER_PROFILE = os.environ.get('SERVER_PROFILE', 'wsgi')
+if SERVER_PROFILE == 'asgi':
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 # CORS settings
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
@@ -97,22 +113,48 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Tuned SQLite by default (WAL, busy timeout, immediate transactions); see core.db
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': db.sqlite(BASE_DIR / 'db.sqlite3'),
 }
 
 # Use DATABASE_URL environment variable for database configuration if available
-# This is used by Render for PostgreSQL
+# This is used by Render for PostgreSQL (pooled with psycopg 3, sized by DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE)
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
-    DATABASES['default'] = dj_database_url.config(
-        default=DATABASE_URL,
-        conn_max_age=600,
-        conn_health_checks=True,
-    )
+    DATABASES['default'] = db.from_url(DATABASE_URL)
+
+# Read replicas for the read-only history, stats and profile endpoints (see core.replicas):
+# comma-separated database URLs, e.g. postgres://...,postgres://... or sqlite:////path/to/replica.sqlite3
+DATABASE_REPLICAS = db.replicas(os.environ.get('DATABASE_REPLICA_URLS', ''))
+DATABASES.update(DATABASE_REPLICAS)
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', '5'))  # Reads stay on the primary this long after a user writes
+REPLICA_RETRY_INTERVAL = float(os.environ.get('REPLICA_RETRY_INTERVAL', '30'))  # Seconds a failed replica is skipped
+REPLICA_PIN_CACHE_ALIAS = os.environ.get('REPLICA_PIN_CACHE_ALIAS', 'default')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default, which is per process: with several workers set REDIS_URL to share the cache
+# (the core.E001 check enforces it when DEBUG is off)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'telegram-mini-app',
+    }
+}
+
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+GAME_STATS_CACHE_ALIAS = os.environ.get('GAME_STATS_CACHE_ALIAS', 'default')
+GAME_STATS_CACHE_TIMEOUT = int(os.environ.get('GAME_STATS_CACHE_TIMEOUT', '300'))  # Seconds
 
 
 # Password validation
@@ -163,14 +205,119 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'telegram_auth.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',  # Same output as JSONRenderer, encoded with orjson
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.UserTokenBucketThrottle',
+        'core.throttling.IPTokenBucketThrottle',
+    ],
+    # Token buckets: 'N/period' allows bursts of N, refilled at N per period; empty disables a scope
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.environ.get('THROTTLE_RATE_USER', '600/min') or None,  # Per user (per IP when anonymous)
+        'ip': os.environ.get('THROTTLE_RATE_IP', '1200/min') or None,  # Per client IP, shared by users behind a NAT
+        'game_play': os.environ.get('THROTTLE_RATE_GAME_PLAY', '120/min') or None,  # Rounds played, per user
+        'game_batch': os.environ.get('THROTTLE_RATE_GAME_BATCH', '10/min') or None,  # Batch plays, per user
+        'telegram_auth': os.environ.get('THROTTLE_RATE_TELEGRAM_AUTH', '20/min') or None,  # Logins, per IP
+    },
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES') else None,  # Trusted X-Forwarded-For hops
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
 }
 
+# Throttling (see core.throttling)
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'cache')  # 'cache' (shared through THROTTLE_CACHE_ALIAS) or 'memory' (per process)
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'default')
+THROTTLE_MAX_KEYS = int(os.environ.get('THROTTLE_MAX_KEYS', '100000'))  # Buckets kept by the memory store
+
+# Token authentication cache (per process, revoked through the shared cache; see telegram_auth.authentication)
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', '10000'))
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', '60'))  # Seconds
+TOKEN_AUTH_REVOCATION_CACHE_ALIAS = os.environ.get('TOKEN_AUTH_REVOCATION_CACHE_ALIAS', 'default')  # Shared by all workers in production
+
+# Game history pagination
+GAME_HISTORY_PAGE_SIZE = int(os.environ.get('GAME_HISTORY_PAGE_SIZE', '20'))
+GAME_HISTORY_MAX_PAGE_SIZE = int(os.environ.get('GAME_HISTORY_MAX_PAGE_SIZE', '100'))
+
+# Logging
+# Records are handed to a background thread via a queue so request workers never block on I/O.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO')
+LOG_REQUEST_PAYLOADS = os.environ.get('LOG_REQUEST_PAYLOADS', 'False') == 'True'  # Dump raw auth payloads at DEBUG
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': '%(asctime)s level=%(levelname)s logger=%(name)s pid=%(process)d %(message)s',
+        },
+    },
+    'handlers': {
+        'queue': {
+            '()': 'core.log.QueueStreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'core': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        'telegram_auth': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        'game': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# Batch play
+GAME_BATCH_MAX_ROUNDS = int(os.environ.get('GAME_BATCH_MAX_ROUNDS', '100'))
+
+# Write-behind mode: rounds are logged to local segment files and written to the database in batches
+GAME_WRITE_BEHIND = os.environ.get('GAME_WRITE_BEHIND', 'False') == 'True'
+GAME_WRITE_BEHIND_DIR = os.environ.get('GAME_WRITE_BEHIND_DIR', str(BASE_DIR / 'var' / 'round-log'))
+GAME_WRITE_BEHIND_FLUSH_MS = int(os.environ.get('GAME_WRITE_BEHIND_FLUSH_MS', '200'))  # Max delay before rounds hit the database
+GAME_WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('GAME_WRITE_BEHIND_BATCH_SIZE', '500'))  # Flush early once this many rounds are queued
+GAME_WRITE_BEHIND_FSYNC = os.environ.get('GAME_WRITE_BEHIND_FSYNC', 'flush')  # 'always': fsync each round before answering
+GAME_WRITE_BEHIND_MAX_ATTEMPTS = int(os.environ.get('GAME_WRITE_BEHIND_MAX_ATTEMPTS', '5'))  # Rejections before a segment is moved aside
+
+# Game archive (see game.archive): `manage.py archive_games` moves old months of rounds to compressed files
+GAME_ARCHIVE_DIR = os.environ.get('GAME_ARCHIVE_DIR', str(BASE_DIR / 'var' / 'game-archive'))
+GAME_ARCHIVE_AFTER_MONTHS = int(os.environ.get('GAME_ARCHIVE_AFTER_MONTHS', '6'))  # Whole months kept in the database before the current one
+GAME_ARCHIVE_CACHE_BYTES = int(os.environ.get('GAME_ARCHIVE_CACHE_BYTES', str(32 * 1024 * 1024)))  # Decompressed archive data cached per process
+GAME_PARTITIONS_AHEAD = int(os.environ.get('GAME_PARTITIONS_AHEAD', '3'))  # Monthly partitions created in advance (PostgreSQL)
+
+# Game event stream (Server-Sent Events, ASGI only)
+# In-process fan-out by default; through the shared cache when REDIS_URL is set, so every worker's streams see every round
+GAME_EVENTS_BROKER = os.environ.get(
+    'GAME_EVENTS_BROKER', 'game.events.CacheBroker' if REDIS_URL else 'game.events.InMemoryBroker'
+)
+GAME_EVENTS_CACHE_ALIAS = os.environ.get('GAME_EVENTS_CACHE_ALIAS', 'default')  # CacheBroker
+GAME_EVENTS_POLL_INTERVAL = float(os.environ.get('GAME_EVENTS_POLL_INTERVAL', '1'))  # Seconds between CacheBroker polls
+GAME_EVENTS_TICKET_MAX_AGE = int(os.environ.get('GAME_EVENTS_TICKET_MAX_AGE', '30'))  # Seconds a stream ticket can open a stream
+GAME_EVENTS_HEARTBEAT = int(os.environ.get('GAME_EVENTS_HEARTBEAT', '15'))  # Seconds between keep-alive comments
+
+# Leaderboard
+LEADERBOARD_MIN_GAMES = int(os.environ.get('LEADERBOARD_MIN_GAMES', '10'))  # Games needed to rank by win rate
+LEADERBOARD_MAX_LIMIT = int(os.environ.get('LEADERBOARD_MAX_LIMIT', '100'))
+
+# Date-range statistics (summed from per-day rollups)
+GAME_STATS_MAX_RANGE_DAYS = int(os.environ.get('GAME_STATS_MAX_RANGE_DAYS', '366'))
+
+# Request metrics (Prometheus text format at /api/metrics/)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # Scrapers send "Authorization: Bearer <token>"; required when DEBUG is off (core.E002)
+
+# Probes answered in front of Django by core.fastpath (no middleware, URL resolving or DRF)
+FAST_PATHS = {
+    '/api/health-check/': 'core.probes.liveness',
+    '/api/ready/': 'core.probes.readiness',
+}
+READINESS_CACHE_TTL = float(os.environ.get('READINESS_CACHE_TTL', '5'))  # Seconds a database check is reused
+READINESS_TIMEOUT = float(os.environ.get('READINESS_TIMEOUT', '2'))  # Seconds before a hung database counts as down
+
 # Telegram Bot settings
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')  # Empty for development to skip validation
+TELEGRAM_AUTH_MAX_AGE = int(os.environ.get('TELEGRAM_AUTH_MAX_AGE', '86400'))  # Seconds before auth data expires
@@ -0,0 +1,416 @@
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework import serializers
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
+
+from . import db, metrics, probes
+from .checks import check_metrics_token, check_shared_caches
+from .fastpath import FastPathASGI, FastPathWSGI
+from .log import QueueStreamHandler
+from .replicas import ReplicaRouter, ReplicaSet, current_replica, replica_reads
+from .serializers import ValuesSerializer
+from .throttling import (
+    CacheBucketStore, IPTokenBucketThrottle, MemoryBucketStore, UserTokenBucketThrottle, _take, async_throttle,
+)
+
+
+class QueueStreamHandlerTests(SimpleTestCase):
+    def test_writes_on_the_listener_thread(self):
+        stream = io.StringIO()
+        handler = QueueStreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        handler.handle(logging.makeLogRecord({'msg': 'hello', 'levelname': 'INFO'}))
+        handler.close()
+        self.assertEqual(stream.getvalue(), 'INFO hello\n')
+
+    def test_stopping_twice_is_harmless(self):
+        # Logging configured twice: the first handler is closed, then atexit runs
+        with mock.patch('atexit.register') as register, mock.patch('atexit.unregister') as unregister:
+            handler = QueueStreamHandler(io.StringIO())
+            handler.close()
+        register.assert_called_once_with(handler.stop_listener)
+        unregister.assert_called_once_with(handler.stop_listener)
+        handler.stop_listener()
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_per_process_caches_with_several_workers(self):
+        with override_settings(DEBUG=False), mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '4'}):
+            errors = check_shared_caches(None)
+            self.assertEqual([error.id for error in errors], ['core.E001', 'core.E001'])
+            self.assertIn('GameStats cache', errors[0].msg)
+            self.assertIn('token revocation cache', errors[1].msg)
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+                self.assertEqual(check_shared_caches(None), [])
+        with override_settings(DEBUG=True), mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '4'}):
+            self.assertEqual(check_shared_caches(None), [])
+        with override_settings(DEBUG=False), mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '1'}):
+            self.assertEqual(check_shared_caches(None), [])
+
+
+class TakeTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        bucket, wait = _take(None, 2, 1.0, now=100)
+        self.assertEqual((bucket, wait), ((1, 100), 0))
+        bucket, wait = _take(bucket, 2, 1.0, now=100)
+        self.assertEqual(wait, 0)
+        bucket, wait = _take(bucket, 2, 1.0, now=100.25)
+        self.assertAlmostEqual(wait, 0.75)
+        # A second later the bucket has refilled past one token
+        _, wait = _take(bucket, 2, 1.0, now=101.25)
+        self.assertEqual(wait, 0)
+
+    def test_refill_is_capped(self):
+        bucket, _ = _take((0, 0), 3, 1.0, now=1000)
+        self.assertEqual(bucket, (2, 1000))
+
+
+class BucketStoreTests(SimpleTestCase):
+    def test_memory_store_forgets_the_oldest_bucket(self):
+        store = MemoryBucketStore(maxsize=1)
+        self.assertEqual(store.consume({'a': (1, 0.001)}), {'a': 0})
+        self.assertGreater(store.consume({'a': (1, 0.001)})['a'], 0)
+        store.consume({'b': (1, 0.001)})
+        self.assertEqual(store.consume({'a': (1, 0.001)}), {'a': 0})
+
+    def test_cache_store(self):
+        store = CacheBucketStore('default')
+        store.clear()
+        self.assertEqual(store.consume({'k': (1, 0.001)}), {'k': 0})
+        self.assertGreater(store.consume({'k': (1, 0.001)})['k'], 0)
+        self.assertGreater(asyncio.run(store.aconsume({'k': (1, 0.001)}))['k'], 0)
+
+    def test_tokens_are_only_taken_when_every_bucket_allows(self):
+        for store in (MemoryBucketStore(maxsize=10), CacheBucketStore('default')):
+            store.clear()
+            store.consume({'full': (1, 0.001)})
+            waits = store.consume({'full': (1, 0.001), 'other': (1, 0.001)})
+            self.assertGreater(waits['full'], 0)
+            self.assertEqual(waits['other'], 0)
+            self.assertEqual(store.consume({'other': (1, 0.001)}), {'other': 0})
+
+
+@override_settings(THROTTLE_ENABLED=True)
+class AsyncThrottleTests(SimpleTestCase):
+    def setUp(self):
+        store = MemoryBucketStore(maxsize=100)
+        patcher = mock.patch('core.throttling.get_store', return_value=store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        @async_throttle(UserTokenBucketThrottle, IPTokenBucketThrottle)
+        async def view(request):
+            return JsonResponse({'ok': True})
+        self.view = view
+
+    def request(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')
+        request.user = AnonymousUser()
+        return asyncio.run(self.view(request))
+
+    def test_rejects_with_retry_after(self):
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'user': '1/min', 'ip': '100/min'}):
+            self.assertEqual(self.request().status_code, 200)
+            response = self.request()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertIn('60 seconds', json.loads(response.content)['detail'])
+
+    def test_rejected_request_takes_no_tokens(self):
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'user': '1/min', 'ip': '2/min'}):
+            self.assertEqual(self.request().status_code, 200)
+            self.assertEqual(self.request().status_code, 429)
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'user': None, 'ip': '2/min'}):
+            self.assertEqual(self.request().status_code, 200)
+            self.assertEqual(self.request().status_code, 429)
+
+    def test_drf_views_check_all_buckets_together(self):
+        @api_view(['GET'])
+        @permission_classes([AllowAny])
+        @throttle_classes([UserTokenBucketThrottle, IPTokenBucketThrottle])
+        def view(request):
+            return Response({'ok': True})
+
+        def request():
+            return view(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1'))
+
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'user': '1/min', 'ip': '2/min'}):
+            self.assertEqual(request().status_code, 200)
+            response = request()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '60')
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'user': None, 'ip': '2/min'}):
+            self.assertEqual(request().status_code, 200)
+            self.assertEqual(request().status_code, 429)
+
+    def test_unset_rate_is_not_throttled(self):
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'user': None, 'ip': None}):
+            for _ in range(3):
+                self.assertEqual(self.request().status_code, 200)
+
+
+class ProbeTests(TestCase):
+    def setUp(self):
+        probes.database_check.reset()
+        self.addCleanup(probes.database_check.reset)
+        # A persistent connection (CONN_MAX_AGE > 0) stays open on the readiness thread; close it
+        self.addCleanup(lambda: probes.database_check._executor.submit(connections.close_all).result())
+
+    def test_liveness(self):
+        self.assertEqual(probes.liveness(), (200, b'{"status":"ok"}'))
+
+    def test_readiness(self):
+        status, body = probes.readiness()
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'status': 'ok', 'databases': {'default': 'ok'}})
+
+    def test_readiness_reports_a_failing_database(self):
+        with mock.patch.object(probes.DatabaseCheck, '_check', return_value={'default': 'OperationalError'}):
+            status, body = probes.readiness()
+        self.assertEqual(status, 503)
+        self.assertEqual(json.loads(body)['databases'], {'default': 'OperationalError'})
+
+    def test_result_is_cached(self):
+        with mock.patch.object(probes.DatabaseCheck, '_check', return_value={'default': None}) as check:
+            probes.readiness()
+            probes.readiness()
+        self.assertEqual(check.call_count, 1)
+
+    def test_slow_check_does_not_block_the_event_loop(self):
+        def slow_check(check):
+            time.sleep(0.2)
+            return {'default': None}
+
+        async def run():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            ticker = asyncio.ensure_future(tick())
+            status, _ = await probes.areadiness()
+            ticker.cancel()
+            return status, ticks
+
+        with mock.patch.object(probes.DatabaseCheck, '_check', slow_check):
+            status, ticks = asyncio.run(run())
+            self.assertEqual(status, 200)
+            self.assertGreater(ticks, 5)
+            # Cached now: answered without leaving the event loop
+            with mock.patch('asyncio.to_thread') as to_thread:
+                self.assertEqual(asyncio.run(probes.areadiness())[0], 200)
+            to_thread.assert_not_called()
+
+    def test_views(self):
+        self.assertEqual(self.client.get('/api/health-check/').status_code, 200)
+        self.assertEqual(self.client.head('/api/ready/').status_code, 200)
+
+
+class FastPathTests(SimpleTestCase):
+    def setUp(self):
+        self.app = mock.Mock(return_value=[b'django'])
+
+    def test_wsgi(self):
+        fast = FastPathWSGI(self.app)
+        start_response = mock.Mock()
+        body = fast({'PATH_INFO': '/api/health-check/', 'REQUEST_METHOD': 'GET'}, start_response)
+        self.assertEqual(body, [b'{"status":"ok"}'])
+        self.assertEqual(start_response.call_args[0][0], '200 OK')
+        self.assertEqual(fast({'PATH_INFO': '/api/health-check/', 'REQUEST_METHOD': 'HEAD'}, start_response), [])
+        self.app.assert_not_called()
+
+        fast({'PATH_INFO': '/api/health-check/', 'REQUEST_METHOD': 'POST'}, start_response)
+        fast({'PATH_INFO': '/api/game/stats/', 'REQUEST_METHOD': 'GET'}, start_response)
+        self.assertEqual(self.app.call_count, 2)
+
+    def test_asgi(self):
+        async def application(scope, receive, send):
+            await send({'type': 'passed-through'})
+        fast = FastPathASGI(application)
+
+        async def call(path, method='GET'):
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+            await fast({'type': 'http', 'path': path, 'method': method}, None, send)
+            return sent
+
+        # A probe with an async version is awaited instead of called
+        readiness = mock.Mock(return_value=(200, b'{}'), aprobe=mock.AsyncMock(return_value=(503, b'{}')))
+        fast.probes['/api/ready/'] = readiness
+        self.assertEqual(asyncio.run(call('/api/ready/'))[0]['status'], 503)
+        readiness.assert_not_called()
+
+        sent = asyncio.run(call('/api/health-check/'))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(sent[1]['body'], b'{"status":"ok"}')
+        self.assertEqual(asyncio.run(call('/api/health-check/', 'HEAD'))[1]['body'], b'')
+        self.assertEqual(asyncio.run(call('/api/game/stats/')), [{'type': 'passed-through'}])
+
+
+@override_settings(DATABASE_REPLICAS={'replica1': {}}, REPLICA_STICKY_SECONDS=60, REPLICA_RETRY_INTERVAL=60)
+class ReplicaTests(SimpleTestCase):
+    # Not TestCase: choose() keeps reads on the primary inside a transaction
+    def setUp(self):
+        self.replicas = ReplicaSet()
+        self.replicas.cache.clear()
+        self.router = ReplicaRouter()
+
+    def test_choose_pin_and_mark_down(self):
+        self.assertEqual(self.replicas.choose(1), 'replica1')
+        self.replicas.pin(1)
+        self.assertIsNone(self.replicas.choose(1))
+        self.assertEqual(self.replicas.choose(2), 'replica1')
+        self.replicas.mark_down('replica1', OperationalError('gone'))
+        self.assertIsNone(self.replicas.choose(2))
+        self.replicas.reset()
+        self.assertEqual(asyncio.run(self.replicas.achoose(2)), 'replica1')
+
+    def test_router(self):
+        self.assertIsNone(self.router.db_for_read(User))
+        token = current_replica.set('replica1')
+        try:
+            self.assertEqual(self.router.db_for_read(User), 'replica1')
+            self.assertIsNone(self.router.db_for_write(User))
+        finally:
+            current_replica.reset(token)
+
+        user = User(username='replicated')
+        user._state.db = 'replica1'
+        self.assertEqual(self.router.db_for_write(User, instance=user), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(User, instance=user), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate('replica1', 'game'))
+        self.assertIsNone(self.router.allow_migrate('default', 'game'))
+
+    def test_failing_replica_falls_back_to_the_primary(self):
+        calls = []
+
+        @replica_reads
+        def view(request):
+            calls.append(current_replica.get())
+            if current_replica.get() is not None:
+                raise OperationalError('replica down')
+            return 'primary'
+
+        request = RequestFactory().get('/')
+        request.user = User(id=3)
+        with mock.patch('core.replicas.replicas', self.replicas):
+            self.assertEqual(view(request), 'primary')
+            self.assertEqual(view(request), 'primary')
+        self.assertEqual(calls, ['replica1', None, None])
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def test_sqlite(self):
+        config = db.sqlite('/tmp/app.sqlite3')
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL', config['OPTIONS']['init_command'])
+        self.assertEqual(db.from_url('sqlite:////tmp/app.sqlite3'), config)
+
+    @mock.patch.dict('os.environ', {'DB_POOL': 'True', 'DB_POOL_MAX_SIZE': '4'})
+    def test_postgres_is_pooled(self):
+        config = db.from_url('postgres://u:p@db:5432/app')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 4)
+
+    @mock.patch.dict('os.environ', {'DB_POOL': 'False'})
+    def test_postgres_without_pool(self):
+        config = db.from_url('postgres://u:p@db:5432/app')
+        self.assertEqual(config['CONN_MAX_AGE'], 600)
+        self.assertNotIn('pool', config.get('OPTIONS', {}))
+
+    def test_replicas(self):
+        aliases = db.replicas(' postgres://u:p@r1/app, ,postgres://u:p@r2/app')
+        self.assertEqual(list(aliases), ['replica1', 'replica2'])
+        self.assertEqual(aliases['replica2']['HOST'], 'r2')
+        self.assertEqual(aliases['replica1']['TEST'], {'MIRROR': 'default'})
+        self.assertEqual(db.replicas(''), {})
+
+
+class TagSerializer(metrics.TimedSerializerMixin, serializers.Serializer):
+    name = serializers.CharField()
+
+
+class NameSerializer(metrics.TimedSerializerMixin, serializers.Serializer):
+    name = serializers.CharField()
+    tags = TagSerializer(many=True)
+
+
+class RequestMetricsTests(TestCase):
+    def test_registry_merges_thread_shards(self):
+        registry = metrics.Registry()
+        stats = metrics.RequestStats()
+        stats.queries, stats.db_time = 2, 0.003
+        thread = threading.Thread(target=registry.observe_request, args=('v', 'GET', 200, 0.02, stats, 100))
+        thread.start()
+        thread.join()
+        registry.observe_request('v', 'GET', 200, 0.2, stats, None)
+        text = registry.render()
+        self.assertIn('http_requests_total{view="v",method="GET",status="200"} 2', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="v",method="GET",le="0.025"} 1', text)
+        self.assertIn('http_request_db_queries_sum{view="v",method="GET"} 4', text)
+        self.assertIn('http_response_size_bytes_count{view="v",method="GET"} 1', text)
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get('/api/game/stats/')
+        text = self.client.get('/api/metrics/').content.decode()
+        self.assertRegex(text, r'http_requests_total\{view="game-stats",method="GET",status="401"\} \d+')
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+
+    def test_token_is_required_in_production(self):
+        with override_settings(DEBUG=False, METRICS_TOKEN=''):
+            self.assertEqual([error.id for error in check_metrics_token(None)], ['core.E002'])
+        with override_settings(DEBUG=False, METRICS_TOKEN='scrape'):
+            self.assertEqual(check_metrics_token(None), [])
+        with override_settings(DEBUG=True, METRICS_TOKEN=''):
+            self.assertEqual(check_metrics_token(None), [])
+
+    def test_serializer_time(self):
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        try:
+            self.assertTrue(NameSerializer(data={'name': 'a', 'tags': [{'name': 'b'}]}).is_valid())
+            validated = stats.serializer_time
+            self.assertGreater(validated, 0)
+            self.assertEqual(len(NameSerializer([{'name': 'a', 'tags': []}] * 2, many=True).data), 2)
+            self.assertGreater(stats.serializer_time, validated)
+        finally:
+            metrics.current_request.reset(token)
+        self.assertEqual(stats.serializer_depth, 0)
+
+
+class AccountSerializer(ValuesSerializer):
+    fields = ('id', ('account.name', 'username'), ('account.email', 'email'))
+
+
+class UsernameSerializer(ValuesSerializer):
+    fields = ('username',)
+
+
+class ValuesSerializerTests(TestCase):
+    def test_rows_and_instances(self):
+        user = User.objects.create_user('values', email='values@example.com')
+        expected = {'id': user.id, 'account': {'name': 'values', 'email': 'values@example.com'}}
+        self.assertEqual(AccountSerializer.from_rows(AccountSerializer.values(User.objects.all())), [expected])
+        self.assertEqual(AccountSerializer.from_instance(user), expected)
+        self.assertEqual(UsernameSerializer.from_instance(user), {'username': 'values'})
@@ -0,0 +1,243 @@
+"""
+Token-bucket throttling for DRF views and the async views.
+
+Rates use DRF's syntax and live in ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``
+(``'120/min'``). A bucket holds up to ``num`` tokens and refills continuously at
+``num`` per period, so a client may burst ``num`` requests and then sustain the
+rate, instead of DRF's fixed window that stores a timestamp per request.
+
+Buckets live in the store chosen by ``THROTTLE_STORE``:
+
+- ``'cache'`` (default): the Django cache ``THROTTLE_CACHE_ALIAS`` (Redis in
+  production), shared by all processes. The read and write are not atomic, so
+  concurrent requests of one client can occasionally both take the last token.
+- ``'memory'``: a per-process LRU dict of at most ``THROTTLE_MAX_KEYS`` buckets
+  behind a lock. Each process enforces the limit on its own, so with several
+  workers a client gets the rate once per worker.
+
+All the buckets of a request (one per throttle class of the view) are checked
+together, and tokens are only taken when every bucket allows the request: a
+request rejected by one limit does not use up the others. A check is one lookup
+and one write of all the buckets. A throttled request is answered with 429 and
+``Retry-After`` before the view runs and never touches the database.
+"""
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def _take(bucket, capacity, rate, now):
+    """
+    Refill ``bucket`` (``(tokens, timestamp)`` or None for a full one) and take a token.
+
+    Returns the new bucket and the seconds to wait before retrying (0 when allowed).
+    """
+    if bucket is None:
+        tokens = capacity
+    else:
+        tokens, last = bucket
+        tokens = min(capacity, tokens + (now - last) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+
+def _take_all(buckets, limits, now):
+    """
+    Apply ``_take`` to each bucket, given ``{key: bucket}`` and ``{key: (capacity, rate)}``.
+
+    Returns the new buckets, or None when a bucket has no token, and ``{key: wait}``.
+    """
+    taken, waits = {}, {}
+    for key, (capacity, rate) in limits.items():
+        taken[key], waits[key] = _take(buckets.get(key), capacity, rate, now)
+    return (None if any(waits.values()) else taken), waits
+
+
+class MemoryBucketStore:
+    """Thread-safe LRU dict of token buckets, local to the process."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, limits):
+        """Take a token from each bucket in ``{key: (capacity, rate)}`` if all have one; return ``{key: wait}``."""
+        with self._lock:
+            taken, waits = _take_all(self._buckets, limits, time.monotonic())
+            for key, bucket in (taken or {}).items():
+                self._buckets[key] = bucket
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                # The least recently seen client; forgetting it only refills its bucket
+                self._buckets.popitem(last=False)
+        return waits
+
+    async def aconsume(self, limits):
+        return self.consume(limits)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets in Django's cache framework, shared by every process using the cache."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def _timeout(limits):
+        # An untouched bucket is full again after capacity / rate seconds and can expire
+        return max(math.ceil(capacity / rate) for capacity, rate in limits.values()) + 1
+
+    def consume(self, limits):
+        """Take a token from each bucket in ``{key: (capacity, rate)}`` if all have one; return ``{key: wait}``."""
+        taken, waits = _take_all(self.cache.get_many(limits), limits, time.time())
+        if taken:
+            self.cache.set_many(taken, self._timeout(limits))
+        return waits
+
+    async def aconsume(self, limits):
+        taken, waits = _take_all(await self.cache.aget_many(limits), limits, time.time())
+        if taken:
+            await self.cache.aset_many(taken, self._timeout(limits))
+        return waits
+
+    def clear(self):
+        self.cache.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the bucket store configured by ``THROTTLE_STORE``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.THROTTLE_STORE == 'cache':
+                    _store = CacheBucketStore(settings.THROTTLE_CACHE_ALIAS)
+                else:
+                    _store = MemoryBucketStore(settings.THROTTLE_MAX_KEYS)
+    return _store
+
+
+def _limits(throttles, request, view):
+    limits = {}
+    for throttle in throttles:
+        key = throttle._key(request, view)
+        if key is not None:
+            limits[key] = (throttle.num_requests, throttle.num_requests / throttle.duration)
+    return limits
+
+
+def _set_waits(throttles, request, view, waits):
+    for throttle in throttles:
+        throttle._wait = waits.get(throttle._key(request, view), 0)
+
+
+def check_throttles(throttles, request, view=None):
+    """Check the buckets of all ``throttles`` together, taking tokens only if each allows the request."""
+    limits = _limits(throttles, request, view)
+    _set_waits(throttles, request, view, get_store().consume(limits) if limits else {})
+
+
+async def acheck_throttles(throttles, request, view=None):
+    """Async version of ``check_throttles``."""
+    limits = _limits(throttles, request, view)
+    _set_waits(throttles, request, view, await get_store().aconsume(limits) if limits else {})
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Base class: subclasses set ``scope`` and implement ``get_cache_key``.
+
+    Works with DRF requests and plain Django requests (see ``async_throttle``), as
+    it only reads ``request.user`` and ``request.META``. A scope whose rate is
+    None is not throttled, and ``THROTTLE_ENABLED = False`` turns off every scope.
+
+    DRF asks each throttle of a view in turn, so the first one asked checks the
+    buckets of all the view's token-bucket throttles and the others read their
+    result from the request.
+    """
+
+    def allow_request(self, request, view):
+        waits = getattr(request, '_token_bucket_waits', None)
+        if waits is None:
+            throttles = [self]
+            if view is not None:
+                throttles += [t for t in view.get_throttles() if isinstance(t, TokenBucketThrottle)]
+            check_throttles(throttles, request, view)
+            waits = {type(throttle): throttle._wait for throttle in throttles}
+            request._token_bucket_waits = waits
+        self._wait = waits.get(type(self), 0)
+        return self._wait == 0
+
+    def _key(self, request, view):
+        if self.rate is None or not settings.THROTTLE_ENABLED:
+            return None
+        return self.get_cache_key(request, view)
+
+    def wait(self):
+        return self._wait
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Limits each authenticated user, and anonymous requests per client IP."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Limits each client IP (``REMOTE_ADDR``, or ``X-Forwarded-For`` with ``NUM_PROXIES``)."""
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+def async_throttle(*throttle_classes):
+    """
+    Throttle an async view with the given classes, answering 429 like DRF.
+
+    Apply it inside ``async_token_required`` so ``request.user`` is set.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            throttles = [throttle_class() for throttle_class in throttle_classes]
+            await acheck_throttles(throttles, request)
+            waits = [throttle.wait() for throttle in throttles if throttle.wait()]
+            if waits:
+                wait = math.ceil(max(waits))
+                response = JsonResponse(
+                    {'detail': f'Request was throttled. Expected available in {wait} second{"s" if wait != 1 else ""}.'},
+                    status=429,
+                )
+                response['Retry-After'] = str(wait)
+                return response
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
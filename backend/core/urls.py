@@ -14,22 +14,33 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import hmac
+
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from django.http import JsonResponse
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from core import probes
+from core.metrics import registry
 
-@api_view(['GET', 'HEAD'])
-@permission_classes([AllowAny])
-def health_check(request):
-    """Simple health check endpoint that returns a 200 OK response."""
-    return JsonResponse({"status": "ok"}, status=200)
+@require_GET
+def metrics(request):
+    """Per-process request metrics in Prometheus text format."""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include([
-        path('health-check/', health_check, name='health-check'),
+        # Normally answered by core.fastpath before Django; these routes serve the test client or FAST_PATHS = {}
+        path('health-check/', probes.as_view(probes.liveness), name='health-check'),
+        path('ready/', probes.as_view(probes.readiness), name='readiness'),
+        path('metrics/', metrics, name='metrics'),
         path('auth/', include('telegram_auth.urls')),
         path('game/', include('game.urls')),
     ])),
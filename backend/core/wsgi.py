@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Replay rounds that a previous worker queued but never flushed before serving new ones
+if settings.GAME_WRITE_BEHIND:
+    from game.writebehind import get_round_log
+    get_round_log()
+
+# Health probes are answered before Django's handler (see core.fastpath)
+if settings.FAST_PATHS:
+    from core.fastpath import FastPathWSGI
+    application = FastPathWSGI(application)
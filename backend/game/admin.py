@@ -1,13 +1,21 @@
 from django.contrib import admin
-from .models import Game, GameStats
+from .models import DailyStats, Game, GameStats
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'user_choice', 'computer_choice', 'result', 'status', 'created_at')
     list_filter = ('status', 'result', 'created_at')
     search_fields = ('user__username',)
+    # Counting every round on each page load gets slow on a large (partitioned) table
+    show_full_result_count = False
 
 @admin.register(GameStats)
 class GameStatsAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'total_games', 'wins', 'losses', 'draws')
     search_fields = ('user__username',)
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'day', 'total_games', 'wins', 'losses', 'draws')
+    list_filter = ('day',)
+    search_fields = ('user__username',)
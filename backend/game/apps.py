@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class GameConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'game'
+
+    def ready(self):
+        from core.metrics import registry
+        from .cache import stats_cache
+
+        registry.register_collector(stats_cache_metrics(stats_cache))
+
+
+def stats_cache_metrics(cache):
+    """Expose the GameStats cache counters on /api/metrics/."""
+    def collect():
+        metrics = cache.metrics()
+        return [
+            ('game_stats_cache_hits_total', 'counter', 'GameStats cache reads served from the cache.', metrics['hits']),
+            ('game_stats_cache_misses_total', 'counter', 'GameStats cache reads that fell back to the database.', metrics['misses']),
+            ('game_stats_cache_hit_ratio', 'gauge', 'Share of GameStats cache reads served from the cache.', metrics['hit_ratio']),
+        ]
+    return collect
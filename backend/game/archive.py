@@ -0,0 +1,344 @@
+"""
+Cold storage for old game rounds.
+
+``archive_month`` moves one calendar month (UTC) of rounds out of the database
+into ``GAME_ARCHIVE_DIR``. Each archived month has two files:
+
+- ``games-YYYY-MM-<digest>.ndjson.gz``: the rounds as NDJSON, with the same
+  objects as the history API and the export. Each user's rounds are stored
+  newest first in their own gzip member, so reading one user's month only
+  decompresses their rows. ``zcat`` still reads the file as a whole.
+- ``games-YYYY-MM.json``: the index. For each user it holds the byte offset and
+  length of their member, the number of rounds, and their newest and oldest
+  ``created_at``.
+
+The index is replaced last, and it names its data file. A reader therefore
+always sees a complete month. Archiving a month that already has an archive
+merges the rows, deduplicated by id. That makes the job safe to re-run after a
+crash, and it also absorbs rows that arrived late (e.g. write-behind replays).
+GameStats and DailyStats are not touched: they already count every round.
+
+``game_archive`` reads the archive for ``game.pagination`` and ``game.export``,
+so history reads span the database and the archive. Decoded user-months are
+kept in an LRU cache bounded by ``GAME_ARCHIVE_CACHE_BYTES`` of decompressed
+data; a block larger than a quarter of that is decoded on every read instead of
+pushing everything else out.
+"""
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+
+from . import partitions
+from .export import COLUMNS, EXPORT_FIELDS, _datetime
+from .models import Game
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = '.json'
+DELETE_BATCH_SIZE = 500
+RESCAN_INTERVAL = 5.0  # Seconds between checks for months archived by another process
+
+
+def _key(row):
+    """Sort key of an archived row: ``(created_at, id)``, like the history ordering."""
+    return datetime.fromisoformat(row['created_at']), row['id']
+
+
+class MonthIndex:
+    """The index of one archived month."""
+
+    def __init__(self, directory, data):
+        self.month = tuple(int(part) for part in data['month'].split('-'))
+        self.path = os.path.join(directory, data['data'])
+        self.rows = data['rows']
+        self.users = {
+            int(user_id): (offset, length, count, datetime.fromisoformat(newest), datetime.fromisoformat(oldest))
+            for user_id, (offset, length, count, newest, oldest) in data['users'].items()
+        }
+
+
+def _decode_block(path, offset, length):
+    """One user's rows of a month, newest first, as ``(key, row)`` pairs, and their decompressed size."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = gzip.decompress(f.read(length))
+    rows = [json.loads(line) for line in data.splitlines()]
+    return tuple((_key(row), row) for row in rows), len(data)
+
+
+class BlockCache:
+    """Thread-safe LRU cache of decoded blocks, bounded by their total decompressed size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._blocks = OrderedDict()  # (path, offset, length) -> (rows, size)
+        self._lock = threading.Lock()
+
+    def get(self, path, offset, length):
+        key = (path, offset, length)
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None:
+                self._blocks.move_to_end(key)
+                return entry[0]
+        rows, size = _decode_block(path, offset, length)
+        if size > self.max_bytes // 4:
+            return rows
+        with self._lock:
+            if key not in self._blocks:
+                self._blocks[key] = (rows, size)
+                self.size += size
+                while self.size > self.max_bytes:
+                    self.size -= self._blocks.popitem(last=False)[1][1]
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._blocks)
+
+
+_block_cache = BlockCache(settings.GAME_ARCHIVE_CACHE_BYTES)
+_read_block = _block_cache.get
+
+
+class GameArchive:
+    """Reads archived months from a directory, picking up new archives as they appear."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._months = ()  # MonthIndex, newest month first
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def months(self):
+        now = time.monotonic()
+        if now - self._checked_at >= RESCAN_INTERVAL:
+            with self._lock:
+                if now - self._checked_at >= RESCAN_INTERVAL:
+                    self._rescan()
+                    self._checked_at = now
+        return self._months
+
+    def _rescan(self):
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith(INDEX_SUFFIX))
+        except FileNotFoundError:
+            names = []
+        signature = []
+        for name in names:
+            try:
+                signature.append((name, os.stat(os.path.join(self.directory, name)).st_mtime_ns))
+            except FileNotFoundError:
+                pass
+        if signature == self._signature:
+            return
+        months = []
+        for name, _ in signature:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    months.append(MonthIndex(self.directory, json.load(f)))
+            except FileNotFoundError:
+                pass
+        self._months = tuple(sorted(months, key=lambda index: index.month, reverse=True))
+        self._signature = signature
+
+    def refresh(self):
+        """Rescan the directory on the next read."""
+        self._checked_at = 0.0
+
+    def month(self, year, month):
+        for index in self.months():
+            if index.month == (year, month):
+                return index
+        return None
+
+    def has_user(self, user_id):
+        return any(user_id in index.users for index in self.months())
+
+    def archived_until(self):
+        """Start of the month after the newest archived month, or None without archives."""
+        months = self.months()
+        if not months:
+            return None
+        return partitions.month_range(*months[0].month)[1]
+
+    def _block(self, index, user_id):
+        offset, length = index.users[user_id][:2]
+        try:
+            return _read_block(index.path, offset, length)
+        except FileNotFoundError:
+            # The month was archived again since its index was loaded
+            self.refresh()
+            current = self.month(*index.month)
+            if current is None or current.path == index.path or user_id not in current.users:
+                raise
+            offset, length = current.users[user_id][:2]
+            return _read_block(current.path, offset, length)
+
+    def rows(self, user_id):
+        """Yield a user's archived rows, newest first."""
+        for index in self.months():
+            if user_id in index.users:
+                for _, row in self._block(index, user_id):
+                    yield row
+
+    def page(self, user_id, descending, position=None, bound=None, limit=20):
+        """
+        Up to ``limit`` of a user's archived rows after ``position`` in walk order.
+
+        Rows are ``(key, row)`` pairs, where ``key`` is ``(created_at, id)``. With
+        ``descending``, they are the rows older than ``position``, newest first;
+        otherwise the rows newer than ``position``, oldest first. Months entirely
+        beyond ``bound`` (a key the caller has enough rows before) are not read.
+        """
+        months = self.months() if descending else reversed(self.months())
+        page = []
+        for index in months:
+            entry = index.users.get(user_id)
+            if entry is None:
+                continue
+            newest, oldest = entry[3], entry[4]
+            if descending:
+                if position is not None and oldest > position[0]:
+                    continue
+                if bound is not None and newest < bound[0]:
+                    break
+                rows = self._block(index, user_id)
+                page.extend(item for item in rows if position is None or item[0] < position)
+            else:
+                if position is not None and newest < position[0]:
+                    continue
+                if bound is not None and oldest > bound[0]:
+                    break
+                rows = reversed(self._block(index, user_id))
+                page.extend(item for item in rows if position is None or item[0] > position)
+            if len(page) >= limit:
+                break
+        return page[:limit]
+
+
+game_archive = GameArchive(settings.GAME_ARCHIVE_DIR)
+
+
+def _database_rows(year, month):
+    """The month's rows in the database, grouped by user: ``(user_id, [row, ...])`` ascending by user."""
+    start, end = partitions.month_range(year, month)
+    rows = (
+        Game.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by('user_id', '-created_at', '-id')
+        .values_list(*COLUMNS)
+        .iterator(chunk_size=2000)
+    )
+    for user_id, group in itertools.groupby(rows, key=lambda row: row[1]):
+        yield user_id, [
+            dict(zip(EXPORT_FIELDS, (*row[:6], _datetime(row[6]), _datetime(row[7])))) for row in group
+        ]
+
+
+def _archived_rows(index):
+    """An archived month's rows, grouped by user like ``_database_rows``."""
+    if index is None:
+        return
+    for user_id in sorted(index.users):
+        offset, length = index.users[user_id][:2]
+        # Not through the cache: the job reads every block once
+        yield user_id, [row for _, row in _decode_block(index.path, offset, length)[0]]
+
+
+def _write_month(directory, year, month, groups):
+    """Write a month's data file and index from ``(user_id, rows)`` groups; return the new index."""
+    os.makedirs(directory, exist_ok=True)
+    label = f'{year:04d}-{month:02d}'
+    temp_path = os.path.join(directory, f'.games-{label}.{os.getpid()}.tmp')
+    digest = hashlib.sha256()
+    users = {}
+    total = 0
+    with open(temp_path, 'wb') as f:
+        for user_id, rows in groups:
+            body = ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in rows).encode()
+            member = gzip.compress(body, compresslevel=6, mtime=0)
+            digest.update(member)
+            users[str(user_id)] = [f.tell(), len(member), len(rows), rows[0]['created_at'], rows[-1]['created_at']]
+            f.write(member)
+            total += len(rows)
+        f.flush()
+        os.fsync(f.fileno())
+
+    data_name = f'games-{label}-{digest.hexdigest()[:12]}.ndjson.gz'
+    os.replace(temp_path, os.path.join(directory, data_name))
+    index = {'month': label, 'data': data_name, 'rows': total, 'users': users}
+    index_path = os.path.join(directory, f'games-{label}{INDEX_SUFFIX}')
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(index_path + '.tmp', index_path)
+    return MonthIndex(directory, index)
+
+
+def _merge(archived, database, ids):
+    """Merge two grouped streams, deduplicating rows by id; the ids of database rows go to ``ids``."""
+    streams = [
+        ((user_id, 0, rows) for user_id, rows in archived),
+        ((user_id, 1, rows) for user_id, rows in database),
+    ]
+    for user_id, groups in itertools.groupby(heapq.merge(*streams), key=lambda group: group[0]):
+        by_id = {}
+        for _, source, rows in groups:
+            for row in rows:
+                by_id[row['id']] = row  # Database rows come second and win
+                if source:
+                    ids.append(row['id'])
+        yield user_id, sorted(by_id.values(), key=_key, reverse=True)
+
+
+def archive_month(year, month, directory=None):
+    """
+    Move a month of rounds from the database into the archive.
+
+    Returns ``(archived, deleted)``: the rows now in the month's archive and the
+    rows removed from the database. Rows that arrive while the month is being
+    written stay in the database until the next run.
+    """
+    directory = directory or settings.GAME_ARCHIVE_DIR
+    archive = GameArchive(directory)
+    archive.refresh()
+    previous = archive.month(year, month)
+    start, end = partitions.month_range(year, month)
+    if not Game.objects.filter(created_at__gte=start, created_at__lt=end).exists():
+        partitions.drop_partition(year, month, expected_rows=0)
+        return (previous.rows if previous else 0), 0
+
+    ids = []
+    index = _write_month(directory, year, month, _merge(_archived_rows(previous), _database_rows(year, month), ids))
+    if previous is not None and previous.path != index.path:
+        os.remove(previous.path)
+    game_archive.refresh()
+
+    deleted = 0
+    if ids and partitions.drop_partition(year, month, expected_rows=len(ids)):
+        deleted = len(ids)
+    elif ids:
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            # Nothing references games, so this is a single DELETE per batch
+            deleted += Game.objects.filter(
+                created_at__gte=start, created_at__lt=end, id__in=ids[i:i + DELETE_BATCH_SIZE],
+            ).delete()[0]
+    logger.info("Archived %s rounds of %04d-%02d, deleted %s from the database", index.rows, year, month, deleted)
+    return index.rows, deleted
@@ -0,0 +1,242 @@
+"""
+ASGI-native async views for the Telegram Mini App Game API.
+
+These mirror the sync DRF views in `game.views` but run directly on the event
+loop under ASGI, using Django's async ORM and the cache backend's async API,
+so most requests never need a thread-pool hop. Request and response bodies,
+status codes and error bodies (``{"detail": ...}``) match the sync endpoints.
+
+API Endpoints:
+- `POST /api/game/async/play/` → Plays a new game and returns the result.
+- `GET /api/game/async/history/` → Retrieves the user's game history (cursor-paginated).
+- `GET /api/game/async/stats/` → Retrieves the user's game statistics.
+- `GET /api/game/events/` → Server-Sent Events stream of the user's game results and stats deltas.
+  (The ticket opening it comes from the sync `POST /api/game/events/ticket/`.)
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from core.replicas import apin_primary, replica_reads
+from core.throttling import IPTokenBucketThrottle, UserTokenBucketThrottle, async_throttle
+from telegram_auth.authentication import aauthenticate, async_token_required
+
+from .archive import game_archive
+from .cache import stats_cache
+from .engine import RPS
+from .events import apublish_games, get_broker, read_ticket, user_channel
+from .models import DailyStats, Game, GameStats
+from .pagination import GameHistoryPagination, InvalidCursor
+from .serializers import GameReadSerializer, GameSerializer, GameStatsReadSerializer
+from .throttling import GamePlayThrottle
+from .writebehind import get_round_log, new_game
+
+
+def _error(message, status=400):
+    # DRF's error shape, like the sync views' exceptions
+    return JsonResponse({"detail": message}, status=status)
+
+
+@sync_to_async
+def _save_round(user, user_choice, computer_choice, result):
+    """Insert the round and count it in GameStats and DailyStats, in one transaction."""
+    with transaction.atomic():
+        # Stats row first: its lock orders the user's game ids by commit (see game_events)
+        GameStats.record_result(user, result)
+        game = Game.objects.create(
+            user=user,
+            user_choice=user_choice,
+            computer_choice=computer_choice,
+            result=result,
+            status='completed',
+        )
+        DailyStats.record_games(user, [game])
+    return game
+
+
+async def _stats_snapshot(user):
+    """
+    The user's GameStats from the primary, annotated with ``last_game_id``:
+    the newest round the counters include, read in the same statement.
+    """
+    latest = Game.objects.filter(user=OuterRef('user')).order_by('-id').values('id')[:1]
+    stats = await GameStats.objects.filter(user=user).annotate(last_game_id=Subquery(latest)).afirst()
+    if stats is None:
+        stats, created = await GameStats.objects.aget_or_create(user=user)
+        stats.last_game_id = None
+    return stats
+
+
+# Play Game API
+@csrf_exempt
+@require_POST
+@async_token_required
+@async_throttle(GamePlayThrottle, UserTokenBucketThrottle, IPTokenBucketThrottle)
+async def play_game(request):
+    """
+    Play a game of rock-paper-scissors.
+    
+    The game INSERT and the stats UPDATEs run in one transaction on a worker
+    thread (the async ORM has no transaction support yet).
+    
+    Request Body:
+        - user_choice (str): Player's choice ('rock', 'paper', or 'scissors')
+        
+    Returns:
+        - 200 OK: Game played successfully, returns game details including result
+        - 400 Bad Request: Invalid user choice or other validation error
+        - 429 Too Many Requests: Too many rounds played; retry after `Retry-After` seconds
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except json.JSONDecodeError as e:
+        return _error(f"JSON parse error - {e}")
+    
+    serializer = GameSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    
+    computer_choice = RPS.random_move()
+    user_choice = serializer.validated_data['user_choice']
+    result = Game.resolve(user_choice, computer_choice)
+    await apin_primary(request.user.id)  # Replicas may not have this round yet
+    
+    if settings.GAME_WRITE_BEHIND:
+        # Appending to the log is a short local write, fine to do on the event loop
+        game = new_game(request.user, user_choice, computer_choice, result)
+        get_round_log().append([game])
+        data = GameSerializer(game).data
+        await apublish_games(request.user.id, [data], {result: 1})
+        return JsonResponse(data)
+    
+    game = await _save_round(request.user, user_choice, computer_choice, result)
+    await stats_cache.aapply_results(request.user.id, {result: 1})
+    
+    data = GameSerializer(game).data
+    await apublish_games(request.user.id, [data], {result: 1})
+    return JsonResponse(data)
+
+
+# Game History API
+@require_GET
+@async_token_required
+@async_throttle(UserTokenBucketThrottle, IPTokenBucketThrottle)
+@replica_reads
+async def get_game_history(request):
+    """
+    Get user's game history, one page at a time.
+    
+    Query Parameters:
+        - cursor (str, optional): Opaque cursor taken from a previous response's `next`/`previous`
+        - page_size (int, optional): Number of games per page (capped by GAME_HISTORY_MAX_PAGE_SIZE)
+    
+    Returns:
+        - 200 OK: Returns `next`, `previous` and `results`, newest game first, archived rounds included
+        - 400 Bad Request: Invalid cursor
+    """
+    try:
+        paginator = GameHistoryPagination(request.GET)
+    except InvalidCursor as e:
+        return _error(str(e))
+    
+    games = paginator.filter(Game.objects.filter(user=request.user))
+    rows = [row async for row in GameReadSerializer.values(games)]
+    results = GameReadSerializer.from_rows(rows)
+    if game_archive.has_user(request.user.id):
+        # Archived rows are read from compressed files: keep that off the event loop
+        await asyncio.to_thread(paginator.paginate, request.user.id, rows, results)
+    else:
+        paginator.paginate(request.user.id, rows, results)
+    return JsonResponse(paginator.get_paginated_data(request.build_absolute_uri()))
+
+
+# Game Statistics API
+@require_GET
+@async_token_required
+@async_throttle(UserTokenBucketThrottle, IPTokenBucketThrottle)
+@replica_reads
+async def get_game_stats(request):
+    """
+    Get user's game statistics.
+    
+    Returns:
+        - 200 OK: Returns user's game statistics (total games, wins, losses, draws, win percentage)
+    """
+    stats = await stats_cache.aget(request.user)
+    return JsonResponse(GameStatsReadSerializer.from_instance(stats))
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Game Events API
+@require_GET
+async def game_events(request):
+    """
+    Stream the user's game results and stats deltas as Server-Sent Events.
+    
+    Browsers' EventSource cannot send headers, so the stream may also be opened
+    with a short-lived `ticket` query parameter from `POST /api/game/events/ticket/`.
+    Requires the ASGI deployment profile.
+    
+    Events:
+        - `stats`: Full game statistics plus `last_game_id`, the newest round they include;
+          sent once when the stream opens
+        - `game`: `{"games": [...], "stats_delta": {...}}` after every play or batch. A `game`
+          event whose game ids are all at most the snapshot's `last_game_id` is already
+          counted in the snapshot and should be dropped
+        - Comment lines every GAME_EVENTS_HEARTBEAT seconds keep proxies from closing the stream
+    
+    Returns:
+        - 200 OK: `text/event-stream` response
+        - 401 Unauthorized: Missing or invalid token, or invalid or expired ticket
+        - 501 Not Implemented: Served through WSGI
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would be buffered forever and pin a worker
+        return _error("The event stream requires the ASGI server profile", status=501)
+    
+    user = await aauthenticate(request)
+    if user is None and request.GET.get('ticket'):
+        user_id = read_ticket(request.GET['ticket'])
+        if user_id is not None:
+            user = await User.objects.filter(pk=user_id, is_active=True).afirst()
+    if user is None:
+        response = JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        response['WWW-Authenticate'] = 'Token'
+        return response
+    
+    async def stream():
+        # Subscribe before reading the snapshot so no round falls between the two
+        subscription = await get_broker().subscribe(user_channel(user.id))
+        try:
+            # Not from stats_cache: the counters and last_game_id must come from one read
+            stats = await _stats_snapshot(user)
+            yield _sse('stats', {
+                **GameStatsReadSerializer.from_instance(stats),
+                'last_game_id': stats.last_game_id,
+            })
+            while True:
+                try:
+                    event = await subscription.get(timeout=settings.GAME_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield _sse('game', event)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
@@ -0,0 +1,185 @@
+"""
+Read-through cache for GameStats.
+
+Each counter is stored under its own key so a played round can bump the cached
+values in place with atomic ``incr`` calls (native INCR on Redis) instead of
+invalidating them. Reads fetch all keys with one ``get_many`` and only fall back
+to the database when an entry is missing.
+
+A read that misses and a play that commits meanwhile could otherwise race: the
+play's ``incr`` finds no entry, then the read stores the counters it loaded
+before the commit. So the keys include a per-user generation number. A play
+whose ``incr`` misses bumps the generation, and a read stores what it loaded
+under the generation it saw before loading, where nobody looks any more once
+the generation has moved on. Counters loaded from a read replica (see
+``core.replicas``) may lag behind the primary, so they are only kept for
+``REPLICA_STICKY_SECONDS``.
+
+The cache is ``GAME_STATS_CACHE_ALIAS``. Local memory (the default without
+``REDIS_URL``) is per process: a round played on one worker never updates
+another worker's entries, which then serve stale counters for up to
+``GAME_STATS_CACHE_TIMEOUT`` seconds. Production deployments with several
+workers need a shared cache; the ``core.E001`` system check enforces it.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.replicas import current_replica
+
+from .models import GameStats
+
+FIELDS = ('id', 'total_games', 'wins', 'losses', 'draws')
+
+
+class GameStatsCache:
+    """Caches the GameStats counters of each user in Django's cache framework."""
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias or settings.GAME_STATS_CACHE_ALIAS
+        self.timeout = settings.GAME_STATS_CACHE_TIMEOUT if timeout is None else timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def _generation_key(user_id):
+        return f"game_stats:{user_id}:gen"
+
+    @staticmethod
+    def _key(user_id, generation, field):
+        return f"game_stats:{user_id}:{generation}:{field}"
+
+    def _keys(self, user_id, generation):
+        return {self._key(user_id, generation, field): field for field in FIELDS}
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _fill_timeout(self):
+        if current_replica.get() is not None:
+            # A replica may not have the latest rounds yet
+            return min(self.timeout, settings.REPLICA_STICKY_SECONDS)
+        return self.timeout
+
+    def generation(self, user_id):
+        """Return the user's current generation, starting a new one if there is none."""
+        key = self._generation_key(user_id)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Unique, so entries left from an evicted generation are never reused
+            self.cache.add(key, time.time_ns(), self.timeout)
+            generation = self.cache.get(key)
+        return generation
+
+    async def ageneration(self, user_id):
+        """Async version of ``generation``."""
+        key = self._generation_key(user_id)
+        generation = await self.cache.aget(key)
+        if generation is None:
+            await self.cache.aadd(key, time.time_ns(), self.timeout)
+            generation = await self.cache.aget(key)
+        return generation
+
+    def get(self, user):
+        """Return the user's GameStats, loading (and creating) it from the database on a miss."""
+        generation = self.generation(user.id)
+        keys = self._keys(user.id, generation)
+        cached = self.cache.get_many(keys)
+        if len(cached) == len(FIELDS):
+            self._count(hit=True)
+            return GameStats(user_id=user.id, **{keys[key]: value for key, value in cached.items()})
+
+        self._count(hit=False)
+        # Plain read first: get_or_create always reads from the primary, this may use a replica
+        stats = GameStats.objects.filter(user=user).first()
+        if stats is None:
+            stats, created = GameStats.objects.get_or_create(user=user)
+        self.cache.set_many(
+            {key: getattr(stats, field) for key, field in keys.items()},
+            self._fill_timeout(),
+        )
+        return stats
+
+    async def aget(self, user):
+        """Async version of ``get``; uses the cache backend's async API and the async ORM."""
+        generation = await self.ageneration(user.id)
+        keys = self._keys(user.id, generation)
+        cached = await self.cache.aget_many(keys)
+        if len(cached) == len(FIELDS):
+            self._count(hit=True)
+            return GameStats(user_id=user.id, **{keys[key]: value for key, value in cached.items()})
+
+        self._count(hit=False)
+        stats = await GameStats.objects.filter(user=user).afirst()
+        if stats is None:
+            stats, created = await GameStats.objects.aget_or_create(user=user)
+        await self.cache.aset_many(
+            {key: getattr(stats, field) for key, field in keys.items()},
+            self._fill_timeout(),
+        )
+        return stats
+
+    def apply_result(self, user_id, result):
+        """Increment the cached counters for one played round."""
+        self.apply_results(user_id, {result: 1})
+
+    def apply_results(self, user_id, counts):
+        """Increment the cached counters from a ``{result: n}`` mapping, dropping the entry if it is incomplete."""
+        generation = self.cache.get(self._generation_key(user_id))
+        if generation is None:
+            return  # Nothing cached
+        try:
+            for field, n in GameStats._counters(counts).items():
+                self.cache.incr(self._key(user_id, generation, field), n)
+        except ValueError:
+            # Entry (or part of it) expired, or a read is loading it: move on to a new generation
+            self.invalidate(user_id)
+
+    async def aapply_results(self, user_id, counts):
+        """Async version of ``apply_results``."""
+        generation = await self.cache.aget(self._generation_key(user_id))
+        if generation is None:
+            return
+        try:
+            for field, n in GameStats._counters(counts).items():
+                await self.cache.aincr(self._key(user_id, generation, field), n)
+        except ValueError:
+            await self.ainvalidate(user_id)
+
+    def invalidate(self, user_id):
+        """Drop the user's entry: later reads use a new generation, whatever is stored under the old one."""
+        try:
+            self.cache.incr(self._generation_key(user_id))
+        except ValueError:
+            pass  # No generation: the next read starts a new one
+
+    async def ainvalidate(self, user_id):
+        """Async version of ``invalidate``."""
+        try:
+            await self.cache.aincr(self._generation_key(user_id))
+        except ValueError:
+            pass
+
+    def metrics(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+        }
+
+
+stats_cache = GameStatsCache()
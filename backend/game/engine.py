@@ -0,0 +1,122 @@
+"""
+Game rules, independent of the database.
+
+A ``Ruleset`` numbers its moves 0..n-1 and precomputes an n x n outcome matrix
+(from the first player's point of view), so resolving a round is a single table
+lookup. ``resolve`` works on move names for the request path; ``resolve_many``,
+``count_results`` and ``simulate`` work on lists of integer codes, indexing the
+flattened matrix once per round.
+
+``RPS`` is the ruleset the API plays; ``RPSLS`` (Rock-Paper-Scissors-Lizard-Spock)
+shows how variants are declared.
+"""
+import random
+
+# Result codes; for classic RPS the outcome is simply (user - computer) % 3
+DRAW, WIN, LOSE = 0, 1, 2
+RESULTS = ('draw', 'win', 'lose')
+
+
+class Ruleset:
+    """Moves of a game variant and the precomputed outcome of every pair of moves."""
+
+    def __init__(self, name, beats):
+        """
+        Args:
+            name (str): Variant name
+            beats (dict): Maps each move to the moves it beats, in move-code order
+        """
+        self.name = name
+        self.moves = tuple(beats)
+        for user in beats:
+            for computer in beats:
+                if user != computer and (computer in beats[user]) == (user in beats[computer]):
+                    raise ValueError(f"{name}: exactly one of {user!r} and {computer!r} must beat the other")
+        self.codes = {move: code for code, move in enumerate(self.moves)}
+        self.outcomes = tuple(
+            tuple(
+                DRAW if user == computer else WIN if computer in beats[user] else LOSE
+                for computer in self.moves
+            )
+            for user in self.moves
+        )
+        # Name-keyed table for the single-round path: one dict lookup, no encoding step
+        self._results = {
+            (user, computer): RESULTS[self.outcomes[u][c]]
+            for u, user in enumerate(self.moves)
+            for c, computer in enumerate(self.moves)
+        }
+        # Row-major outcomes for the batch path: outcome of (u, c) is _flat[u * n + c]
+        self._flat = tuple(outcome for row in self.outcomes for outcome in row)
+
+    def __repr__(self):
+        return f"<Ruleset {self.name}: {', '.join(self.moves)}>"
+
+    def is_move(self, move):
+        return move in self.codes
+
+    def resolve(self, user_choice, computer_choice):
+        """Return 'win', 'lose' or 'draw' for a pair of move names."""
+        return self._results[user_choice, computer_choice]
+
+    def random_move(self):
+        return random.choice(self.moves)
+
+    def random_moves(self, k):
+        return random.choices(self.moves, k=k)
+
+    def encode(self, moves):
+        """Translate move names into move codes."""
+        codes = self.codes
+        return [codes[move] for move in moves]
+
+    def resolve_many(self, user_codes, computer_codes):
+        """
+        Resolve many rounds given as move codes.
+
+        Returns a list of result codes (indexes into ``RESULTS``).
+        """
+        flat, n = self._flat, len(self.moves)
+        return [flat[u * n + c] for u, c in zip(user_codes, computer_codes)]
+
+    def count_results(self, user_codes, computer_codes):
+        """Resolve many rounds and return ``{'draw': n, 'win': n, 'lose': n}``."""
+        return self.tally(self.resolve_many(user_codes, computer_codes))
+
+    def tally(self, results):
+        """Count result codes as returned by ``resolve_many``."""
+        results = list(results)
+        return {result: results.count(code) for code, result in enumerate(RESULTS)}
+
+    def simulate(self, rounds, user_codes=None, seed=None):
+        """
+        Play ``rounds`` rounds against uniformly random computer moves.
+
+        ``user_codes`` defaults to uniformly random moves as well; pass a sequence
+        to replay a fixed strategy. Returns ``(user_codes, computer_codes, results)``.
+        """
+        if user_codes is not None:
+            rounds = len(user_codes)
+        rng = random.Random(seed)
+        codes = range(len(self.moves))
+        if user_codes is None:
+            user_codes = rng.choices(codes, k=rounds)
+        computer_codes = rng.choices(codes, k=rounds)
+        return user_codes, computer_codes, self.resolve_many(user_codes, computer_codes)
+
+
+RPS = Ruleset('rps', {
+    'rock': ('scissors',),
+    'paper': ('rock',),
+    'scissors': ('paper',),
+})
+
+RPSLS = Ruleset('rpsls', {
+    'rock': ('scissors', 'lizard'),
+    'paper': ('rock', 'spock'),
+    'scissors': ('paper', 'lizard'),
+    'lizard': ('paper', 'spock'),
+    'spock': ('rock', 'scissors'),
+})
+
+RULESETS = {ruleset.name: ruleset for ruleset in (RPS, RPSLS)}
@@ -0,0 +1,252 @@
+"""
+Server-push channel for game events.
+
+Views publish an event per played round (or batch) after the transaction
+commits; the SSE endpoint in `game.async_views` subscribes to the player's
+channel and streams the events. The broker is chosen by the
+``GAME_EVENTS_BROKER`` setting:
+
+- ``InMemoryBroker`` fans out to the subscribers held by the same process. A
+  round played on one worker never reaches a stream served by another.
+- ``CacheBroker`` stores the events in the Django cache ``GAME_EVENTS_CACHE_ALIAS``
+  and the streams poll it every ``GAME_EVENTS_POLL_INTERVAL`` seconds. With a
+  shared cache (``REDIS_URL``) every worker sees every event; it is the default
+  when ``REDIS_URL`` is set.
+
+Browsers' EventSource cannot send an Authorization header, so the stream is
+opened with a short-lived signed ticket (``make_ticket``) instead of the
+long-lived API token, which would otherwise end up in access logs.
+"""
+import abc
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+TICKET_SALT = 'game.events.ticket'
+
+
+class Broker(abc.ABC):
+    """Interface of an event broker."""
+
+    @abc.abstractmethod
+    def publish(self, channel, event):
+        """Deliver ``event`` (a JSON-serializable dict) to every subscriber of ``channel``. Callable from any thread."""
+
+    async def apublish(self, channel, event):
+        """Async version of ``publish``, for brokers whose ``publish`` blocks."""
+        self.publish(channel, event)
+
+    @abc.abstractmethod
+    async def subscribe(self, channel):
+        """
+        Return a subscription to ``channel``: ``await get(timeout)`` returns the
+        next event published after the call, and ``close()`` ends it.
+        """
+
+
+class Subscription:
+    """A subscriber's bounded queue; a subscriber that stops reading loses events instead of growing without bound."""
+
+    def __init__(self, broker, channel, max_queue_size):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_queue_size)
+
+    def deliver(self, event):
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Return the next event; raises asyncio.TimeoutError after ``timeout`` seconds."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker(Broker):
+    """Fan-out to the subscriptions held by this process."""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+    async def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+class CacheSubscription:
+    """Reads a channel's events from the cache, starting after the sequence number current when it opened."""
+
+    def __init__(self, broker, channel, position):
+        self.broker = broker
+        self.channel = channel
+        self.position = position
+        self._pending = deque()
+
+    async def _poll(self):
+        cache = self.broker.cache
+        last = await cache.aget(self.broker.sequence_key(self.channel), 0)
+        if last < self.position:
+            # The sequence expired or was cleared: start over from it
+            self.position = last
+        if last == self.position:
+            return
+        # A subscriber that fell far behind skips to the latest events
+        first = max(self.position + 1, last - self.broker.max_queue_size + 1)
+        keys = [self.broker.event_key(self.channel, n) for n in range(first, last + 1)]
+        events = await cache.aget_many(keys)
+        # Events that already expired are skipped
+        self._pending.extend(events[key] for key in keys if key in events)
+        self.position = last
+
+    async def get(self, timeout=None):
+        """Return the next event; raises asyncio.TimeoutError after ``timeout`` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self._pending:
+            await self._poll()
+            if self._pending:
+                break
+            delay = self.broker.poll_interval
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                delay = min(delay, remaining)
+            await asyncio.sleep(delay)
+        return self._pending.popleft()
+
+    def close(self):
+        pass
+
+
+class CacheBroker(Broker):
+    """
+    Events kept in the Django cache, numbered per channel, for ``retention`` seconds.
+
+    ``publish`` increments the channel's sequence number and stores the event
+    under it; subscriptions poll the sequence number and fetch what they missed.
+    """
+
+    def __init__(self, alias=None, poll_interval=None, retention=60, max_queue_size=100):
+        self.alias = alias or settings.GAME_EVENTS_CACHE_ALIAS
+        self.poll_interval = poll_interval or settings.GAME_EVENTS_POLL_INTERVAL
+        self.retention = retention
+        self.max_queue_size = max_queue_size
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def sequence_key(channel):
+        return f"events:{channel}:seq"
+
+    @staticmethod
+    def event_key(channel, n):
+        return f"events:{channel}:{n}"
+
+    def publish(self, channel, event):
+        key = self.sequence_key(channel)
+        self.cache.add(key, 0, None)
+        try:
+            n = self.cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.add(key, 1, None)
+            n = self.cache.get(key)
+        self.cache.set(self.event_key(channel, n), event, self.retention)
+
+    async def apublish(self, channel, event):
+        key = self.sequence_key(channel)
+        await self.cache.aadd(key, 0, None)
+        try:
+            n = await self.cache.aincr(key)
+        except ValueError:
+            await self.cache.aadd(key, 1, None)
+            n = await self.cache.aget(key)
+        await self.cache.aset(self.event_key(channel, n), event, self.retention)
+
+    async def subscribe(self, channel):
+        return CacheSubscription(self, channel, await self.cache.aget(self.sequence_key(channel), 0))
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.GAME_EVENTS_BROKER)()
+    return _broker
+
+
+def user_channel(user_id):
+    return f"game:{user_id}"
+
+
+def make_ticket(user_id):
+    """Return a signed ticket opening ``user_id``'s event stream for ``GAME_EVENTS_TICKET_MAX_AGE`` seconds."""
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user_id))
+
+
+def read_ticket(ticket):
+    """Return the user ID of a valid, unexpired ticket, or None."""
+    try:
+        return int(signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=settings.GAME_EVENTS_TICKET_MAX_AGE))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def _games_event(games, counts):
+    return {
+        'games': games,
+        'stats_delta': {
+            'total_games': sum(counts.values()),
+            'wins': counts.get('win', 0),
+            'losses': counts.get('lose', 0),
+            'draws': counts.get('draw', 0),
+        },
+    }
+
+
+def publish_games(user_id, games, counts):
+    """
+    Publish played rounds and the resulting GameStats delta to the player's channel.
+    
+    Args:
+        user_id: The player's user ID
+        games (list): Serialized Game data, one item per round
+        counts (dict): ``{result: n}`` for the rounds
+    """
+    get_broker().publish(user_channel(user_id), _games_event(games, counts))
+
+
+async def apublish_games(user_id, games, counts):
+    """Async version of ``publish_games``."""
+    await get_broker().apublish(user_channel(user_id), _games_event(games, counts))
@@ -0,0 +1,113 @@
+"""
+Streaming export of a user's game history as NDJSON or CSV.
+
+Rows are read with ``values_list().iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL) and encoded directly from tuples, skipping model
+instances and ``GameSerializer``. Encoded rows are yielded in chunks, so memory
+stays constant however long the history is. Archived rounds (``game.archive``)
+are merged in by ``(created_at, id)``.
+"""
+import csv
+import heapq
+import io
+import json
+from datetime import datetime
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+
+EXPORT_FIELDS = ('id', 'user', 'user_choice', 'computer_choice', 'result', 'status', 'created_at', 'updated_at')
+COLUMNS = ('id', 'user_id', 'user_choice', 'computer_choice', 'result', 'status', 'created_at', 'updated_at')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+CHUNK_SIZE = 2000
+
+
+def _datetime(value):
+    # Same representation as DRF's DateTimeField (UTC as 'Z')
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _merged(rows, archived):
+    """Merge database rows with archived rows (dicts), both newest first, dropping duplicates."""
+    database = (((row[6], row[0]), row) for row in rows)
+    archived = (
+        ((datetime.fromisoformat(row['created_at']), row['id']), [row[field] for field in EXPORT_FIELDS])
+        for row in archived
+    )
+    last_id = None
+    for (_, game_id), row in heapq.merge(database, archived, key=itemgetter(0), reverse=True):
+        if game_id != last_id:  # A round archived while it was still being deleted
+            last_id = game_id
+            yield row
+
+
+def _rows(games, archived=None):
+    """Yield lists of export rows, ``CHUNK_SIZE`` at a time."""
+    rows = games.order_by('-created_at', '-id').values_list(*COLUMNS).iterator(chunk_size=CHUNK_SIZE)
+    if archived is not None:
+        rows = _merged(rows, archived)
+    chunk = []
+    for row in rows:
+        row = list(row)
+        if not isinstance(row[6], str):
+            row[6] = _datetime(row[6])
+            row[7] = _datetime(row[7])
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ndjson_lines(games, archived=None):
+    """Yield the games, and the ``archived`` rows, as newline-delimited JSON objects, encoded a chunk at a time."""
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    for chunk in _rows(games, archived):
+        yield ''.join(dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in chunk)
+
+
+def csv_lines(games, archived=None):
+    """Yield the games, and the ``archived`` rows, as CSV with a header row, encoded a chunk at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in _rows(games, archived):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Empty history: only the header was written
+        yield buffer.getvalue()
+
+
+ENCODERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+}
+
+
+async def aiterate(iterator):
+    """
+    Serve a sync iterator from an async response without draining it first.
+
+    Under ASGI, Django would otherwise load the whole sync iterator into a list.
+    Each chunk is pulled on the thread-sensitive executor, the same thread (and
+    database connection) for the whole export.
+    """
+    sentinel = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(iterator, sentinel)
+        if chunk is sentinel:
+            return
+        yield chunk
@@ -0,0 +1,70 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils.functional import cached_property
+
+
+class EncodedChoiceField(models.PositiveSmallIntegerField):
+    """
+    A choice field stored as a small integer.
+
+    ``codes`` lists the choice values in code order (``codes[0]`` is stored as 0
+    and so on). Python code, lookups, forms and serializers keep working with the
+    string values; only the database column holds the integer, which keeps rows
+    and indexes of large tables small. Append new values to ``codes``, never
+    reorder them: the codes are what is stored.
+    """
+
+    def __init__(self, *args, codes=(), **kwargs):
+        self.codes = tuple(codes)
+        self._encode = {value: code for code, value in enumerate(self.codes)}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['codes'] = self.codes
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # Values are choice strings, so IntegerField's range validators do not apply
+        return list(self._validators)
+
+    def _decode(self, code):
+        """Return the value stored as ``code``, or None when it is not one of ``codes``."""
+        if 0 <= code < len(self.codes):
+            return self.codes[code]
+        return None
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        decoded = self._decode(value)
+        if decoded is None:
+            # Written by a release with more codes, or by hand: say so rather than guess
+            raise ValueError(
+                f"{self.model._meta.db_table}.{self.column} holds code {value}, "
+                f"which is not one of {self.codes!r}"
+            )
+        return decoded
+
+    def to_python(self, value):
+        if value is None or value in self._encode:
+            return value
+        if isinstance(value, int):
+            decoded = self._decode(value)
+            if decoded is None:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+                )
+            return decoded
+        return str(value)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        if isinstance(value, models.Choices):
+            value = value.value
+        try:
+            return self._encode[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not a valid choice for {self.name}") from None
@@ -0,0 +1,77 @@
+"""
+Leaderboard queries.
+
+Rankings are read straight from ``GameStats`` (the persisted source of truth),
+so every worker sees every committed round and no process keeps a copy of the
+table. The top N is an ``ORDER BY ... LIMIT`` and a user's rank is a ``COUNT``
+of the players above them, both served by the ``gamestats_wins_idx`` and
+``gamestats_win_rate_idx`` indexes instead of a scan.
+
+Players tied on the ranked value share a rank, as in a ``RANK()`` window.
+"""
+from django.conf import settings
+
+from .models import WIN_RATE, GameStats
+
+
+class Leaderboard:
+    """Rankings by total wins and by win rate (for players with enough games)."""
+
+    def __init__(self, min_games=None):
+        self.min_games = settings.LEADERBOARD_MIN_GAMES if min_games is None else min_games
+
+    def _ranked(self):
+        return GameStats.objects.filter(total_games__gt=0)
+
+    def _rate_ranked(self):
+        # ``total_games__gt=0`` as well, so a zero ``min_games`` never divides by zero
+        return self._ranked().filter(total_games__gte=self.min_games).annotate(win_rate=WIN_RATE)
+
+    @staticmethod
+    def _entries(rows, key):
+        """Build the response entries for a page that starts at the top of its ranking."""
+        entries = []
+        for position, (user_id, total, wins) in enumerate(rows):
+            if entries and key(total, wins) == key(entries[-1]['total_games'], entries[-1]['wins']):
+                rank = entries[-1]['rank']
+            else:
+                rank = position + 1
+            entries.append({
+                'rank': rank,
+                'user_id': user_id,
+                'total_games': total,
+                'wins': wins,
+                'win_percentage': round(wins / total * 100, 2) if total else 0.0,
+            })
+        return entries
+
+    def top_by_wins(self, limit):
+        rows = self._ranked().order_by('-wins', 'user_id').values_list('user_id', 'total_games', 'wins')[:limit]
+        return self._entries(rows, lambda total, wins: wins)
+
+    def top_by_win_rate(self, limit):
+        rows = (
+            self._rate_ranked()
+            .order_by('-win_rate', '-total_games', 'user_id')
+            .values_list('user_id', 'total_games', 'wins')[:limit]
+        )
+        return self._entries(rows, lambda total, wins: wins / total)
+
+    def rank(self, user_id):
+        """Return ``{'by_wins': rank, 'by_win_rate': rank}`` for a user, with None where unranked."""
+        stats = self._ranked().filter(user_id=user_id).values_list('total_games', 'wins').first()
+        if stats is None:
+            return {'by_wins': None, 'by_win_rate': None}
+        total, wins = stats
+        by_win_rate = None
+        if total >= self.min_games:
+            # Python and the database divide the same two integers to the same double
+            by_win_rate = self._rate_ranked().filter(win_rate__gt=wins / total).count() + 1
+        return {
+            # Anyone with more wins has played, so the count reads only the wins index
+            'by_wins': GameStats.objects.filter(wins__gt=wins).count() + 1,
+            'by_win_rate': by_win_rate,
+        }
+
+
+leaderboard = Leaderboard()
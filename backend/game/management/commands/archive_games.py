@@ -0,0 +1,71 @@
+"""
+Move old game rounds from the database into the archive (see ``game.archive``).
+
+Every month that ended more than ``GAME_ARCHIVE_AFTER_MONTHS`` months ago is
+archived, and its rows are deleted (on PostgreSQL, its partition is dropped).
+On PostgreSQL the command also creates the partitions for the next
+``GAME_PARTITIONS_AHEAD`` months. Run it daily, e.g. from a cron job;
+re-running it is safe.
+
+Usage:
+    python manage.py archive_games
+    python manage.py archive_games --keep-months 3 --dry-run
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from game import partitions
+from game.archive import archive_month
+from game.models import Game
+
+
+class Command(BaseCommand):
+    help = "Archive game rounds older than the retention horizon and maintain the monthly partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=settings.GAME_ARCHIVE_AFTER_MONTHS,
+            help="Whole months kept in the database before the current one",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="List the months that would be archived")
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 0:
+            raise CommandError("--keep-months must be zero or more")
+
+        if not options['dry_run']:
+            for year, month in partitions.ensure_partitions(settings.GAME_PARTITIONS_AHEAD):
+                self.stdout.write(f"Created partition {partitions.partition_name(year, month)}")
+
+        now = datetime.now(timezone.utc)
+        cutoff = partitions.add_months(now.year, now.month, -options['keep_months'])
+        cutoff_start = partitions.month_range(*cutoff)[0]
+
+        months = {month for month in partitions.partitions() if month < cutoff}
+        oldest = Game.objects.filter(created_at__lt=cutoff_start).aggregate(oldest=Min('created_at'))['oldest']
+        if oldest is not None:
+            month = (oldest.year, oldest.month)
+            while month < cutoff:
+                months.add(month)
+                month = partitions.add_months(*month, 1)
+
+        if not months:
+            self.stdout.write(f"Nothing to archive before {cutoff_start:%Y-%m}")
+            return
+
+        for year, month in sorted(months):
+            if options['dry_run']:
+                start, end = partitions.month_range(year, month)
+                count = Game.objects.filter(created_at__gte=start, created_at__lt=end).count()
+                self.stdout.write(f"{year:04d}-{month:02d}: {count} rounds")
+                continue
+            start = time.perf_counter()
+            archived, deleted = archive_month(year, month)
+            self.stdout.write(
+                f"{year:04d}-{month:02d}: {archived} rounds archived, {deleted} deleted from the database "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
@@ -0,0 +1,120 @@
+"""
+Rebuild the DailyStats rollups from the game history.
+
+Users are processed in chunks of ``--chunk-size``. For each chunk, one transaction
+locks the users' GameStats rows, deletes their rollups and recreates them from
+a single GROUP BY over their games. The grouped rows are streamed from the
+database rather than loaded at once. Re-running the command is safe.
+
+The lock is what keeps concurrent plays from being counted twice or not at all.
+Every path that saves rounds (the sync and async play views, batch play and the
+write-behind flush) inserts them and updates GameStats and DailyStats in one
+transaction. A play that has not committed when the chunk takes the lock waits on
+its GameStats row, so the GROUP BY does not see its rounds and the play counts
+them afterwards into the rebuilt buckets. A play that committed before is in the
+GROUP BY and nowhere else. Users without a GameStats row get one first, so there
+is a row to lock for every user of the chunk.
+
+Days whose rounds were moved to the archive (see ``archive_games``) are kept as
+they are, since the database no longer holds their games; only the days after
+the newest archived month are rebuilt.
+
+Usage:
+    python manage.py backfill_daily_stats
+    python manage.py backfill_daily_stats --user 42 --user 43
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from game.archive import game_archive
+from game.models import DailyStats, Game, GameStats
+
+
+def first_rebuilt_day():
+    """The first day held entirely in the database, or None when nothing is archived."""
+    archived_until = game_archive.archived_until()
+    if archived_until is None:
+        return None
+    day = timezone.localdate(archived_until)
+    if timezone.make_aware(datetime.combine(day, datetime.min.time())) < archived_until:
+        day += timedelta(days=1)  # The day straddles the archive boundary
+    return day
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-day game statistics of every user (or the given users) from their games"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Users per transaction")
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only rebuild this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        self.first_day = first_rebuilt_day()
+        if self.first_day is not None:
+            self.stdout.write(f"Keeping the daily buckets before {self.first_day}, their games are archived")
+
+        start = time.perf_counter()
+        last_id = 0
+        user_count = bucket_count = 0
+        while True:
+            user_ids = list(users.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            bucket_count += self._rebuild(user_ids)
+            user_count += len(user_ids)
+            self.stdout.write(f"{user_count} users, {bucket_count} daily buckets")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {bucket_count} daily buckets for {user_count} users in {time.perf_counter() - start:.1f}s"
+        ))
+
+    def _rebuild(self, user_ids):
+        GameStats.objects.bulk_create([GameStats(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        with transaction.atomic():
+            list(GameStats.objects.select_for_update().filter(user_id__in=user_ids).values_list('id', flat=True))
+            buckets = DailyStats.objects.filter(user_id__in=user_ids)
+            games = Game.objects.filter(user_id__in=user_ids, result__isnull=False)
+            if self.first_day is not None:
+                buckets = buckets.filter(day__gte=self.first_day)
+                games = games.filter(
+                    created_at__gte=timezone.make_aware(datetime.combine(self.first_day, datetime.min.time()))
+                )
+            buckets.delete()
+
+            rows = (
+                games
+                .annotate(day=TruncDate('created_at'))
+                .values('user_id', 'day')
+                .annotate(
+                    total_games=Count('id'),
+                    wins=Count('id', filter=Q(result='win')),
+                    losses=Count('id', filter=Q(result='lose')),
+                    draws=Count('id', filter=Q(result='draw')),
+                    rock=Count('id', filter=Q(user_choice='rock')),
+                    paper=Count('id', filter=Q(user_choice='paper')),
+                    scissors=Count('id', filter=Q(user_choice='scissors')),
+                )
+                .order_by()
+            )
+            batch = []
+            created = 0
+            for row in rows.iterator(chunk_size=2000):
+                batch.append(DailyStats(**row))
+                if len(batch) == 2000:
+                    created += len(DailyStats.objects.bulk_create(batch))
+                    batch = []
+            created += len(DailyStats.objects.bulk_create(batch))
+            return created
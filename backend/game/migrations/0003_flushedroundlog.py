@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0002_game_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlushedRoundLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(max_length=100, unique=True)),
+                ('flushed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
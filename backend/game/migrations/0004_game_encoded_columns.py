@@ -0,0 +1,51 @@
+# Step 1 of 3 of moving Game's choice columns from strings to small integers:
+# add nullable integer columns next to the string ones. The string columns become
+# nullable too, so that unapplying step 3 can re-create them before step 2's
+# reverse fills them back in.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0003_flushedroundlog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='user_choice',
+            field=models.CharField(choices=[('rock', 'Rock'), ('paper', 'Paper'), ('scissors', 'Scissors')], max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='computer_choice',
+            field=models.CharField(choices=[('rock', 'Rock'), ('paper', 'Paper'), ('scissors', 'Scissors')], max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('completed', 'Completed')], default='active', max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='user_choice_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='computer_choice_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='result_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Step 2 of 3: copy every row's string values into the integer columns.
+#
+# Rows are converted in primary-key ranges of CHUNK_SIZE, each range in its own
+# short transaction with one set-based UPDATE, so a large table is never locked
+# for the whole conversion and progress survives an interrupted run (re-running
+# simply rewrites the same values).
+
+from django.db import migrations, models, transaction
+from django.db.models import Case, Max, Min, Value, When
+
+CHUNK_SIZE = 10000
+
+# Frozen copy of the codes declared on Game's EncodedChoiceFields
+CODES = {
+    'user_choice': {'rock': 0, 'paper': 1, 'scissors': 2},
+    'computer_choice': {'rock': 0, 'paper': 1, 'scissors': 2},
+    'result': {'draw': 0, 'win': 1, 'lose': 2},
+    'status': {'active': 0, 'completed': 1},
+}
+
+
+def _convert(apps, schema_editor, updates):
+    Game = apps.get_model('game', 'Game')
+    db = schema_editor.connection.alias
+    bounds = Game.objects.using(db).aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+        with transaction.atomic(using=db):
+            Game.objects.using(db).filter(id__gte=start, id__lt=start + CHUNK_SIZE).update(**updates)
+
+
+def encode(apps, schema_editor):
+    _convert(apps, schema_editor, {
+        f'{field}_code': Case(
+            *(When(**{field: value}, then=Value(code)) for value, code in codes.items()),
+            output_field=models.PositiveSmallIntegerField(),
+        )
+        for field, codes in CODES.items()
+    })
+
+
+def decode(apps, schema_editor):
+    _convert(apps, schema_editor, {
+        field: Case(
+            *(When(**{f'{field}_code': code}, then=Value(value)) for value, code in codes.items()),
+            output_field=models.CharField(),
+        )
+        for field, codes in CODES.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    # Each chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('game', '0004_game_encoded_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(encode, decode),
+    ]
@@ -0,0 +1,42 @@
+# Step 3 of 3: drop the string columns and give the integer columns their names.
+
+import game.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_encode_game_columns'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='game', name='user_choice'),
+        migrations.RemoveField(model_name='game', name='computer_choice'),
+        migrations.RemoveField(model_name='game', name='result'),
+        migrations.RemoveField(model_name='game', name='status'),
+        migrations.RenameField(model_name='game', old_name='user_choice_code', new_name='user_choice'),
+        migrations.RenameField(model_name='game', old_name='computer_choice_code', new_name='computer_choice'),
+        migrations.RenameField(model_name='game', old_name='result_code', new_name='result'),
+        migrations.RenameField(model_name='game', old_name='status_code', new_name='status'),
+        migrations.AlterField(
+            model_name='game',
+            name='user_choice',
+            field=game.fields.EncodedChoiceField(choices=[('rock', 'Rock'), ('paper', 'Paper'), ('scissors', 'Scissors')], codes=('rock', 'paper', 'scissors')),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='computer_choice',
+            field=game.fields.EncodedChoiceField(choices=[('rock', 'Rock'), ('paper', 'Paper'), ('scissors', 'Scissors')], codes=('rock', 'paper', 'scissors')),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='result',
+            field=game.fields.EncodedChoiceField(blank=True, choices=[('win', 'Win'), ('lose', 'Lose'), ('draw', 'Draw')], codes=('draw', 'win', 'lose'), null=True),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='status',
+            field=game.fields.EncodedChoiceField(choices=[('active', 'Active'), ('completed', 'Completed')], codes=('active', 'completed'), default='active'),
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Index games by created_at and, on PostgreSQL, partition the game table by month.
+#
+# PostgreSQL cannot turn an existing table into a partitioned one, so the table is
+# rebuilt: the old one is renamed, a partitioned game_game is created with the
+# same columns, one partition per month from the oldest round to three months
+# ahead (plus a default partition), the rows are copied, and the indexes and the
+# foreign key are recreated under their old names. The primary key becomes
+# (id, created_at), because a partitioned table's unique keys must include the
+# partition key. The ids stay unique because they come from one sequence, but no
+# foreign key can reference the table (PartitionMigrationTests checks that no model
+# does). The copy holds an exclusive lock on the table; on a large table,
+# run it in a maintenance window. Other databases only get the index.
+#
+# The test suite runs on SQLite, so this SQL only runs in the PostgreSQL workflow
+# (.github/workflows/postgres.yml), which also migrates back to 0007.
+#
+# game.partitions creates the partitions of later months (archive_games).
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+TABLE = 'game_game'
+OLD_TABLE = 'game_game_unpartitioned'
+MONTHS_AHEAD = 3
+
+
+def _add_months(year, month, n):
+    index = year * 12 + month - 1 + n
+    return index // 12, index % 12 + 1
+
+
+def _month_start(year, month):
+    return datetime(year, month, 1, tzinfo=timezone.utc).isoformat()
+
+
+def _rebuild(schema_editor, partitioned):
+    """Recreate game_game, partitioned by month or not, keeping its rows, indexes and foreign key."""
+    quote = schema_editor.quote_name
+    table, old = quote(TABLE), quote(OLD_TABLE)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey'],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+
+        # Free the names for the new table
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        cursor.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {quote(TABLE + '_pkey')} TO {quote(OLD_TABLE + '_pkey')}")
+        for name, _ in foreign_keys:
+            cursor.execute(f"ALTER TABLE {old} DROP CONSTRAINT {quote(name)}")
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {quote(name)}")
+
+        if partitioned:
+            cursor.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+            cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)")
+            cursor.execute(f"SELECT min(created_at) FROM {old}")
+            oldest = cursor.fetchone()[0]
+            now = datetime.now(timezone.utc)
+            month = (oldest.year, oldest.month) if oldest else (now.year, now.month)
+            last = _add_months(now.year, now.month, MONTHS_AHEAD)
+            while month <= last:
+                name = quote(f'{TABLE}_p{month[0]:04d}_{month[1]:02d}')
+                end = _add_months(*month, 1)
+                cursor.execute(
+                    f"CREATE TABLE {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{_month_start(*month)}') TO ('{_month_start(*end)}')"
+                )
+                month = end
+            cursor.execute(f"CREATE TABLE {quote(TABLE + '_default')} PARTITION OF {table} DEFAULT")
+        else:
+            cursor.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)")
+            cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {quote(name)} {definition}")
+
+        # The id sequence belongs to the old table; give the new one its own, continuing the ids
+        cursor.execute(f"SELECT coalesce(max(id), 0) + 1 FROM {old}")
+        next_id = int(cursor.fetchone()[0])
+        # LIKE copied the old table's nextval() default, if any, which would keep its sequence alive
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"DROP TABLE {old}")
+        if partitioned:
+            # Not an identity column: partitioned tables only support those from
+            # PostgreSQL 17. pg_get_serial_sequence() (and so Django's sequence resets)
+            # finds an owned sequence just the same.
+            sequence = quote(f'{TABLE}_id_seq')
+            cursor.execute(f"CREATE SEQUENCE {sequence} START WITH {next_id} OWNED BY {table}.id")
+            cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+        else:
+            cursor.execute(
+                f"ALTER TABLE {table} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {next_id})"
+            )
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_dailystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['created_at'], name='game_created_idx'),
+        ),
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,28 @@
+# Game.created_at: auto_now_add -> default=timezone.now, so the write-behind log can
+# insert rounds with the time they were played.
+#
+# The column itself does not change (the default is applied by Django, not the
+# database), so only the migration state is updated: a plain AlterField would
+# rebuild the whole table on SQLite.
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_partition_game_by_month'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='game',
+                    name='created_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:57
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_game_created_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gamestats',
+            index=models.Index(fields=['-wins', 'user'], name='gamestats_wins_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamestats',
+            index=models.Index(models.OrderBy(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('wins', models.FloatField()), '/', django.db.models.functions.comparison.NullIf('total_games', 0)), descending=True), models.OrderBy(models.F('total_games'), descending=True), models.OrderBy(models.F('user')), name='gamestats_win_rate_idx'),
+        ),
+    ]
@@ -1,5 +1,28 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.functions import Cast, NullIf
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .engine import RPS
+from .fields import EncodedChoiceField
+
+def increment_counters(model, lookup, counters):
+    """
+    ``UPDATE model SET field = field + n WHERE lookup`` for each ``{field: n}``,
+    inserting the row with the counters as initial values when it does not exist yet.
+    """
+    increments = {field: F(field) + n for field, n in counters.items()}
+    if model.objects.filter(**lookup).update(**increments):
+        return
+    
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **counters)
+    except IntegrityError:
+        # Another request created the row first; fall back to the update
+        model.objects.filter(**lookup).update(**increments)
+
 
 class Game(models.Model):
     CHOICES = (
@@ -20,34 +43,43 @@ class Game(models.Model):
     )
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='games')
-    user_choice = models.CharField(max_length=10, choices=CHOICES)
-    computer_choice = models.CharField(max_length=10, choices=CHOICES)
-    result = models.CharField(max_length=10, choices=RESULTS, null=True, blank=True)
-    status = models.CharField(max_length=10, choices=STATUSES, default='active')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Stored as small integers; `codes` fixes each value's number (the same numbering as game.engine)
+    user_choice = EncodedChoiceField(choices=CHOICES, codes=('rock', 'paper', 'scissors'))
+    computer_choice = EncodedChoiceField(choices=CHOICES, codes=('rock', 'paper', 'scissors'))
+    result = EncodedChoiceField(choices=RESULTS, codes=('draw', 'win', 'lose'), null=True, blank=True)
+    status = EncodedChoiceField(choices=STATUSES, codes=('active', 'completed'), default='active')
+    # Not auto_now_add: rounds replayed from the write-behind log keep the time they were played
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
     
-    def calculate_result(self):
-        if self.user_choice == self.computer_choice:
-            self.result = 'draw'
-        elif (
-            (self.user_choice == 'rock' and self.computer_choice == 'scissors') or
-            (self.user_choice == 'paper' and self.computer_choice == 'rock') or
-            (self.user_choice == 'scissors' and self.computer_choice == 'paper')
-        ):
-            self.result = 'win'
-        else:
-            self.result = 'lose'
-        
+    # resolve(user_choice, computer_choice) -> 'win', 'lose' or 'draw', from the engine's precomputed table
+    resolve = staticmethod(RPS.resolve)
+    
+    def calculate_result(self, commit=True):
+        self.result = self.resolve(self.user_choice, self.computer_choice)
         self.status = 'completed'
-        self.save()
+        if commit:
+            self.save()
         
         return self.result
     
+    class Meta:
+        indexes = [
+            # Backs keyset pagination of a user's history (newest first)
+            models.Index(fields=['user', '-created_at', '-id'], name='game_user_created_idx'),
+            # Finds a month's rounds when archiving (see game.archive)
+            models.Index(fields=['created_at'], name='game_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Game {self.id}: {self.user.username} - {self.result or 'pending'}"
 
 
+# A player's win rate, spelled the same in the leaderboard's queries and its index.
+# NULL until the first game: PostgreSQL computes it for every row the index holds.
+WIN_RATE = Cast('wins', models.FloatField()) / NullIf('total_games', 0)
+
+
 class GameStats(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='game_stats')
     total_games = models.IntegerField(default=0)
@@ -55,17 +87,109 @@ class GameStats(models.Model):
     losses = models.IntegerField(default=0)
     draws = models.IntegerField(default=0)
     
-    def update_stats(self, result):
-        self.total_games += 1
+    # Maps a game result to the counter it increments
+    RESULT_FIELDS = {
+        'win': 'wins',
+        'lose': 'losses',
+        'draw': 'draws',
+    }
+    
+    class Meta:
+        indexes = [
+            # Back the leaderboard's top-N queries and its rank counts (see game.leaderboard)
+            models.Index(fields=['-wins', 'user'], name='gamestats_wins_idx'),
+            models.Index(
+                WIN_RATE.desc(), F('total_games').desc(), F('user').asc(), name='gamestats_win_rate_idx',
+            ),
+        ]
+    
+    @classmethod
+    def _counters(cls, counts):
+        """Translate ``{result: n}`` into ``{field: n}`` including ``total_games``."""
+        counters = {'total_games': sum(counts.values())}
+        for result, n in counts.items():
+            field = cls.RESULT_FIELDS.get(result)
+            if field and n:
+                counters[field] = counters.get(field, 0) + n
+        return counters
+    
+    @classmethod
+    def record_result(cls, user, result):
+        """Atomically count one game for ``user``."""
+        cls.record_results(user, {result: 1})
+    
+    @classmethod
+    def record_results(cls, user, counts):
+        """
+        Atomically count games for ``user`` from a ``{result: n}`` mapping.
         
-        if result == 'win':
-            self.wins += 1
-        elif result == 'lose':
-            self.losses += 1
-        elif result == 'draw':
-            self.draws += 1
-            
-        self.save()
+        Issues a single ``UPDATE ... SET wins = wins + n`` so concurrent rounds
+        never lose increments. The stats row is only inserted when the update
+        finds nothing, which happens once per user.
+        """
+        increment_counters(cls, {'user': user}, cls._counters(counts))
+    
+    def update_stats(self, result):
+        counters = self._counters({result: 1})
+        GameStats.objects.filter(pk=self.pk).update(**{field: F(field) + n for field, n in counters.items()})
+        self.refresh_from_db(fields=['total_games', 'wins', 'losses', 'draws'])
     
     def __str__(self):
         return f"Stats for {self.user.username}"
+
+
+class DailyStats(models.Model):
+    """
+    Per-user, per-day rollup of played games, kept up to date by the play views.
+    
+    Date-range statistics sum these buckets instead of scanning ``Game``. Days
+    are calendar days in ``TIME_ZONE``. Rebuild them from the game history with
+    ``python manage.py backfill_daily_stats``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    total_games = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    # How often the player picked each move
+    rock = models.IntegerField(default=0)
+    paper = models.IntegerField(default=0)
+    scissors = models.IntegerField(default=0)
+    
+    COUNTER_FIELDS = ('total_games', 'wins', 'losses', 'draws', 'rock', 'paper', 'scissors')
+    
+    class Meta:
+        constraints = [
+            # Also serves the (user, day range) lookups of the date-range API
+            models.UniqueConstraint(fields=['user', 'day'], name='daily_stats_user_day_uniq'),
+        ]
+    
+    @classmethod
+    def _counters_by_day(cls, games):
+        """Translate played games into ``{day: {field: n}}``."""
+        by_day = {}
+        for game in games:
+            day = timezone.localdate(game.created_at)
+            counts = by_day.setdefault(day, {})
+            for field in ('total_games', GameStats.RESULT_FIELDS[game.result], game.user_choice):
+                counts[field] = counts.get(field, 0) + 1
+        return by_day
+    
+    @classmethod
+    def record_games(cls, user, games):
+        """Count saved ``Game`` instances of ``user`` into their day's bucket, one UPDATE per day."""
+        for day, counters in cls._counters_by_day(games).items():
+            increment_counters(cls, {'user': user, 'day': day}, counters)
+    
+    def __str__(self):
+        return f"Stats for {self.user.username} on {self.day}"
+
+
+class FlushedRoundLog(models.Model):
+    """Marks a write-behind log segment whose rounds are in the database (see ``game.writebehind``)."""
+    segment = models.CharField(max_length=100, unique=True)
+    flushed_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.segment
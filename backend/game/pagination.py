@@ -0,0 +1,120 @@
+import base64
+import binascii
+import heapq
+from datetime import datetime
+from operator import itemgetter
+
+from django.conf import settings
+from rest_framework.utils.urls import replace_query_param
+
+from .archive import game_archive
+from .export import _datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, key):
+    created_at, game_id = key
+    raw = f"{direction}|{created_at.isoformat()}|{game_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return ``(direction, (created_at, id))``, or None for a malformed cursor."""
+    try:
+        direction, created_at, game_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        if direction not in ('n', 'p'):
+            raise ValueError(direction)
+        created_at = datetime.fromisoformat(created_at)
+        if created_at.tzinfo is None:
+            # encode_cursor() only writes aware datetimes, and naive ones can't be merged with the archive's
+            raise ValueError(created_at)
+        return direction, (created_at, int(game_id))
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+class GameHistoryPagination:
+    """
+    Keyset pagination for a user's game history, across the database and the archive.
+
+    Pages are addressed by opaque cursors that encode the direction and the
+    ``(created_at, id)`` of the last row seen, so fetching page 1000 costs the same
+    as fetching page 1. In the database the ordering matches the
+    ``game_user_created_idx`` index on ``Game``, which lets it walk the index
+    instead of sorting the whole history. Rounds moved to ``game.archive`` are
+    merged in by the same key, so the history reads the same before and after
+    they are archived.
+    """
+    page_size = settings.GAME_HISTORY_PAGE_SIZE
+    max_page_size = settings.GAME_HISTORY_MAX_PAGE_SIZE
+
+    def __init__(self, query_params):
+        try:
+            page_size = int(query_params.get('page_size', self.page_size))
+        except ValueError:
+            page_size = self.page_size
+        self.page_size = max(1, min(page_size, self.max_page_size))
+
+        self.direction, self.position = 'n', None
+        cursor = query_params.get('cursor')
+        if cursor:
+            decoded = decode_cursor(cursor)
+            if decoded is None:
+                raise InvalidCursor("Invalid cursor")
+            self.direction, self.position = decoded
+
+    @property
+    def descending(self):
+        return self.direction == 'n'
+
+    def filter(self, games):
+        """The database rows that can be on the page: ``games`` after the cursor, in walk order."""
+        if self.position is not None:
+            created_at, game_id = self.position
+            if self.descending:
+                games = games.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=game_id)
+            else:
+                games = games.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=game_id)
+        ordering = ('-created_at', '-id') if self.descending else ('created_at', 'id')
+        return games.order_by(*ordering)[:self.page_size + 1]
+
+    def paginate(self, user_id, rows, results):
+        """
+        Build the page from the database ``rows`` (``values_list`` rows of ``filter()``)
+        and their serialized ``results``, merged with the user's archived rows.
+        """
+        hot = []
+        for row, data in zip(rows, results):
+            data['created_at'], data['updated_at'] = _datetime(data['created_at']), _datetime(data['updated_at'])
+            hot.append(((row.created_at, row.id), data))
+        archived = ()
+        if game_archive.has_user(user_id):
+            # Archived rows beyond the last database row cannot make it onto a full page
+            bound = hot[-1][0] if len(hot) > self.page_size else None
+            archived = game_archive.page(user_id, self.descending, self.position, bound, self.page_size + 1)
+
+        page, seen = [], set()
+        for key, data in heapq.merge(hot, archived, key=itemgetter(0), reverse=self.descending):
+            if key[1] not in seen:  # A round archived while it was still being deleted
+                seen.add(key[1])
+                page.append((key, data))
+        self.has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if not self.descending:
+            page.reverse()
+        self.page = page
+
+    def get_paginated_data(self, url):
+        page = self.page
+        if self.descending:
+            has_next, has_previous = self.has_more, self.position is not None
+        else:
+            has_next, has_previous = True, self.has_more
+        return {
+            'next': replace_query_param(url, 'cursor', encode_cursor('n', page[-1][0])) if page and has_next else None,
+            'previous': replace_query_param(url, 'cursor', encode_cursor('p', page[0][0])) if page and has_previous else None,
+            'results': [data for _, data in page],
+        }
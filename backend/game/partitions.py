@@ -0,0 +1,126 @@
+"""
+Monthly partitions of the game table.
+
+On PostgreSQL, migration 0008 turns ``game_game`` into a table partitioned by
+range of ``created_at``: one partition per calendar month (UTC) named
+``game_game_pYYYY_MM``, plus ``game_game_default`` for rows outside every
+partition. Queries that filter on ``created_at`` only touch the matching
+months, and an archived month is dropped as a whole table instead of deleted
+row by row (see ``game.archive``).
+
+Other databases keep a single table. There a month is a ``created_at`` range,
+served by the ``game_created_idx`` index, and the functions below that manage
+partitions do nothing.
+"""
+import re
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+
+TABLE = 'game_game'
+DEFAULT_PARTITION = 'game_game_default'
+PARTITION_NAME = re.compile(r'^game_game_p(\d{4})_(\d{2})$')
+
+
+def add_months(year, month, n):
+    """The ``(year, month)`` ``n`` months after (or before, when negative) the given one."""
+    index = year * 12 + month - 1 + n
+    return index // 12, index % 12 + 1
+
+
+def month_range(year, month):
+    """``(start, end)`` of a month in UTC, end exclusive."""
+    next_year, next_month = add_months(year, month, 1)
+    return (
+        datetime(year, month, 1, tzinfo=timezone.utc),
+        datetime(next_year, next_month, 1, tzinfo=timezone.utc),
+    )
+
+
+def partition_name(year, month):
+    return f'{TABLE}_p{year:04d}_{month:02d}'
+
+
+def is_partitioned():
+    """Whether the game table is a partitioned PostgreSQL table."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def partitions():
+    """The ``(year, month)`` of every monthly partition, oldest first."""
+    if not is_partitioned():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(
+        (int(match[1]), int(match[2])) for match in map(PARTITION_NAME.match, names) if match
+    )
+
+
+def create_partition(year, month):
+    """
+    Create the partition for a month.
+
+    Rows of that month already in the default partition are moved into it
+    (PostgreSQL refuses to create the partition while they are there).
+    """
+    start, end = month_range(year, month)
+    quote = connection.ops.quote_name
+    name, table, default = quote(partition_name(year, month)), quote(TABLE), quote(DEFAULT_PARTITION)
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = f"created_at >= '{start.isoformat()}' AND created_at < '{end.isoformat()}'"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})")
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}")
+            return
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}")
+        cursor.execute(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}")
+        cursor.execute(f"DELETE FROM {default} WHERE {in_range}")
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+
+def ensure_partitions(months_ahead, now=None):
+    """Create any missing partition from the current month to ``months_ahead`` months later; return the new ones."""
+    if not is_partitioned():
+        return []
+    now = now or datetime.now(timezone.utc)
+    existing = set(partitions())
+    created = []
+    for n in range(months_ahead + 1):
+        month = add_months(now.year, now.month, n)
+        if month not in existing:
+            create_partition(*month)
+            created.append(month)
+    return created
+
+
+def drop_partition(year, month, expected_rows):
+    """
+    Detach and drop a month's partition if it holds exactly ``expected_rows`` rows.
+
+    Writes to the game table wait while the partition is counted, so no row can
+    arrive between the count and the drop. Returns whether the partition was dropped.
+    """
+    if (year, month) not in partitions():
+        return False
+    quote = connection.ops.quote_name
+    name, table = quote(partition_name(year, month)), quote(TABLE)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {table} IN SHARE MODE")
+        cursor.execute(f"SELECT count(*) FROM {name}")
+        if cursor.fetchone()[0] != expected_rows:
+            return False
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+    return True
@@ -1,24 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
+
+from core.metrics import TimedSerializerMixin
+from core.serializers import ValuesSerializer
+from .engine import RPS
 from .models import Game, GameStats
 
-class GameSerializer(serializers.ModelSerializer):
+class GameSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Game
         fields = ['id', 'user', 'user_choice', 'computer_choice', 
                   'result', 'status', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'computer_choice', 'result', 
+        read_only_fields = ['id', 'user', 'computer_choice', 'result', 
                            'status', 'created_at', 'updated_at']
 
     def validate_user_choice(self, value):
-        valid_choices = [choice[0] for choice in Game.CHOICES]
-        if value not in valid_choices:
+        if not RPS.is_move(value):
             raise serializers.ValidationError(
-                f"Invalid choice. Must be one of: {', '.join(valid_choices)}"
+                f"Invalid choice. Must be one of: {', '.join(RPS.moves)}"
             )
         return value
 
 
-class GameStatsSerializer(serializers.ModelSerializer):
+class GameReadSerializer(ValuesSerializer):
+    """Read-only GameSerializer output built from ``values_list()`` rows."""
+    fields = ('id', ('user', 'user_id'), 'user_choice', 'computer_choice',
+              'result', 'status', 'created_at', 'updated_at')
+
+
+class BatchPlaySerializer(TimedSerializerMixin, serializers.Serializer):
+    user_choices = serializers.ListField(
+        child=serializers.ChoiceField(choices=Game.CHOICES),
+        min_length=1,
+        max_length=settings.GAME_BATCH_MAX_ROUNDS,
+    )
+
+
+class StatsRangeSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Query parameters of the date-range statistics API; defaults to the last 7 days."""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    bucket = serializers.ChoiceField(choices=['day', 'week'], default='day')
+    
+    def validate(self, attrs):
+        end = attrs.get('end') or timezone.localdate()
+        start = attrs.get('start') or end - timedelta(days=6)
+        if start > end:
+            raise serializers.ValidationError("start must not be after end.")
+        if (end - start).days >= settings.GAME_STATS_MAX_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"The range can span at most {settings.GAME_STATS_MAX_RANGE_DAYS} days."
+            )
+        attrs['start'], attrs['end'] = start, end
+        return attrs
+
+
+class GameStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     win_percentage = serializers.SerializerMethodField()
     
     class Meta:
@@ -31,4 +71,17 @@ class GameStatsSerializer(serializers.ModelSerializer):
     def get_win_percentage(self, obj):
         if obj.total_games > 0:
             return round((obj.wins / obj.total_games) * 100, 2)
-        return 0.0 
\ No newline at end of file
+        return 0.0
+
+
+class GameStatsReadSerializer(ValuesSerializer):
+    """Read-only GameStatsSerializer output for an already loaded GameStats."""
+    fields = ('id', ('user', 'user_id'), 'total_games', 'wins', 'losses', 'draws')
+
+    @classmethod
+    def from_instance(cls, instance):
+        data = super().from_instance(instance)
+        data['win_percentage'] = (
+            round((instance.wins / instance.total_games) * 100, 2) if instance.total_games > 0 else 0.0
+        )
+        return data
@@ -1,3 +1,1024 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.replicas import current_replica
+from core.renderers import ORJSONRenderer
+from core.throttling import get_store
+
+from . import archive, partitions
+from .archive import archive_month, game_archive
+from .cache import stats_cache
+from .engine import DRAW, LOSE, RESULTS, RPS, RPSLS, WIN, Ruleset
+from .events import CacheBroker, get_broker, make_ticket, publish_games, read_ticket
+from .export import csv_lines, ndjson_lines
+from .leaderboard import Leaderboard
+from .models import DailyStats, FlushedRoundLog, Game, GameStats, increment_counters
+from .pagination import decode_cursor, encode_cursor
+from .serializers import GameReadSerializer, GameSerializer, GameStatsReadSerializer, GameStatsSerializer
+from .writebehind import RoundLog, Segment, new_game, write_rounds
+
+
+def make_user(username, **kwargs):
+    user = User.objects.create_user(username, **kwargs)
+    return user, Token.objects.create(user=user)
+
+
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def set_created_at(game_ids, created_at):
+    Game.objects.filter(id__in=game_ids).update(created_at=created_at, updated_at=created_at)
+
+
+class GameTestMixin:
+    """Fresh caches and throttles for every test, and an authenticated client."""
+
+    def setUp(self):
+        cache.clear()
+        get_store().clear()
+        self.user, self.token = make_user('player')
+        self.client = token_client(self.token)
+
+    def play(self, choice='rock'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/game/play/', {'user_choice': choice}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+
+class EngineTests(TestCase):
+    def test_rps_outcome_table(self):
+        self.assertEqual(RPS.moves, ('rock', 'paper', 'scissors'))
+        for u, user in enumerate(RPS.moves):
+            for c, computer in enumerate(RPS.moves):
+                # Classic RPS: the outcome is (user - computer) % 3
+                self.assertEqual(RPS.outcomes[u][c], (u - c) % 3)
+                self.assertEqual(RPS.resolve(user, computer), RESULTS[(u - c) % 3])
+
+    def test_resolve(self):
+        self.assertEqual(RPS.resolve('rock', 'scissors'), 'win')
+        self.assertEqual(RPS.resolve('rock', 'paper'), 'lose')
+        self.assertEqual(RPS.resolve('paper', 'paper'), 'draw')
+        self.assertEqual(Game.resolve('scissors', 'paper'), 'win')
+
+    def test_rpsls_is_balanced(self):
+        for u in range(len(RPSLS.moves)):
+            row = RPSLS.outcomes[u]
+            self.assertEqual((row.count(WIN), row.count(LOSE), row.count(DRAW)), (2, 2, 1))
+
+    def test_inconsistent_rules_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Ruleset('bad', {'a': ('b',), 'b': ('a',)})
+
+    def test_resolve_many_and_tally(self):
+        users = RPS.encode(['rock', 'rock', 'paper', 'scissors'])
+        computers = RPS.encode(['scissors', 'paper', 'paper', 'paper'])
+        self.assertEqual(list(RPS.resolve_many(users, computers)), [WIN, LOSE, DRAW, WIN])
+        self.assertEqual(RPS.count_results(users, computers), {'draw': 1, 'win': 2, 'lose': 1})
+
+    def test_resolve_many_covers_every_pair(self):
+        n = len(RPSLS.moves)
+        users = [u for u in range(n) for _ in range(n)]
+        computers = list(range(n)) * n
+        self.assertEqual(RPSLS.resolve_many(users, computers), [RPSLS.outcomes[u][c] for u, c in zip(users, computers)])
+
+    def test_simulate_is_reproducible(self):
+        first = RPS.simulate(500, seed=7)
+        second = RPS.simulate(500, seed=7)
+        self.assertEqual(list(first[2]), list(second[2]))
+        self.assertEqual(sum(RPS.tally(first[2]).values()), 500)
+
+    def test_random_moves(self):
+        self.assertIn(RPS.random_move(), RPS.moves)
+        self.assertTrue(set(RPS.random_moves(50)) <= set(RPS.moves))
+
+
+class EncodedChoiceFieldTests(TestCase):
+    def test_columns_store_codes(self):
+        user, _ = make_user('encoded')
+        game = Game.objects.create(
+            user=user, user_choice='scissors', computer_choice='paper', result='win', status='completed',
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT user_choice, computer_choice, result, status FROM game_game WHERE id = %s", [game.id],
+            )
+            self.assertEqual(cursor.fetchone(), (2, 1, 1, 1))
+        game.refresh_from_db()
+        self.assertEqual(
+            (game.user_choice, game.computer_choice, game.result, game.status),
+            ('scissors', 'paper', 'win', 'completed'),
+        )
+
+    def test_lookups_use_values(self):
+        user, _ = make_user('lookups')
+        Game.objects.create(user=user, user_choice='rock', computer_choice='rock', result='draw')
+        Game.objects.create(user=user, user_choice='paper', computer_choice='rock', result=None)
+        self.assertEqual(Game.objects.filter(result='draw').count(), 1)
+        self.assertEqual(Game.objects.filter(result__isnull=True).count(), 1)
+        self.assertEqual(Game.objects.filter(user_choice__in=['paper', 'scissors']).count(), 1)
+        self.assertEqual(Game.objects.get(result__isnull=True).status, 'active')
+
+    def test_invalid_value(self):
+        user, _ = make_user('invalid')
+        with self.assertRaises(ValueError):
+            Game.objects.create(user=user, user_choice='lizard', computer_choice='rock')
+
+    def test_unknown_codes(self):
+        field = Game._meta.get_field('result')
+        self.assertEqual(field.to_python(1), 'win')
+        for code in (3, -1):
+            with self.assertRaises(ValidationError) as cm:
+                field.to_python(code)
+            self.assertEqual(cm.exception.code, 'invalid_choice')
+        user, _ = make_user('unknown')
+        game = Game.objects.create(user=user, user_choice='rock', computer_choice='rock', result='draw')
+        Game.objects.filter(pk=game.pk).update(result=7)
+        with self.assertRaisesMessage(ValueError, 'game_game.result holds code 7'):
+            game.refresh_from_db()
+
+
+class EncodedColumnMigrationTests(TransactionTestCase):
+    """Migrations 0004-0006 move existing string values into the integer columns and back."""
+
+    before = [('game', '0003_flushedroundlog')]
+    after = [('game', '0006_swap_game_encoded_columns')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(executor_leaf_nodes())
+
+    def test_round_trip(self):
+        user, _ = make_user('migrated')
+        apps = self.migrate(self.before)
+        OldGame = apps.get_model('game', 'Game')
+        old = OldGame.objects.create(
+            user_id=user.id, user_choice='paper', computer_choice='scissors', result='lose', status='completed',
+        )
+        pending = OldGame.objects.create(user_id=user.id, user_choice='rock', computer_choice='rock')
+
+        self.migrate(self.after + [('game', '0007_dailystats')])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT user_choice, computer_choice, result, status FROM game_game WHERE id = %s", [old.id])
+            self.assertEqual(cursor.fetchone(), (1, 2, 2, 1))
+            cursor.execute("SELECT result, status FROM game_game WHERE id = %s", [pending.id])
+            self.assertEqual(cursor.fetchone(), (None, 0))
+
+        apps = self.migrate(self.before)
+        OldGame = apps.get_model('game', 'Game')
+        restored = OldGame.objects.get(id=old.id)
+        self.assertEqual(
+            (restored.user_choice, restored.computer_choice, restored.result, restored.status),
+            ('paper', 'scissors', 'lose', 'completed'),
+        )
+
+
+def executor_leaf_nodes():
+    executor = MigrationExecutor(connection)
+    return executor.loader.graph.leaf_nodes()
+
+
+class PlayTests(GameTestMixin, TestCase):
+    def test_play(self):
+        data = self.play('paper')
+        self.assertEqual(data['user_choice'], 'paper')
+        self.assertIn(data['result'], ('win', 'lose', 'draw'))
+        self.assertEqual(data['result'], RPS.resolve('paper', data['computer_choice']))
+        game = Game.objects.get(id=data['id'])
+        self.assertEqual(game.status, 'completed')
+        stats = GameStats.objects.get(user=self.user)
+        self.assertEqual(stats.total_games, 1)
+
+    def test_invalid_choice(self):
+        response = self.client.post('/api/game/play/', {'user_choice': 'lizard'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Game.objects.exists())
+
+    def test_stats_add_up(self):
+        for choice in ('rock', 'paper', 'scissors', 'rock'):
+            self.play(choice)
+        stats = GameStats.objects.get(user=self.user)
+        self.assertEqual(stats.total_games, 4)
+        self.assertEqual(stats.wins + stats.losses + stats.draws, 4)
+        self.assertEqual(stats.wins, Game.objects.filter(user=self.user, result='win').count())
+
+    def test_play_is_one_insert_and_atomic_updates(self):
+        self.play()
+        with CaptureQueriesContext(connection) as queries:
+            self.play()
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(len([q for q in sql if q.startswith('INSERT')]), 1)
+        # The stats are bumped in place, never read first
+        self.assertEqual(len([q for q in sql if 'game_gamestats' in q]), 1)
+        self.assertTrue(next(q for q in sql if 'game_gamestats' in q).startswith('UPDATE'))
+
+
+class IncrementCountersTests(TestCase):
+    def test_creates_then_updates(self):
+        user, _ = make_user('counters')
+        GameStats.record_results(user, {'win': 2, 'draw': 1})
+        with self.assertNumQueries(1):
+            GameStats.record_results(user, {'lose': 1, 'win': 1})
+        stats = GameStats.objects.get(user=user)
+        self.assertEqual((stats.total_games, stats.wins, stats.losses, stats.draws), (5, 3, 1, 1))
+
+    def test_lost_insert_race_falls_back_to_update(self):
+        user, _ = make_user('race')
+        GameStats.objects.create(user=user, total_games=1, wins=1)
+        update = QuerySet.update
+        calls = []
+
+        def update_missing_first(queryset, **kwargs):
+            # The first UPDATE runs before the other request's INSERT, so it matches nothing
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update_missing_first):
+            increment_counters(GameStats, {'user': user}, {'total_games': 1, 'draws': 1})
+        self.assertEqual(len(calls), 2)
+        stats = GameStats.objects.get(user=user)
+        self.assertEqual((stats.total_games, stats.wins, stats.draws), (2, 1, 1))
+
+
+class StatsCacheTests(GameTestMixin, TestCase):
+    def test_warm_read_runs_no_queries(self):
+        self.play()
+        self.client.get('/api/game/stats/')
+        with self.assertNumQueries(0):
+            data = self.client.get('/api/game/stats/').json()
+        self.assertEqual(data['total_games'], 1)
+
+    def test_play_updates_cached_counters(self):
+        self.assertEqual(self.client.get('/api/game/stats/').json()['total_games'], 0)
+        for _ in range(3):
+            self.play()
+        with self.assertNumQueries(0):
+            data = self.client.get('/api/game/stats/').json()
+        stats = GameStats.objects.get(user=self.user)
+        self.assertEqual(
+            (data['total_games'], data['wins'], data['losses'], data['draws']),
+            (3, stats.wins, stats.losses, stats.draws),
+        )
+
+    def key(self, field):
+        return stats_cache._key(self.user.id, stats_cache.generation(self.user.id), field)
+
+    def test_partial_entry_is_reloaded(self):
+        self.play()
+        stats_cache.get(self.user)
+        cache.delete(self.key('wins'))
+        stats_cache.apply_result(self.user.id, 'win')
+        self.assertIsNone(cache.get(self.key('total_games')))
+        self.assertEqual(stats_cache.get(self.user).total_games, 1)
+
+    def test_concurrent_play_during_a_miss_is_not_lost(self):
+        loaded = GameStats.objects.get_or_create(user=self.user)[0]
+        real_first = QuerySet.first
+
+        def first_then_play(queryset):
+            stats = real_first(queryset)
+            # A round commits after the miss loaded the counters, and its incr finds no entry
+            self.play()
+            return stats
+
+        with mock.patch.object(QuerySet, 'first', first_then_play):
+            self.assertEqual(stats_cache.get(self.user).total_games, loaded.total_games)
+        self.assertEqual(stats_cache.get(self.user).total_games, 1)
+
+    def test_replica_fills_expire_sooner(self):
+        token = current_replica.set('default')  # Stands in for a replica alias
+        try:
+            with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+                stats_cache.get(self.user)
+        finally:
+            current_replica.reset(token)
+        self.assertEqual(set_many.call_args[0][1], settings.REPLICA_STICKY_SECONDS)
+
+    def test_metrics_are_staff_only(self):
+        self.assertEqual(self.client.get('/api/game/stats/cache/').status_code, 403)
+        staff, token = make_user('staff', is_staff=True)
+        data = token_client(token).get('/api/game/stats/cache/').json()
+        self.assertEqual(set(data), {'hits', 'misses', 'hit_ratio'})
+
+
+class HistoryPaginationTests(GameTestMixin, TestCase):
+    def walk(self, url, key='next'):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            ids += [game['id'] for game in data['results']]
+            url = data[key]
+        return ids, data
+
+    def test_pages_cover_history_newest_first(self):
+        for _ in range(25):
+            self.play()
+        ids, last = self.walk('/api/game/history/?page_size=10')
+        self.assertEqual(ids, list(Game.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+        self.assertIsNone(last['next'])
+        self.assertIsNotNone(last['previous'])
+
+    def test_previous_link(self):
+        for _ in range(9):
+            self.play()
+        all_ids = list(Game.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        first = self.client.get('/api/game/history/?page_size=4').json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([game['id'] for game in second['results']], all_ids[4:8])
+        back = self.client.get(second['previous']).json()
+        self.assertEqual([game['id'] for game in back['results']], all_ids[:4])
+
+    def test_ties_on_created_at(self):
+        for _ in range(7):
+            self.play()
+        set_created_at(Game.objects.values_list('id', flat=True), datetime(2025, 3, 1, tzinfo=dt_timezone.utc))
+        ids, _ = self.walk('/api/game/history/?page_size=3')
+        self.assertEqual(ids, sorted(Game.objects.values_list('id', flat=True), reverse=True))
+
+    def test_only_own_games(self):
+        other, other_token = make_user('other')
+        token_client(other_token).post('/api/game/play/', {'user_choice': 'rock'}, format='json')
+        self.play()
+        ids, _ = self.walk('/api/game/history/')
+        self.assertEqual(ids, list(Game.objects.filter(user=self.user).values_list('id', flat=True)))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/game/history/?cursor=garbage').status_code, 400)
+        naive = encode_cursor('n', (datetime(2025, 3, 17, 10, 55), 42))
+        self.assertEqual(self.client.get(f'/api/game/history/?cursor={naive}').status_code, 400)
+
+    def test_page_size_is_capped(self):
+        for _ in range(3):
+            self.play()
+        with mock.patch('game.pagination.GameHistoryPagination.max_page_size', 2):
+            data = self.client.get('/api/game/history/?page_size=1000').json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(len(self.client.get('/api/game/history/?page_size=abc').json()['results']), 3)
+
+    def test_cursor_round_trip(self):
+        key = (datetime(2025, 3, 17, 10, 55, tzinfo=dt_timezone.utc), 42)
+        self.assertEqual(decode_cursor(encode_cursor('p', key)), ('p', key))
+        self.assertIsNone(decode_cursor('eHx5'))
+        self.assertIsNone(decode_cursor(encode_cursor('p', (key[0].replace(tzinfo=None), 42))))
+
+
+class BatchPlayTests(GameTestMixin, TestCase):
+    def test_batch(self):
+        response = self.client.post(
+            '/api/game/play/batch/', {'user_choices': ['rock', 'paper', 'scissors'] * 4}, format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(len(data['games']), 12)
+        self.assertEqual([game['user_choice'] for game in data['games']], ['rock', 'paper', 'scissors'] * 4)
+        self.assertTrue(all(game['id'] for game in data['games']))
+        summary = data['summary']
+        self.assertEqual(summary['wins'] + summary['losses'] + summary['draws'], 12)
+        stats = GameStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_games, stats.wins), (12, summary['wins']))
+        self.assertEqual(Game.objects.filter(user=self.user).count(), 12)
+
+    def test_invalid_batches(self):
+        for choices in ([], ['rock', 'lizard']):
+            response = self.client.post('/api/game/play/batch/', {'user_choices': choices}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Game.objects.exists())
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.users = [make_user(f'ranked{i}')[0] for i in range(4)]
+        for user, (total, wins) in zip(self.users, [(5, 3), (1, 1), (4, 3), (10, 2)]):
+            GameStats.objects.create(user=user, total_games=total, wins=wins)
+        self.leaderboard = Leaderboard(min_games=2)
+
+    def test_rankings(self):
+        users = self.users
+        top = self.leaderboard.top_by_wins(10)
+        self.assertEqual([e['user_id'] for e in top], [users[0].id, users[2].id, users[3].id, users[1].id])
+        self.assertEqual([e['rank'] for e in top], [1, 1, 3, 4])
+        by_rate = self.leaderboard.top_by_win_rate(10)
+        self.assertEqual([e['user_id'] for e in by_rate], [users[2].id, users[0].id, users[3].id])
+        self.assertEqual([e['rank'] for e in by_rate], [1, 2, 3])
+        self.assertEqual(by_rate[0]['win_percentage'], 75.0)
+
+    def test_ties_on_win_rate_share_a_rank(self):
+        user = make_user('ranked4')[0]
+        GameStats.objects.create(user=user, total_games=10, wins=6)
+        by_rate = self.leaderboard.top_by_win_rate(10)
+        # 6/10 and 3/5 tie; the player with more games is listed first
+        self.assertEqual([e['user_id'] for e in by_rate][1:3], [user.id, self.users[0].id])
+        self.assertEqual([e['rank'] for e in by_rate], [1, 2, 2, 4])
+        self.assertEqual(self.leaderboard.rank(self.users[0].id)['by_win_rate'], 2)
+
+    def test_ranks_follow_the_table(self):
+        users = self.users
+        GameStats.objects.filter(user=users[1]).update(total_games=4, wins=4)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.leaderboard.rank(users[1].id), {'by_wins': 1, 'by_win_rate': 1})
+        self.assertEqual(self.leaderboard.rank(users[3].id)['by_wins'], 4)
+        self.assertEqual(self.leaderboard.rank(make_user('unranked')[0].id), {'by_wins': None, 'by_win_rate': None})
+        GameStats.objects.create(user=make_user('idle')[0])
+        self.assertEqual(len(self.leaderboard.top_by_wins(10)), 4)
+
+    def test_win_rate_needs_min_games(self):
+        GameStats.objects.filter(user=self.users[1]).update(total_games=1, wins=1)
+        self.assertEqual(self.leaderboard.rank(self.users[1].id), {'by_wins': 4, 'by_win_rate': None})
+        self.assertEqual(len(Leaderboard(min_games=0).top_by_win_rate(10)), 4)
+
+    def test_endpoint(self):
+        client = token_client(Token.objects.get(user=self.users[0]))
+        with mock.patch('game.views.leaderboard', self.leaderboard):
+            data = client.get('/api/game/leaderboard/?limit=2').json()
+        self.assertEqual(len(data['by_wins']), 2)
+        self.assertEqual(data['by_wins'][0]['username'], 'ranked0')
+        self.assertEqual(data['me'], {'by_wins': 1, 'by_win_rate': 2})
+        self.assertEqual(client.get('/api/game/leaderboard/?limit=x').status_code, 400)
+
+
+class DailyStatsTests(GameTestMixin, TestCase):
+    def test_play_updates_todays_bucket(self):
+        for choice in ('rock', 'rock', 'paper'):
+            self.play(choice)
+        bucket = DailyStats.objects.get(user=self.user)
+        self.assertEqual((bucket.total_games, bucket.rock, bucket.paper, bucket.scissors), (3, 2, 1, 0))
+        stats = GameStats.objects.get(user=self.user)
+        self.assertEqual((bucket.wins, bucket.losses, bucket.draws), (stats.wins, stats.losses, stats.draws))
+
+    def test_range_api(self):
+        games = [self.play() for _ in range(4)]
+        set_created_at([games[0]['id']], datetime(2025, 3, 3, 12, tzinfo=dt_timezone.utc))  # Monday
+        set_created_at([games[1]['id']], datetime(2025, 3, 5, 12, tzinfo=dt_timezone.utc))
+        set_created_at([games[2]['id'], games[3]['id']], datetime(2025, 3, 11, 12, tzinfo=dt_timezone.utc))
+        call_command('backfill_daily_stats', stdout=open(os.devnull, 'w'))
+
+        data = self.client.get('/api/game/stats/range/?start=2025-03-01&end=2025-03-31').json()
+        self.assertEqual(data['totals']['total_games'], 4)
+        self.assertEqual([b['start'] for b in data['buckets']], ['2025-03-03', '2025-03-05', '2025-03-11'])
+        weekly = self.client.get('/api/game/stats/range/?start=2025-03-01&end=2025-03-31&bucket=week').json()
+        self.assertEqual([(b['start'], b['total_games']) for b in weekly['buckets']], [('2025-03-03', 2), ('2025-03-10', 2)])
+
+    def test_range_validation(self):
+        self.assertEqual(self.client.get('/api/game/stats/range/?start=2025-03-02&end=2025-03-01').status_code, 400)
+        self.assertEqual(self.client.get('/api/game/stats/range/?start=2020-01-01&end=2025-01-01').status_code, 400)
+
+    def test_backfill_rebuilds_the_rollups(self):
+        for choice in ('rock', 'paper', 'scissors', 'paper'):
+            self.play(choice)
+        expected = list(DailyStats.objects.values_list('user_id', 'day', *DailyStats.COUNTER_FIELDS))
+        DailyStats.objects.all().update(total_games=0, wins=0)
+        call_command('backfill_daily_stats', stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(DailyStats.objects.values_list('user_id', 'day', *DailyStats.COUNTER_FIELDS)), expected)
+
+    def test_backfill_locks_every_users_stats(self):
+        # A user who never played still gets a row for concurrent first plays to wait on
+        newcomer, _ = make_user('newcomer')
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=QuerySet.select_for_update) as lock:
+            call_command('backfill_daily_stats', stdout=open(os.devnull, 'w'))
+        self.assertTrue(lock.called)
+        self.assertTrue(GameStats.objects.filter(user=newcomer).exists())
+
+
+class ExportTests(GameTestMixin, TestCase):
+    def export(self, query='', client=None):
+        response = (client or self.client).get(f'/api/game/history/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        games = [self.play() for _ in range(3)]
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [game['id'] for game in reversed(games)])
+        self.assertEqual(rows[0], self.client.get('/api/game/history/').json()['results'][0])
+
+    def test_csv(self):
+        self.play()
+        self.play()
+        lines = self.export('?output=csv').splitlines()
+        self.assertEqual(lines[0], 'id,user,user_choice,computer_choice,result,status,created_at,updated_at')
+        self.assertEqual(len(lines), 3)
+
+    def test_streams_in_chunks(self):
+        games = [new_game(self.user, 'rock', 'paper', 'lose') for _ in range(5)]
+        Game.objects.bulk_create(games)
+        with mock.patch('game.export.CHUNK_SIZE', 2):
+            chunks = list(ndjson_lines(Game.objects.all()))
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [2, 2, 1])
+        self.assertEqual(''.join(csv_lines(Game.objects.all())).count('\n'), 6)
+
+    def test_other_users_history_is_staff_only(self):
+        self.play()
+        self.assertEqual(self.client.get(f'/api/game/history/export/?user_id={self.user.id}').status_code, 403)
+        self.assertEqual(self.client.get('/api/game/history/export/?output=xml').status_code, 400)
+        staff, token = make_user('staff', is_staff=True)
+        exported = self.export(f'?user_id={self.user.id}', client=token_client(token))
+        self.assertEqual(len(exported.splitlines()), 1)
+
+
+@override_settings(GAME_WRITE_BEHIND=True)
+class WriteBehindTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.user, _ = make_user('behind')
+
+    def round_log(self):
+        return RoundLog(self.directory, flush_interval=3600, batch_size=1000)
+
+    def test_append_and_flush(self):
+        log = self.round_log()
+        log.recover()
+        log._segment = log._new_segment()
+        log.append([new_game(self.user, 'rock', 'scissors', 'win'), new_game(self.user, 'paper', 'paper', 'draw')])
+        self.assertFalse(Game.objects.exists())
+        self.assertEqual(log.flush(), 2)
+        self.assertEqual(Game.objects.count(), 2)
+        stats = GameStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_games, stats.wins, stats.draws), (2, 1, 1))
+        self.assertEqual(DailyStats.objects.get(user=self.user).total_games, 2)
+        self.assertFalse(FlushedRoundLog.objects.exists())
+        self.assertEqual(log.flush(), 0)
+
+    def write_orphan(self, name, records, torn_tail=False):
+        lines = ''.join(json.dumps(record) + '\n' for record in records)
+        if torn_tail:
+            lines += '{"user_id": '
+        with open(os.path.join(self.directory, f'{name}.log'), 'w') as f:
+            f.write(lines)
+
+    def record(self, result='win'):
+        return {
+            'user_id': self.user.id, 'user_choice': 'rock', 'computer_choice': 'scissors',
+            'result': result, 'created_at': datetime.now(dt_timezone.utc).isoformat(),
+        }
+
+    def test_recover_replays_orphaned_segments(self):
+        self.write_orphan('1-1-dead', [self.record(), self.record('lose')], torn_tail=True)
+        self.round_log().recover()
+        self.assertEqual(Game.objects.count(), 2)
+        self.assertEqual(GameStats.objects.get(user=self.user).total_games, 2)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_recover_skips_flushed_segments(self):
+        write_rounds('1-2-dead', [self.record()])
+        self.write_orphan('1-2-dead', [self.record()])  # Committed, but the file was never removed
+        self.round_log().recover()
+        self.assertEqual(Game.objects.count(), 1)
+        self.assertFalse(FlushedRoundLog.objects.exists())
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_recover_leaves_live_segments(self):
+        live = Segment(self.directory, '1-3-live')
+        self.assertTrue(live.try_lock())
+        live.append((json.dumps(self.record()) + '\n').encode())
+        self.round_log().recover()
+        self.assertFalse(Game.objects.exists())
+        self.assertEqual(os.listdir(self.directory), ['1-3-live.log'])
+        live.remove()
+
+    def test_rounds_keep_the_time_they_were_played(self):
+        played_at = datetime(2024, 3, 9, 23, 30, tzinfo=dt_timezone.utc)
+        self.write_orphan('1-4-dead', [dict(self.record(), created_at=played_at.isoformat())])
+        self.round_log().recover()
+        self.assertEqual(Game.objects.get().created_at, played_at)
+        self.assertEqual(DailyStats.objects.get().day, played_at.date())
+
+    def test_rejected_segment_is_moved_aside(self):
+        log = RoundLog(self.directory, flush_interval=3600, batch_size=1000, max_attempts=2)
+        log.recover()
+        log._segment = log._new_segment()
+        log.append([new_game(User(id=self.user.id + 100), 'rock', 'paper', 'lose')])  # No such user
+        with self.assertRaises(IntegrityError):
+            log.flush()
+        log.append([new_game(self.user, 'rock', 'scissors', 'win')])
+        # The second rejection sets the first segment aside and lets the next one through
+        with self.assertLogs('game.writebehind', 'ERROR'):
+            self.assertEqual(log.flush(), 1)
+        self.assertEqual(Game.objects.get().user, self.user)
+        failed = [name for name in os.listdir(self.directory) if name.endswith('.failed')]
+        self.assertEqual(len(failed), 1)
+        # Ignored by recovery until it is renamed back
+        self.round_log().recover()
+        self.assertEqual(Game.objects.count(), 1)
+
+    def test_recover_moves_rejected_segments_aside(self):
+        self.write_orphan('1-5-dead', [dict(self.record(), user_id=self.user.id + 100)])
+        with self.assertLogs('game.writebehind', 'ERROR'):
+            self.round_log().recover()
+        self.assertEqual(os.listdir(self.directory), ['1-5-dead.failed'])
+
+    def test_fsync_policy(self):
+        log = RoundLog(self.directory, flush_interval=3600, batch_size=1000, fsync='always')
+        log._segment = log._new_segment()
+        with mock.patch.object(Segment, 'sync') as sync:
+            log.append([new_game(self.user, 'rock', 'scissors', 'win')])
+            sync.assert_called_once_with()
+            log.fsync = 'flush'
+            log.append([new_game(self.user, 'rock', 'scissors', 'win')])
+            sync.assert_called_once_with()
+        log._segment.remove()
+
+    def test_play_endpoint_queues_rounds(self):
+        client = token_client(Token.objects.get(user=self.user))
+        log = self.round_log()
+        log.recover()
+        log._segment = log._new_segment()
+        with mock.patch('game.views.get_round_log', return_value=log):
+            data = client.post('/api/game/play/', {'user_choice': 'rock'}, format='json').json()
+        self.assertIsNone(data['id'])
+        self.assertFalse(Game.objects.exists())
+        log.flush()
+        self.assertEqual(Game.objects.get().result, data['result'])
+
+
+class BlockCacheTests(TestCase):
+    @mock.patch('game.archive._decode_block', side_effect=lambda path, offset, length: ((path, offset), length))
+    def test_bounded_by_size(self, decode):
+        blocks = archive.BlockCache(max_bytes=100)
+        blocks.get('a', 0, 20)
+        blocks.get('b', 0, 20)
+        self.assertEqual(blocks.get('a', 0, 20), ('a', 0))
+        self.assertEqual(decode.call_count, 2)
+        for i in range(4):
+            blocks.get('c', i, 20)
+        # 'b' was the least recently used
+        self.assertEqual((len(blocks), blocks.size), (5, 100))
+        blocks.get('b', 0, 20)
+        self.assertEqual(decode.call_count, 7)
+        self.assertLessEqual(blocks.size, 100)
+
+        # A block over a quarter of the budget is never kept
+        blocks.get('big', 0, 26)
+        blocks.get('big', 0, 26)
+        self.assertEqual(decode.call_count, 9)
+        self.assertNotIn(('big', 0, 26), blocks._blocks)
+
+
+class ArchiveTests(GameTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = override_settings(GAME_ARCHIVE_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        previous = game_archive.directory
+        game_archive.directory = self.directory
+        game_archive.refresh()
+        archive._block_cache.clear()
+
+        def restore():
+            game_archive.directory = previous
+            game_archive.refresh()
+        self.addCleanup(restore)
+
+    def play_in(self, month, count=3, user_client=None):
+        """Play ``count`` rounds and move them into ``(year, month)``, a minute apart."""
+        ids = [self.play()['id'] for _ in range(count)]
+        start = partitions.month_range(*month)[0]
+        for i, game_id in enumerate(ids):
+            set_created_at([game_id], start + timedelta(days=1, minutes=i))
+        return ids
+
+    def history(self, page_size=4):
+        ids, url = [], f'/api/game/history/?page_size={page_size}'
+        while url:
+            data = self.client.get(url).json()
+            ids += [game['id'] for game in data['results']]
+            url = data['next']
+        return ids
+
+    def test_month_helpers(self):
+        self.assertEqual(partitions.add_months(2025, 12, 1), (2026, 1))
+        self.assertEqual(partitions.add_months(2025, 1, -1), (2024, 12))
+        self.assertEqual(
+            partitions.month_range(2025, 2),
+            (datetime(2025, 2, 1, tzinfo=dt_timezone.utc), datetime(2025, 3, 1, tzinfo=dt_timezone.utc)),
+        )
+        self.assertEqual(partitions.partition_name(2025, 3), 'game_game_p2025_03')
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite only")
+    def test_partitions_are_a_no_op_on_sqlite(self):
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(partitions.partitions(), [])
+        self.assertEqual(partitions.ensure_partitions(3), [])
+        self.assertFalse(partitions.drop_partition(2025, 1, expected_rows=0))
+
+    @skipUnless(connection.vendor == 'postgresql', "Partitioning is PostgreSQL only")
+    def test_partitions_on_postgresql(self):
+        self.assertTrue(partitions.is_partitioned())
+        self.play_in((2024, 1))
+        self.assertNotIn((2024, 1), partitions.partitions())
+        # The rows sit in the default partition until their month's partition exists
+        partitions.create_partition(2024, 1)
+        self.assertIn((2024, 1), partitions.partitions())
+        self.assertEqual(Game.objects.filter(created_at__year=2024).count(), 3)
+        self.assertFalse(partitions.drop_partition(2024, 1, expected_rows=2))
+        # The rows were inserted in this test's transaction: run their deferred foreign key checks
+        # now, or the partition cannot be dropped (committed rows have none pending)
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        self.assertEqual(archive_month(2024, 1), (3, 3))
+        self.assertNotIn((2024, 1), partitions.partitions())
+        self.assertEqual(len(self.history()), 3)
+
+    def test_round_trip(self):
+        old = self.play_in((2024, 1)) + self.play_in((2024, 2))
+        recent = [self.play()['id'] for _ in range(2)]
+        history = self.history()
+        export = self.client.get('/api/game/history/export/')
+        export = b''.join(export.streaming_content)
+        stats = self.client.get('/api/game/stats/').json()
+
+        self.assertEqual(archive_month(2024, 1), (3, 3))
+        self.assertEqual(archive_month(2024, 2), (3, 3))
+        self.assertEqual(sorted(Game.objects.values_list('id', flat=True)), sorted(recent))
+        self.assertTrue(game_archive.has_user(self.user.id))
+        self.assertEqual(game_archive.archived_until(), datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+
+        self.assertEqual(self.history(), history)
+        self.assertEqual(set(history[2:]), set(old))
+        exported = self.client.get('/api/game/history/export/')
+        self.assertEqual(b''.join(exported.streaming_content), export)
+        self.assertEqual(self.client.get('/api/game/stats/').json(), stats)
+
+    def test_previous_page_across_the_archive(self):
+        self.play_in((2024, 1), count=5)
+        self.play()
+        archive_month(2024, 1)
+        first = self.client.get('/api/game/history/?page_size=2').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_rearchiving_merges_late_rows(self):
+        self.play_in((2024, 1), count=2)
+        archive_month(2024, 1)
+        late = self.play_in((2024, 1), count=1)
+        self.assertEqual(archive_month(2024, 1), (3, 1))
+        self.assertEqual(archive_month(2024, 1), (3, 0))
+        self.assertIn(late[0], self.history())
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.endswith('.gz')]), 1)
+
+    def test_command(self):
+        self.play_in((2024, 1), count=2)
+        recent = self.play()['id']
+        call_command('archive_games', '--dry-run', stdout=open(os.devnull, 'w'))
+        self.assertEqual(Game.objects.count(), 3)
+        call_command('archive_games', stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(Game.objects.values_list('id', flat=True)), [recent])
+        self.assertEqual(len(self.history()), 3)
+
+    def test_backfill_keeps_archived_days(self):
+        self.play_in((2024, 1), count=2)
+        self.play()
+        call_command('backfill_daily_stats', stdout=open(os.devnull, 'w'))
+        archive_month(2024, 1)
+        expected = list(DailyStats.objects.order_by('day').values_list('day', 'total_games'))
+        call_command('backfill_daily_stats', stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(DailyStats.objects.order_by('day').values_list('day', 'total_games')), expected)
+
+
+class PartitionMigrationTests(TransactionTestCase):
+    """Migration 0008 partitions the games table on PostgreSQL, keeping the rows and ids, and undoes it."""
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+
+    def relkind(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE relname = 'game_game'")
+            return cursor.fetchone()[0]
+
+    def test_nothing_references_games(self):
+        # A partitioned table's primary key is (id, created_at), so no foreign key can point at it
+        self.assertEqual(Game._meta.related_objects, ())
+
+    @skipUnless(connection.vendor == 'postgresql', "Partitioning is PostgreSQL only")
+    def test_round_trip(self):
+        self.addCleanup(self.migrate, executor_leaf_nodes())
+        user, _ = make_user('partitioned')
+        old = Game.objects.create(user=user, user_choice='rock', computer_choice='paper', result='lose',
+                                  created_at=datetime(2024, 1, 5, tzinfo=dt_timezone.utc))
+        recent = Game.objects.create(user=user, user_choice='rock', computer_choice='rock', result='draw')
+        self.assertEqual(self.relkind(), 'p')
+
+        self.migrate([('game', '0007_dailystats')])
+        self.assertEqual(self.relkind(), 'r')
+        self.assertEqual(list(Game.objects.order_by('id').values_list('id', flat=True)), [old.id, recent.id])
+
+        self.migrate(executor_leaf_nodes())
+        self.assertEqual(self.relkind(), 'p')
+        self.assertEqual(Game.objects.get(id=old.id).result, 'lose')
+        # The new sequence continues the ids, and rows land in their month's partition
+        later = Game.objects.create(user=user, user_choice='paper', computer_choice='rock', result='win')
+        self.assertGreater(later.id, recent.id)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM game_game WHERE id = %s", [old.id])
+            self.assertEqual(cursor.fetchone()[0], 'game_game_p2024_01')
+
+
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        get_store().clear()
+        self.user, token = make_user('async')
+        self.headers = {'Authorization': f'Token {token.key}'}
+
+    async def get(self, url):
+        return await AsyncClient().get(url, headers=self.headers)
+
+    async def post(self, url, data):
+        return await AsyncClient().post(url, data, content_type='application/json', headers=self.headers)
+
+    async def test_play_stats_and_history(self):
+        self.assertEqual((await AsyncClient().get('/api/game/async/stats/')).status_code, 401)
+        for _ in range(5):
+            response = await self.post('/api/game/async/play/', {'user_choice': 'rock'})
+            self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((await self.post('/api/game/async/play/', {'user_choice': 'x'})).status_code, 400)
+
+        stats = (await self.get('/api/game/async/stats/')).json()
+        self.assertEqual(stats['total_games'], 5)
+        self.assertEqual((await self.get('/api/game/async/stats/')).json(), stats)
+
+        data = (await self.get('/api/game/async/history/?page_size=2')).json()
+        ids = [game['id'] for game in data['results']]
+        while data['next']:
+            data = (await self.get(data['next'])).json()
+            ids += [game['id'] for game in data['results']]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        sync = await sync_to_async(lambda: APIClient(headers=self.headers).get('/api/game/history/?page_size=5'))()
+        self.assertEqual([game['id'] for game in sync.json()['results']], ids)
+
+    async def test_errors_match_the_sync_views(self):
+        response = await self.get('/api/game/async/history/?cursor=bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.json())
+        sync = await sync_to_async(lambda: APIClient(headers=self.headers).get('/api/game/history/?cursor=bogus'))()
+        self.assertEqual(sync.status_code, 400)
+
+        response = await AsyncClient().post('/api/game/async/play/', '{', content_type='application/json',
+                                            headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.json())
+
+    async def test_failed_play_is_rolled_back(self):
+        with mock.patch.object(DailyStats, 'record_games', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                await self.post('/api/game/async/play/', {'user_choice': 'rock'})
+        self.assertFalse(await Game.objects.filter(user=self.user).aexists())
+        self.assertFalse(await GameStats.objects.filter(user=self.user, total_games__gt=0).aexists())
+
+
+class EventStreamTests(TransactionTestCase):
+    async def open_stream(self, token):
+        headers = {'Authorization': f'Token {token.key}'}
+        ticket = await AsyncClient().post('/api/game/events/ticket/', headers=headers)
+        self.assertEqual(ticket.status_code, 200)
+        self.assertNotIn(token.key, ticket.json()['ticket'])
+        return await AsyncClient().get(f"/api/game/events/?ticket={ticket.json()['ticket']}")
+
+    async def play(self, token):
+        response = await AsyncClient().post(
+            '/api/game/async/play/', {'user_choice': 'rock'}, content_type='application/json',
+            headers={'Authorization': f'Token {token.key}'},
+        )
+        return response.json()
+
+    async def test_stream(self):
+        user, token = await sync_to_async(make_user)('listener')
+        first = await self.play(token)
+        response = await self.open_stream(token)
+        self.assertEqual(response.status_code, 200)
+        events = response.streaming_content.__aiter__()
+        event = (await events.__anext__()).decode()
+        self.assertIn('event: stats', event)
+        snapshot = json.loads(event.split('data: ')[1])
+        self.assertEqual((snapshot['total_games'], snapshot['last_game_id']), (1, first['id']))
+
+        second = await self.play(token)
+        event = (await asyncio.wait_for(events.__anext__(), 2)).decode()
+        self.assertIn('event: game', event)
+        data = json.loads(event.split('data: ')[1])
+        self.assertEqual(data['stats_delta']['total_games'], 1)
+        # Not covered by the snapshot, so the client applies it
+        self.assertEqual(data['games'][0]['id'], second['id'])
+        self.assertGreater(second['id'], snapshot['last_game_id'])
+
+        # Published from another thread, like the sync views do
+        await sync_to_async(publish_games)(user.id, [], {'win': 2})
+        event = (await asyncio.wait_for(events.__anext__(), 2)).decode()
+        self.assertEqual(json.loads(event.split('data: ')[1])['stats_delta']['wins'], 2)
+
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(get_broker()._subscriptions, {})
+
+    async def test_rejects_bad_credentials(self):
+        user, token = await sync_to_async(make_user)('stranger')
+        self.assertEqual((await AsyncClient().get(f'/api/game/events/?token={token.key}')).status_code, 401)
+        self.assertEqual((await AsyncClient().get('/api/game/events/?ticket=bad')).status_code, 401)
+        ticket = make_ticket(user.id)
+        forged = ticket[:-1] + ('1' if ticket.endswith('0') else '0')
+        self.assertEqual((await AsyncClient().get(f'/api/game/events/?ticket={forged}')).status_code, 401)
+        with override_settings(GAME_EVENTS_TICKET_MAX_AGE=-1):
+            expired = make_ticket(user.id)
+            self.assertEqual((await AsyncClient().get(f'/api/game/events/?ticket={expired}')).status_code, 401)
+
+    def test_tickets(self):
+        user, _ = make_user('ticketed')
+        self.assertEqual(read_ticket(make_ticket(user.id)), user.id)
+        self.assertIsNone(read_ticket('1:abc:def'))
+
+
+class CacheBrokerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.broker = CacheBroker(alias='default', poll_interval=0.01, max_queue_size=2)
+
+    def test_delivers_events_published_after_subscribing(self):
+        async def run():
+            self.broker.publish('c', {'n': 0})
+            subscription = await self.broker.subscribe('c')
+            with self.assertRaises(asyncio.TimeoutError):
+                await subscription.get(timeout=0.02)
+            self.broker.publish('c', {'n': 1})
+            await self.broker.apublish('c', {'n': 2})
+            self.assertEqual(await subscription.get(timeout=1), {'n': 1})
+            self.assertEqual(await subscription.get(timeout=1), {'n': 2})
+            # Another process's broker sees the same events through the cache
+            other = await CacheBroker(alias='default', poll_interval=0.01).subscribe('c')
+            self.broker.publish('c', {'n': 3})
+            self.assertEqual(await other.get(timeout=1), {'n': 3})
+        asyncio.run(run())
+
+    def test_slow_subscriber_skips_to_the_latest_events(self):
+        async def run():
+            subscription = await self.broker.subscribe('c')
+            for n in range(5):
+                self.broker.publish('c', {'n': n})
+            self.assertEqual(await subscription.get(timeout=1), {'n': 3})
+            self.assertEqual(await subscription.get(timeout=1), {'n': 4})
+        asyncio.run(run())
+
+
+class EventStreamWSGITests(TestCase):
+    def test_requires_asgi(self):
+        self.assertEqual(self.client.get('/api/game/events/').status_code, 501)
+        _, token = make_user('wsgi')
+        self.assertEqual(token_client(token).post('/api/game/events/ticket/').status_code, 501)
+
+
+class ReadSerializerTests(GameTestMixin, TestCase):
+    def test_output_matches_the_drf_serializers(self):
+        self.play('rock')
+        self.play('paper')
+        games = Game.objects.filter(user=self.user)
+        self.assertEqual(
+            ORJSONRenderer().render(GameReadSerializer.from_rows(GameReadSerializer.values(games))),
+            JSONRenderer().render(GameSerializer(games, many=True).data),
+        )
+        stats = GameStats.objects.get(user=self.user)
+        self.assertEqual(
+            ORJSONRenderer().render(GameStatsReadSerializer.from_instance(stats)),
+            JSONRenderer().render(GameStatsSerializer(stats).data),
+        )
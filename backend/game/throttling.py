@@ -0,0 +1,11 @@
+from core.throttling import UserTokenBucketThrottle
+
+
+class GamePlayThrottle(UserTokenBucketThrottle):
+    """Rounds a user may play, so scripted clients cannot inflate GameStats or flood the database."""
+    scope = 'game_play'
+
+
+class GameBatchThrottle(UserTokenBucketThrottle):
+    """Batch plays a user may submit; each one can write GAME_BATCH_MAX_ROUNDS rounds."""
+    scope = 'game_batch'
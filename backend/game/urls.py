@@ -1,8 +1,20 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('play/', views.play_game, name='play-game'),
+    path('play/batch/', views.play_batch, name='play-batch'),
     path('history/', views.get_game_history, name='game-history'),
+    path('history/export/', views.export_game_history, name='game-history-export'),
     path('stats/', views.get_game_stats, name='game-stats'),
+    path('stats/range/', views.get_stats_range, name='game-stats-range'),
+    path('leaderboard/', views.get_leaderboard, name='game-leaderboard'),
+    path('stats/cache/', views.get_stats_cache_metrics, name='game-stats-cache'),
+    path('events/ticket/', views.create_events_ticket, name='game-events-ticket'),
+
+    # ASGI-native async versions
+    path('async/play/', async_views.play_game, name='async-play-game'),
+    path('async/history/', async_views.get_game_history, name='async-game-history'),
+    path('async/stats/', async_views.get_game_stats, name='async-game-stats'),
+    path('events/', async_views.game_events, name='game-events'),
 ] 
\ No newline at end of file
@@ -5,91 +5,392 @@ This file contains function-based views handling API endpoints for game operatio
 The views interact with the database models and use serializers to process request and response data.
 
 API Endpoints:
-- `GET /api/game/play/` → Retrieves the user's game history.
+- `GET /api/game/history/` → Retrieves the user's game history (cursor-paginated).
+- `GET /api/game/history/export/` → Streams the user's complete game history as NDJSON or CSV.
 - `POST /api/game/play/` → Plays a new game and returns the result.
+- `POST /api/game/play/batch/` → Plays several rounds in one request and returns every result.
 - `GET /api/game/stats/` → Retrieves the user's game statistics.
+- `GET /api/game/stats/range/` → Retrieves the user's game statistics for a date range, per day or week.
+- `GET /api/game/leaderboard/` → Retrieves the top players by wins and by win rate, and the user's rank.
+- `GET /api/game/stats/cache/` → Retrieves the game statistics cache hit ratio (staff only).
+- `POST /api/game/events/ticket/` → Issues a short-lived ticket opening the user's game event stream.
 """
 from django.shortcuts import render
-import random
+import logging
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework import status
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 
-from .models import Game, GameStats
-from .serializers import GameSerializer, GameStatsSerializer
+from core.replicas import pin_primary, replica_reads
+from core.throttling import IPTokenBucketThrottle, UserTokenBucketThrottle
+
+from .archive import game_archive
+from .cache import stats_cache
+from .engine import RPS
+from .events import make_ticket, publish_games
+from .export import CONTENT_TYPES, ENCODERS, aiterate
+from .leaderboard import leaderboard
+from .models import DailyStats, Game, GameStats
+from .pagination import GameHistoryPagination, InvalidCursor
+from .serializers import (
+    BatchPlaySerializer, GameReadSerializer, GameSerializer, GameStatsReadSerializer, StatsRangeSerializer,
+)
+from .throttling import GameBatchThrottle, GamePlayThrottle
+from .writebehind import get_round_log, new_game
+
+logger = logging.getLogger(__name__)
 
 
 # Game History API
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def get_game_history(request):
     """
-    Get user's game history.
+    Get user's game history, one page at a time.
+    
+    Read from a replica when DATABASE_REPLICA_URLS is set (see core.replicas).
+    Archived rounds (see game.archive) are included.
+    
+    Query Parameters:
+        - cursor (str, optional): Opaque cursor taken from a previous response's `next`/`previous`
+        - page_size (int, optional): Number of games per page (capped by GAME_HISTORY_MAX_PAGE_SIZE)
     
     Returns:
-        - 200 OK: Returns a list of the user's previous games, ordered by creation date (newest first)
+        - 200 OK: Returns `next`, `previous` and `results`, where `results` holds the user's
+          previous games ordered by creation date (newest first)
+        - 400 Bad Request: Invalid cursor
     """
-    games = Game.objects.filter(user=request.user).order_by('-created_at')
-    serializer = GameSerializer(games, many=True)
-    return Response(serializer.data)
+    try:
+        paginator = GameHistoryPagination(request.query_params)
+    except InvalidCursor as e:
+        raise ParseError(str(e))
+    rows = list(GameReadSerializer.values(paginator.filter(Game.objects.filter(user=request.user))))
+    paginator.paginate(request.user.id, rows, GameReadSerializer.from_rows(rows))
+    return Response(paginator.get_paginated_data(request.build_absolute_uri()))
+
+
+# Game History Export API
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_game_history(request):
+    """
+    Download the user's complete game history (newest first) as a streamed file.
+    
+    Query Parameters:
+        - output (str, optional): 'ndjson' (default, one JSON object per line) or 'csv'
+        - user_id (int, optional): Export another user's history (staff only)
+    
+    Returns:
+        - 200 OK: Streams the games with the same fields as the history endpoint
+        - 400 Bad Request: Unknown output format or invalid user_id
+        - 403 Forbidden: user_id given by a non-staff user
+    """
+    export_format = request.query_params.get('output', 'ndjson')
+    if export_format not in ENCODERS:
+        return Response(
+            {"error": f"output must be one of: {', '.join(ENCODERS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    user_id = request.user.id
+    if 'user_id' in request.query_params:
+        if not request.user.is_staff:
+            return Response({"error": "Only staff can export other users' history"}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            user_id = int(request.query_params['user_id'])
+        except ValueError:
+            return Response({"error": "user_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    archived = game_archive.rows(user_id) if game_archive.has_user(user_id) else None
+    content = ENCODERS[export_format](Game.objects.filter(user_id=user_id), archived)
+    if isinstance(request._request, ASGIRequest):
+        content = aiterate(content)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="game-history-{user_id}.{export_format}"'
+    return response
 
 
 # Play Game API
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
-@transaction.atomic
+@throttle_classes([GamePlayThrottle, UserTokenBucketThrottle, IPTokenBucketThrottle])
 def play_game(request):
     """
     Play a game of rock-paper-scissors.
     
+    With GAME_WRITE_BEHIND enabled the round is queued in the write-behind log
+    and the response is returned before the row exists (its `id` is null).
+    
     Request Body:
         - user_choice (str): Player's choice ('rock', 'paper', or 'scissors')
         
     Returns:
         - 200 OK: Game played successfully, returns game details including result
         - 400 Bad Request: Invalid user choice or other validation error
+        - 429 Too Many Requests: Too many rounds played; retry after `Retry-After` seconds
     """
-    data = request.data.copy()
-    data['user'] = request.user.id
+    serializer = GameSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    serializer = GameSerializer(data=data)
-    if serializer.is_valid():
-        # Create a game instance but don't save yet
-        game = serializer.save()
-        
-        # Generate computer's choice
-        choices = [choice[0] for choice in Game.CHOICES]
-        game.computer_choice = random.choice(choices)
-        print(f"Computer chose: {game.computer_choice}")
-        
-        # Calculate result
-        result = game.calculate_result()
-        print(f"Game result: {result}")
+    # Generate computer's choice and calculate the result before saving,
+    # so the game is written with a single INSERT
+    computer_choice = RPS.random_move()
+    user_choice = serializer.validated_data['user_choice']
+    result = Game.resolve(user_choice, computer_choice)
+    user_id = request.user.id
+    pin_primary(user_id)  # Replicas may not have this round yet
+    
+    if settings.GAME_WRITE_BEHIND:
+        game = new_game(request.user, user_choice, computer_choice, result)
+        get_round_log().append([game])
+        data = GameSerializer(game).data
+        publish_games(user_id, [data], {result: 1})
+        return Response(data)
+    
+    with transaction.atomic():
+        # Update or create game stats with a single atomic UPDATE. It runs before the
+        # INSERT so the stats row lock orders the user's game ids by commit, which the
+        # event stream's `last_game_id` relies on
+        GameStats.record_result(request.user, result)
+        game = serializer.save(
+            user=request.user,
+            computer_choice=computer_choice,
+            result=result,
+            status='completed',
+        )
+        DailyStats.record_games(request.user, [game])
+        transaction.on_commit(lambda: stats_cache.apply_result(user_id, result))
+        logger.debug("User %s played %s vs %s: %s", user_id, user_choice, computer_choice, result)
         
-        # Update or create game stats
-        stats, created = GameStats.objects.get_or_create(user=request.user)
-        stats.update_stats(result)
-        print(f"Updated stats: {stats.wins} wins, {stats.losses} losses, {stats.draws} draws")
+        # Return game data and push it to the player's event stream
+        data = GameSerializer(game).data
+        transaction.on_commit(lambda: publish_games(user_id, [data], {result: 1}))
+    return Response(data)
+
+
+# Batch Play API
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@throttle_classes([GameBatchThrottle, UserTokenBucketThrottle, IPTokenBucketThrottle])
+def play_batch(request):
+    """
+    Play several rounds of rock-paper-scissors in one request.
+    
+    With GAME_WRITE_BEHIND enabled the rounds are queued in the write-behind log
+    and returned before their rows exist (their `id` is null).
+    
+    Request Body:
+        - user_choices (list[str]): Player's choices, one per round (at most GAME_BATCH_MAX_ROUNDS)
         
-        # Return game data
-        return Response(GameSerializer(game).data)
+    Returns:
+        - 200 OK: Rounds played successfully, returns `games` (one per round, in order)
+          and a `summary` of wins, losses and draws
+        - 400 Bad Request: Invalid choices
+        - 429 Too Many Requests: Too many batches played; retry after `Retry-After` seconds
+    """
+    serializer = BatchPlaySerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    user_choices = serializer.validated_data['user_choices']
+    computer_choices = RPS.random_moves(len(user_choices))
+    user_id = request.user.id
+    pin_primary(user_id)  # Replicas may not have these rounds yet
+    
+    games = [
+        new_game(request.user, user_choice, computer_choice, Game.resolve(user_choice, computer_choice))
+        for user_choice, computer_choice in zip(user_choices, computer_choices)
+    ]
+    counts = Counter(game.result for game in games)
     
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    if settings.GAME_WRITE_BEHIND:
+        get_round_log().append(games)
+        data = GameSerializer(games, many=True).data
+        publish_games(user_id, data, counts)
+    else:
+        with transaction.atomic():
+            # Apply all rounds to the stats with one aggregated UPDATE, before the
+            # INSERT like play_game
+            GameStats.record_results(request.user, counts)
+            Game.objects.bulk_create(games)
+            DailyStats.record_games(request.user, games)
+            transaction.on_commit(lambda: stats_cache.apply_results(user_id, counts))
+            
+            data = GameSerializer(games, many=True).data
+            transaction.on_commit(lambda: publish_games(user_id, data, counts))
+    logger.debug("User %s played a batch of %s rounds: %s", user_id, len(games), dict(counts))
+    
+    return Response({
+        'games': data,
+        'summary': {
+            'total_games': len(games),
+            'wins': counts['win'],
+            'losses': counts['lose'],
+            'draws': counts['draw'],
+        },
+    })
 
 
 # Game Statistics API
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def get_game_stats(request):
     """
     Get user's game statistics.
     
+    Read from a replica when DATABASE_REPLICA_URLS is set (see core.replicas).
+    
     Returns:
         - 200 OK: Returns user's game statistics (total games, wins, losses, draws, win percentage)
     """
-    stats, created = GameStats.objects.get_or_create(user=request.user)
-    serializer = GameStatsSerializer(stats)
-    return Response(serializer.data)
+    stats = stats_cache.get(request.user)
+    return Response(GameStatsReadSerializer.from_instance(stats))
+
+
+# Game Statistics by Date Range API
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_stats_range(request):
+    """
+    Get user's game statistics for a date range, summed from per-day rollups.
+    
+    Query Parameters:
+        - start (date, optional): First day, YYYY-MM-DD (default: 6 days before `end`)
+        - end (date, optional): Last day, YYYY-MM-DD (default: today)
+        - bucket (str, optional): 'day' or 'week' (weeks start on Monday); default 'day'
+    
+    Returns:
+        - 200 OK: Returns `totals` for the whole range and `buckets` for each day or week
+          with games, both with wins, losses, draws, win percentage and the user's choices
+        - 400 Bad Request: Invalid dates, or a range longer than GAME_STATS_MAX_RANGE_DAYS
+    """
+    serializer = StatsRangeSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    start = serializer.validated_data['start']
+    end = serializer.validated_data['end']
+    bucket = serializer.validated_data['bucket']
+    
+    rows = DailyStats.objects.filter(
+        user=request.user, day__range=(start, end),
+    ).order_by('day').values_list('day', *DailyStats.COUNTER_FIELDS)
+    
+    totals = dict.fromkeys(DailyStats.COUNTER_FIELDS, 0)
+    buckets = {}
+    for day, *counts in rows:
+        bucket_start = day - timedelta(days=day.weekday()) if bucket == 'week' else day
+        bucket_counts = buckets.setdefault(bucket_start, dict.fromkeys(DailyStats.COUNTER_FIELDS, 0))
+        for field, n in zip(DailyStats.COUNTER_FIELDS, counts):
+            bucket_counts[field] += n
+            totals[field] += n
+    
+    return Response({
+        'start': start,
+        'end': end,
+        'bucket': bucket,
+        'totals': _range_stats(totals),
+        'buckets': [{'start': bucket_start, **_range_stats(counts)} for bucket_start, counts in buckets.items()],
+    })
+
+
+def _range_stats(counts):
+    total = counts['total_games']
+    return {
+        'total_games': total,
+        'wins': counts['wins'],
+        'losses': counts['losses'],
+        'draws': counts['draws'],
+        'win_percentage': round(counts['wins'] / total * 100, 2) if total else 0.0,
+        'choices': {'rock': counts['rock'], 'paper': counts['paper'], 'scissors': counts['scissors']},
+    }
+
+
+# Game Statistics Cache Metrics API
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def get_stats_cache_metrics(request):
+    """
+    Get hit/miss counters of this process's GameStats cache (staff only).
+    
+    Returns:
+        - 200 OK: Returns hits, misses and hit_ratio
+    """
+    return Response(stats_cache.metrics())
+
+
+# Leaderboard API
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_leaderboard(request):
+    """
+    Get the top players and the requesting user's rank.
+    
+    Query Parameters:
+        - limit (int, optional): Number of players per ranking (default 10, max LEADERBOARD_MAX_LIMIT)
+    
+    Returns:
+        - 200 OK: Returns `by_wins`, `by_win_rate` (players with at least LEADERBOARD_MIN_GAMES games)
+          and `me` with the user's rank in each
+    """
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        return Response(
+            {"error": "limit must be an integer"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    limit = max(1, min(limit, settings.LEADERBOARD_MAX_LIMIT))
+    
+    by_wins = leaderboard.top_by_wins(limit)
+    by_win_rate = leaderboard.top_by_win_rate(limit)
+    
+    # Resolve display names for every listed player with a single query
+    user_ids = {entry['user_id'] for entry in by_wins + by_win_rate}
+    usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+    for entry in by_wins + by_win_rate:
+        entry['username'] = usernames.get(entry['user_id'])
+    
+    return Response({
+        'min_games': leaderboard.min_games,
+        'by_wins': by_wins,
+        'by_win_rate': by_win_rate,
+        'me': leaderboard.rank(request.user.id),
+    })
+
+
+# Game Events Ticket API
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def create_events_ticket(request):
+    """
+    Issue a ticket that opens the user's game event stream (`GET /api/game/events/?ticket=...`).
+    
+    The ticket is signed and expires after GAME_EVENTS_TICKET_MAX_AGE seconds, so
+    unlike the API token it is worthless once it shows up in an access log.
+    
+    Returns:
+        - 200 OK: Returns `ticket` and `expires_in` (seconds)
+        - 501 Not Implemented: Served through WSGI, where the event stream is unavailable
+    """
+    if not isinstance(request._request, ASGIRequest):
+        return Response(
+            {"error": "The event stream requires the ASGI server profile"},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    return Response({
+        'ticket': make_ticket(request.user.id),
+        'expires_in': settings.GAME_EVENTS_TICKET_MAX_AGE,
+    })
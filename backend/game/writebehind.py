@@ -0,0 +1,308 @@
+"""
+Write-behind log for played rounds (``GAME_WRITE_BEHIND=True``).
+
+Instead of writing every round to the database inside the request, ``play_game``
+appends it to a local append-only segment file and answers straight away. A
+background thread rotates the segment every ``GAME_WRITE_BEHIND_FLUSH_MS``
+milliseconds (or as soon as ``GAME_WRITE_BEHIND_BATCH_SIZE`` rounds are queued),
+fsyncs it, and writes its rounds with one ``bulk_create`` plus one aggregated
+``GameStats`` update per user. Rows keep the time each round was played. The
+segment's name is stored in ``FlushedRoundLog`` in the same transaction, so
+replaying a segment after a crash can never count a round twice.
+
+Durability depends on ``GAME_WRITE_BEHIND_FSYNC``:
+
+- ``'flush'`` (default): segments are fsynced when they are flushed. A crashed
+  process loses nothing, but if the host itself goes down, rounds acknowledged
+  during the last flush interval can be lost.
+- ``'always'``: every append is fsynced before the player gets an answer.
+
+A segment whose rows the database rejects (e.g. a round of a user deleted
+meanwhile) is retried ``GAME_WRITE_BEHIND_MAX_ATTEMPTS`` times, then renamed to
+``*.failed`` and skipped, so it cannot hold back the segments behind it. Fix the
+cause and rename it back to ``*.log``: the next start replays it. Other errors
+(the database being down) are retried until they succeed.
+
+Each process writes its own segments and holds an ``flock`` on them while it is
+alive. On startup, segments left behind by dead processes are replayed (or
+discarded if their transaction had already committed) before new rounds are
+accepted.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .cache import stats_cache
+from .models import DailyStats, FlushedRoundLog, Game, GameStats
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.log'
+FAILED_SUFFIX = '.failed'
+
+
+class Segment:
+    """One append-only file of JSON lines, locked by the process writing it."""
+
+    def __init__(self, directory, name=None):
+        self.name = name or f"{os.getpid()}-{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        self.path = os.path.join(directory, self.name + SUFFIX)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def try_lock(self):
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def append(self, lines):
+        os.write(self.fd, lines)
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; the round was never acknowledged
+                    logger.warning("Skipping unreadable line in round log %s", self.path)
+
+    def sync(self):
+        os.fsync(self.fd)
+
+    def remove(self):
+        os.unlink(self.path)
+        os.close(self.fd)
+
+    def quarantine(self):
+        """Set the segment aside as ``*.failed``, where recovery ignores it."""
+        os.rename(self.path, self.path[:-len(SUFFIX)] + FAILED_SUFFIX)
+        os.close(self.fd)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RoundLog:
+    """Queues rounds in memory and on disk, and flushes them to the database in batches."""
+
+    def __init__(self, directory, flush_interval, batch_size, fsync='flush', max_attempts=5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._segment = None
+        self._records = []
+        self._failed = []  # [segment, records, rejected attempts], oldest first
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.recover()
+        self._segment = self._new_segment()
+        self._thread = threading.Thread(target=self._run, name='game-round-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final flush of the round log failed; it will be replayed on the next start")
+            return
+        with self._lock:
+            self._segment.remove()
+
+    def append(self, games):
+        """Queue played ``Game`` instances (unsaved) for the next flush; see ``GAME_WRITE_BEHIND_FSYNC``."""
+        records = [
+            {
+                'user_id': game.user_id,
+                'user_choice': game.user_choice,
+                'computer_choice': game.computer_choice,
+                'result': game.result,
+                'created_at': game.created_at.isoformat(),
+            }
+            for game in games
+        ]
+        lines = b''.join(json.dumps(record, separators=(',', ':')).encode() + b'\n' for record in records)
+        with self._lock:
+            self._segment.append(lines)
+            if self.fsync == 'always':
+                self._segment.sync()
+            self._records.extend(records)
+            queued = len(self._records)
+        if queued >= self.batch_size:
+            self._wake.set()
+
+    def _new_segment(self):
+        segment = Segment(self.directory)
+        segment.try_lock()
+        return segment
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing the round log failed")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write every queued round to the database; returns the number of rounds written."""
+        with self._flush_lock:
+            with self._lock:
+                if self._records:
+                    self._failed.append([self._segment, self._records, 0])
+                    self._segment = self._new_segment()
+                    self._records = []
+            written = 0
+            while self._failed:
+                entry = self._failed[0]
+                segment, records, attempts = entry
+                segment.sync()
+                try:
+                    write_rounds(segment.name, records)
+                except (IntegrityError, DataError):
+                    entry[2] = attempts + 1
+                    if entry[2] < self.max_attempts:
+                        raise
+                    logger.exception(
+                        "Round log %s was rejected %s times; moved aside with its %s rounds",
+                        segment.name, entry[2], len(records),
+                    )
+                    self._failed.pop(0)
+                    segment.quarantine()
+                    continue
+                self._failed.pop(0)
+                segment.remove()
+                FlushedRoundLog.objects.filter(segment=segment.name).delete()
+                written += len(records)
+            return written
+
+    def recover(self):
+        """Replay segments whose writer process died before flushing them."""
+        flushed = set(FlushedRoundLog.objects.values_list('segment', flat=True))
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(SUFFIX):
+                continue
+            segment = Segment(self.directory, filename[:-len(SUFFIX)])
+            if not segment.try_lock():
+                segment.close()  # Still owned by a live process
+                continue
+            if segment.name in flushed:
+                logger.info("Round log %s was already flushed; removing it", segment.name)
+            else:
+                records = list(segment.read())
+                if records:
+                    try:
+                        write_rounds(segment.name, records)
+                    except (IntegrityError, DataError):
+                        logger.exception("Round log %s was rejected; moved aside with its %s rounds", segment.name, len(records))
+                        segment.quarantine()
+                        continue
+                logger.info("Recovered %s rounds from round log %s", len(records), segment.name)
+            segment.remove()
+            FlushedRoundLog.objects.filter(segment=segment.name).delete()
+        # Markers without a file: the process died after the commit but before cleaning up
+        FlushedRoundLog.objects.filter(segment__in=flushed).exclude(
+            segment__in=[name[:-len(SUFFIX)] for name in os.listdir(self.directory)]
+        ).delete()
+
+
+def write_rounds(segment_name, records):
+    """Insert the rounds of one segment and fold them into GameStats and DailyStats in a single transaction."""
+    games = [
+        Game(
+            user_id=record['user_id'],
+            user_choice=record['user_choice'],
+            computer_choice=record['computer_choice'],
+            result=record['result'],
+            status='completed',
+            created_at=datetime.fromisoformat(record['created_at']),
+        )
+        for record in records
+    ]
+    per_user = defaultdict(Counter)
+    games_by_user = defaultdict(list)
+    for game in games:
+        per_user[game.user_id][game.result] += 1
+        games_by_user[game.user_id].append(game)
+
+    with transaction.atomic():
+        Game.objects.bulk_create(games, batch_size=500)
+        for user_id, counts in per_user.items():
+            user = User(id=user_id)
+            GameStats.record_results(user, counts)
+            DailyStats.record_games(user, games_by_user[user_id])
+        FlushedRoundLog.objects.create(segment=segment_name)
+        for user_id, counts in per_user.items():
+            transaction.on_commit(lambda user_id=user_id, counts=counts: stats_cache.apply_results(user_id, counts))
+
+
+def new_game(user, user_choice, computer_choice, result):
+    """Build the unsaved ``Game`` returned to the player while its row is still queued."""
+    now = timezone.now()
+    return Game(
+        user=user,
+        user_choice=user_choice,
+        computer_choice=computer_choice,
+        result=result,
+        status='completed',
+        created_at=now,
+        updated_at=now,
+    )
+
+
+_round_log = None
+_round_log_lock = threading.Lock()
+
+
+def get_round_log():
+    """Return this process's RoundLog, recovering orphaned segments and starting the flusher on first use."""
+    global _round_log
+    if _round_log is None:
+        with _round_log_lock:
+            if _round_log is None:
+                round_log = RoundLog(
+                    directory=settings.GAME_WRITE_BEHIND_DIR,
+                    flush_interval=settings.GAME_WRITE_BEHIND_FLUSH_MS / 1000,
+                    batch_size=settings.GAME_WRITE_BEHIND_BATCH_SIZE,
+                    fsync=settings.GAME_WRITE_BEHIND_FSYNC,
+                    max_attempts=settings.GAME_WRITE_BEHIND_MAX_ATTEMPTS,
+                )
+                round_log.start()
+                _round_log = round_log
+    return _round_log
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class TelegramAuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'telegram_auth'
+
+    def ready(self):
+        from . import signals  # noqa: F401  Registers token cache invalidation
+
+        # Derive the HMAC secrets once at startup rather than on the first login
+        from .verification import get_verifier
+        get_verifier()
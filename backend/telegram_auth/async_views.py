@@ -0,0 +1,35 @@
+"""
+ASGI-native async views for the Telegram Mini App Authentication API.
+
+API Endpoints:
+- `GET /api/auth/async/profile/` → Retrieves the authenticated user's profile information.
+"""
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.replicas import replica_reads
+
+from .authentication import async_token_required
+from .models import TelegramUser
+from .serializers import TelegramUserSerializer
+
+
+# User Profile API
+@require_GET
+@async_token_required
+@replica_reads
+async def get_user_profile(request):
+    """
+    Get authenticated user's profile data.
+    
+    The profile is loaded together with the token, so a warm request runs no queries.
+    
+    Returns:
+        - 200 OK: Returns user profile data
+        - 404 Not Found: User profile not found
+    """
+    try:
+        telegram_user = request.user.telegram_user
+    except TelegramUser.DoesNotExist:
+        return JsonResponse({"error": "User profile not found"}, status=404)
+    return JsonResponse(TelegramUserSerializer(telegram_user).data)
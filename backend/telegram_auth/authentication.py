@@ -0,0 +1,258 @@
+"""
+Token authentication with an in-process cache.
+
+``CachedTokenAuthentication`` resolves token -> user -> TelegramUser with one
+query on a cold request and none on a warm one. Entries are evicted least
+recently used once ``TOKEN_AUTH_CACHE_SIZE`` is reached and expire after
+``TOKEN_AUTH_CACHE_TTL`` seconds.
+
+Revocation is shared between processes through Django's cache
+(``TOKEN_AUTH_REVOCATION_CACHE_ALIAS``): each user has a generation number
+there, and an entry is only served while the generation it was stored under is
+still current. Signal handlers in ``telegram_auth.signals`` move the generation
+on when a token is deleted (logout, rotation) or the user or profile changes,
+so every worker drops its entries on the next request. A warm request therefore
+costs one cache read, which is the point of Redis over local memory here: with
+the local memory backend the generation is per process too, and other workers
+only see such changes once their entries expire.
+
+Entries hold the field values of the user, profile and token rather than the
+instances, and each hit builds fresh instances from them, so per-request
+mutations never leak between threads.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+from .models import TelegramUser
+
+# Caches ``user.telegram_user``, including its absence
+_profile = User.telegram_user.related
+
+
+def _values(instance):
+    return instance._state.db, tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields)
+
+
+def _instance(model, values):
+    db, row = values
+    return model.from_db(db, [field.attname for field in model._meta.concrete_fields], row)
+
+
+class TokenCache:
+    """Thread-safe LRU cache of authenticated users keyed by token, with a TTL and shared revocation."""
+
+    def __init__(self, maxsize, ttl, alias=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.alias = alias or settings.TOKEN_AUTH_REVOCATION_CACHE_ALIAS
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def _generation_key(user_id):
+        return f"token_auth:{user_id}:gen"
+
+    def generation(self, user_id):
+        """Return the user's current generation, starting a new one if there is none."""
+        key = self._generation_key(user_id)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Unique, so entries stored under an evicted generation are never served
+            self.cache.add(key, time.time_ns(), self.ttl)
+            generation = self.cache.get(key)
+        return generation
+
+    async def ageneration(self, user_id):
+        """Async version of ``generation``."""
+        key = self._generation_key(user_id)
+        generation = await self.cache.aget(key)
+        if generation is None:
+            await self.cache.aadd(key, time.time_ns(), self.ttl)
+            generation = await self.cache.aget(key)
+        return generation
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[-1] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _build(self, key, entry, generation):
+        user_id, stored_generation, user, profile, token, expires_at = entry
+        if generation != stored_generation:
+            # Revoked or changed, possibly in another process
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            return None
+        user = _instance(User, user)
+        if profile is not None:
+            profile = _instance(TelegramUser, profile)
+            profile.user = user
+        _profile.set_cached_value(user, profile)
+        token = _instance(Token, token)
+        token.user = user
+        return user, token
+
+    def get(self, key):
+        """Return a fresh ``(user, token)`` for a cached token, or None."""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return self._build(key, entry, self.generation(entry[0]))
+
+    async def aget(self, key):
+        """Async version of ``get``."""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return self._build(key, entry, await self.ageneration(entry[0]))
+
+    def set(self, key, user, token, generation):
+        """Cache ``user`` (with its ``telegram_user``) and ``token``, as of the user's ``generation``."""
+        profile = getattr(user, 'telegram_user', None)
+        entry = (
+            user.pk, generation, _values(user), profile and _values(profile), _values(token),
+            time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        user_id = self._entries.pop(key)[0]
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def invalidate_token(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_user(self, user_id):
+        """Drop the user's entries here and, through the shared generation, in every other process."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+        try:
+            self.cache.incr(self._generation_key(user_id))
+        except ValueError:
+            pass  # No generation: the next lookup starts a new one
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(
+    maxsize=settings.TOKEN_AUTH_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_CACHE_TTL,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for DRF's TokenAuthentication that caches the token's
+    user together with its ``telegram_user`` profile.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user', 'user__telegram_user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token_cache.set(key, token.user, token, token_cache.generation(token.user_id))
+        return (token.user, token)
+
+
+async def aauthenticate(request):
+    """
+    Async counterpart of CachedTokenAuthentication for plain Django async views.
+    
+    Returns:
+        User or None: The token's user, with ``telegram_user`` preloaded, or None
+        if the request carries no valid token
+    """
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    return await aget_token_user(key)
+
+
+async def aget_token_user(key):
+    """Resolve a token key to its active user through the token cache, or return None."""
+    cached = await token_cache.aget(key)
+    if cached is not None:
+        return cached[0]
+
+    try:
+        token = await Token.objects.select_related('user', 'user__telegram_user').aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    if not token.user.is_active:
+        return None
+
+    token_cache.set(key, token.user, token, await token_cache.ageneration(token.user_id))
+    return token.user
+
+
+def async_token_required(view):
+    """Authenticate an async view with a token, answering 401 like DRF when it is missing or invalid."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aauthenticate(request)
+        if user is None:
+            response = JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=401,
+            )
+            response['WWW-Authenticate'] = 'Token'
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
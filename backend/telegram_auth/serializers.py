@@ -1,18 +1,27 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+
+from core.metrics import TimedSerializerMixin
+from core.serializers import ValuesSerializer
 from .models import TelegramUser
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
         read_only_fields = ['id', 'username']
 
-class TelegramUserSerializer(serializers.ModelSerializer):
+class TelegramUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = TelegramUser
         fields = ['id', 'user', 'telegram_id', 'username', 'first_name', 
                   'last_name', 'photo_url', 'auth_date']
-        read_only_fields = ['id', 'user', 'telegram_id', 'auth_date'] 
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'telegram_id', 'auth_date']
+
+
+class TelegramUserReadSerializer(ValuesSerializer):
+    """Read-only TelegramUserSerializer output for an already loaded TelegramUser."""
+    fields = ('id', 'user.id', 'user.username', 'user.email', 'telegram_id', 'username',
+              'first_name', 'last_name', 'photo_url', 'auth_date')
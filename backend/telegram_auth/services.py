@@ -0,0 +1,115 @@
+"""
+Login service for Telegram users.
+
+A returning user is loaded together with their Django user and token in one
+query, and the profile is only written when a field actually changed, so a
+returning login costs at most two queries. A new user costs one lookup plus
+one INSERT each for the user, profile and token.
+
+``auth_date`` changes on every login, so it is not part of that comparison. On
+its own it is written with a queryset ``update()``, which sends no ``post_save``:
+a login does not revoke the user's cached tokens (see ``signals``) unless the
+profile changed. Cached profiles may show the previous ``auth_date`` until
+their entry expires (``TOKEN_AUTH_CACHE_TTL``).
+
+Only the new-user branch runs in a transaction. With SQLite's IMMEDIATE
+transactions (see ``core.db``) every transaction takes the database write lock,
+so a returning login, which usually only reads, must not open one.
+"""
+import logging
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+
+from core.replicas import pin_primary
+
+from .models import TelegramUser
+
+logger = logging.getLogger(__name__)
+
+# Profile fields copied from Telegram data on every login, with their defaults
+# (auth_date is copied too, but kept out of the changed-fields check)
+PROFILE_FIELDS = {
+    'username': None,
+    'first_name': '',
+    'last_name': '',
+    'photo_url': None,
+}
+
+
+def _field_value(name, value):
+    """Normalize a Telegram value to the type stored in the database."""
+    return TelegramUser._meta.get_field(name).to_python(value)
+
+
+def _profile_values(telegram_data):
+    """Map Telegram data to profile field values."""
+    return {name: _field_value(name, telegram_data.get(name, default)) for name, default in PROFILE_FIELDS.items()}
+
+
+def _create_user(username, telegram_id):
+    """Create the Django user, falling back to a suffixed username when it is taken."""
+    try:
+        with transaction.atomic():
+            return User.objects.create_user(username=username, email='', password=None)
+    except IntegrityError:
+        username = f"{username}_{telegram_id}"
+        logger.debug("Username already exists, using %s instead", username)
+        return User.objects.create_user(username=username, email='', password=None)
+
+
+def login_telegram_user(telegram_id, telegram_data):
+    """
+    Create or update the TelegramUser for ``telegram_id`` and return it with its auth token.
+    
+    Args:
+        telegram_id: Telegram user ID
+        telegram_data (dict): Verified login data from Telegram
+        
+    Returns:
+        tuple: (telegram_user, token, created)
+    """
+    values = _profile_values(telegram_data)
+    auth_date = _field_value('auth_date', telegram_data.get('auth_date'))
+
+    try:
+        telegram_user = (
+            TelegramUser.objects
+            .select_related('user', 'user__auth_token')
+            .get(telegram_id=telegram_id)
+        )
+    except TelegramUser.DoesNotExist:
+        username = telegram_data.get('username') or f"tg_{telegram_id}"
+        logger.debug("Creating new user with username: %s", username)
+        with transaction.atomic():
+            user = _create_user(username, telegram_id)
+            telegram_user = TelegramUser.objects.create(
+                user=user, telegram_id=telegram_id, auth_date=auth_date, **values,
+            )
+            token = Token.objects.create(user=user)
+        pin_primary(user.id)
+        logger.info("User created: %s", user.id)
+        return telegram_user, token, True
+
+    # Only write the columns that changed since the last login
+    changed = [name for name, value in values.items() if getattr(telegram_user, name) != value]
+    auth_date_changed = telegram_user.auth_date != auth_date
+    telegram_user.auth_date = auth_date
+    if changed:
+        for name in changed:
+            setattr(telegram_user, name, values[name])
+        telegram_user.save(update_fields=(changed + ['auth_date']) if auth_date_changed else changed)
+        pin_primary(telegram_user.user_id)
+        logger.debug("Updated %s for user %s", ', '.join(changed), telegram_user.user_id)
+    elif auth_date_changed:
+        # No post_save: the cached tokens stay valid
+        TelegramUser.objects.filter(pk=telegram_user.pk).update(auth_date=auth_date)
+
+    user = telegram_user.user
+    try:
+        token = user.auth_token
+    except Token.DoesNotExist:
+        token = Token.objects.create(user=user)
+
+    return telegram_user, token, False
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import TelegramUser
+
+
+def revoke(user_id):
+    """Drop the user's cached tokens now, and again once the change is committed."""
+    token_cache.invalidate_user(user_id)
+    # Another worker may cache the old rows again before the transaction commits
+    transaction.on_commit(lambda: token_cache.invalidate_user(user_id))
+
+
+@receiver(post_delete, sender=Token)
+@receiver(post_save, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Forget a token once it is deleted (logout) or replaced (rotation)."""
+    revoke(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    revoke(instance.pk)
+
+
+@receiver(post_delete, sender=TelegramUser)
+@receiver(post_save, sender=TelegramUser)
+def invalidate_telegram_user(sender, instance, **kwargs):
+    revoke(instance.user_id)
@@ -1,3 +1,269 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import time
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+
+from core.throttling import get_store
+
+from .authentication import TokenCache, token_cache
+from .models import TelegramUser
+from .verification import InitDataVerifier, get_verifier
+
+BOT_TOKEN = '123456:test-token'
+
+
+def sign_widget(fields, bot_token=BOT_TOKEN):
+    secret = hashlib.sha256(bot_token.encode()).digest()
+    data_check = '\n'.join(f"{key}={fields[key]}" for key in sorted(fields))
+    return dict(fields, hash=hmac.new(secret, data_check.encode(), hashlib.sha256).hexdigest())
+
+
+def sign_init_data(fields, bot_token=BOT_TOKEN):
+    secret = hmac.new(b'WebAppData', bot_token.encode(), hashlib.sha256).digest()
+    data_check = '\n'.join(f"{key}={fields[key]}" for key in sorted(fields))
+    return urlencode(dict(fields, hash=hmac.new(secret, data_check.encode(), hashlib.sha256).hexdigest()))
+
+
+def mock_login(telegram_id=42, **fields):
+    return {'id': telegram_id, 'first_name': 'Ada', 'username': 'ada', 'auth_date': 1600000000,
+            'hash': 'mock_hash', **fields}
+
+
+class AuthTestMixin:
+    def setUp(self):
+        cache.clear()
+        get_store().clear()
+        token_cache.clear()
+
+    def login(self, payload):
+        return self.client.post('/api/auth/telegram/', payload, content_type='application/json')
+
+
+class VerifierTests(TestCase):
+    def setUp(self):
+        self.verifier = InitDataVerifier(BOT_TOKEN, max_age=60)
+
+    def test_login_widget(self):
+        fields = sign_widget({'id': '5', 'first_name': 'Z', 'auth_date': str(int(time.time()))})
+        self.assertEqual(self.verifier.verify(fields), (True, "Data is valid"))
+        self.assertFalse(self.verifier.verify(dict(fields, first_name='Y'))[0])
+        self.assertFalse(self.verifier.verify(sign_widget(fields, bot_token='other:token'))[0])
+        self.assertEqual(self.verifier.verify(dict(fields, hash='é' * 64)), (False, "Data hash is invalid"))
+
+    def test_init_data(self):
+        init_data = sign_init_data({'auth_date': str(int(time.time())), 'user': '{"id":7}'})
+        is_valid, message, fields = self.verifier.verify_init_data(init_data)
+        self.assertTrue(is_valid, message)
+        self.assertEqual(fields['user'], '{"id":7}')
+        # A widget signature is not a valid WebApp signature
+        widget = sign_widget({'auth_date': str(int(time.time())), 'user': '{"id":7}'})
+        self.assertFalse(self.verifier.verify_init_data(urlencode(widget))[0])
+
+    def test_outdated_and_missing_fields(self):
+        outdated = sign_widget({'id': '5', 'auth_date': str(int(time.time()) - 120)})
+        self.assertEqual(self.verifier.verify(outdated), (False, "Authentication data is outdated"))
+        self.assertEqual(self.verifier.verify({'id': '5'}), (False, "Telegram authentication hash is missing"))
+        self.assertEqual(self.verifier.verify({'hash': 'x', 'auth_date': 'soon'})[1], "Authentication date is invalid")
+
+    @override_settings(TELEGRAM_BOT_TOKEN=BOT_TOKEN)
+    def test_verifier_is_reused_until_the_token_changes(self):
+        verifier = get_verifier()
+        self.assertIs(get_verifier(), verifier)
+        with override_settings(TELEGRAM_BOT_TOKEN='654321:other'):
+            self.assertIsNot(get_verifier(), verifier)
+
+
+class LoginTests(AuthTestMixin, TestCase):
+    def test_new_and_returning_user(self):
+        response = self.login(mock_login())
+        self.assertEqual(response.status_code, 200, response.content)
+        token = response.json()['token']
+        self.assertEqual(response.json()['user']['telegram_id'], 42)
+
+        again = self.login(mock_login(first_name='Bea', auth_date=1600000001))
+        self.assertEqual(again.json()['token'], token)
+        self.assertEqual(again.json()['user']['first_name'], 'Bea')
+        self.assertEqual(TelegramUser.objects.get(telegram_id=42).first_name, 'Bea')
+        self.assertEqual(User.objects.count(), 1)
+
+    def statements(self, payload):
+        """The SQL statements of a login."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.login(payload)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [q['sql'] for q in queries.captured_queries]
+
+    def test_unchanged_login_only_reads(self):
+        self.login(mock_login())
+        # No transaction either (it would show up as a savepoint inside the test's)
+        statements = self.statements(mock_login())
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('SELECT'))
+
+    def test_changed_login_writes_changed_columns(self):
+        self.login(mock_login())
+        statements = self.statements(mock_login(auth_date=1600000005))
+        self.assertEqual(len(statements), 2)
+        self.assertRegex(statements[1], r'^UPDATE "telegram_auth_telegramuser" SET "auth_date" = ')
+        self.assertEqual(TelegramUser.objects.get().auth_date, 1600000005)
+
+    def test_new_auth_date_keeps_cached_tokens(self):
+        token = self.login(mock_login()).json()['token']
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        api.get('/api/auth/profile/')
+        self.login(mock_login(auth_date=1600000005))
+        self.assertIsNotNone(token_cache.get(token))
+        # A profile change still revokes them, and writes auth_date in the same UPDATE
+        statements = self.statements(mock_login(first_name='Bea', auth_date=1600000006))
+        self.assertRegex(statements[1], r'^UPDATE .* SET "first_name" = .*, "auth_date" = ')
+        self.assertIsNone(token_cache.get(token))
+        self.assertEqual(TelegramUser.objects.get().auth_date, 1600000006)
+
+    def test_new_user_is_created_atomically(self):
+        with mock.patch.object(Token.objects, 'create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.login(mock_login())
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(TelegramUser.objects.exists())
+
+    def test_username_collision(self):
+        User.objects.create_user('ada')
+        response = self.login(mock_login(telegram_id=43))
+        self.assertEqual(response.json()['user']['user']['username'], 'ada_43')
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.login({}).status_code, 400)
+        self.assertEqual(self.login({'id': 1, 'first_name': 'x'}).status_code, 400)
+        self.assertEqual(self.login({'hash': 'mock_hash', 'first_name': 'x'}).status_code, 400)
+
+    @override_settings(TELEGRAM_BOT_TOKEN=BOT_TOKEN)
+    def test_signed_logins(self):
+        now = str(int(time.time()))
+        widget = sign_widget({'id': '5', 'first_name': 'Zed', 'auth_date': now})
+        self.assertEqual(self.login(widget).status_code, 200)
+        self.assertEqual(self.login(dict(widget, hash='0' * 64)).status_code, 400)
+        self.assertEqual(self.login(dict(widget, hash='é' * 64)).status_code, 400)
+
+        init_data = sign_init_data({'auth_date': now, 'user': json.dumps({'id': 77, 'first_name': 'W'})})
+        response = self.login({'init_data': init_data})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['user']['telegram_id'], 77)
+        self.assertEqual(self.login({'init_data': init_data.replace('W', 'V')}).status_code, 400)
+
+    def test_login_is_throttled_per_ip(self):
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'telegram_auth': '2/min'}):
+            self.assertEqual(self.login(mock_login()).status_code, 200)
+            self.assertEqual(self.login(mock_login()).status_code, 200)
+            response = self.login(mock_login())
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_probes_do_not_use_the_login_budget(self):
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'telegram_auth': '1/min'}):
+            for _ in range(3):
+                self.assertEqual(self.client.head('/api/auth/telegram/').status_code, 405)
+            self.assertEqual(self.login(mock_login()).status_code, 200)
+
+
+class TokenCacheTests(AuthTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('cached')
+        self.token = Token.objects.create(user=self.user)
+        TelegramUser.objects.create(user=self.user, telegram_id=9, first_name='F', auth_date=1)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_warm_request_runs_no_queries(self):
+        self.api.get('/api/auth/profile/')
+        with self.assertNumQueries(0):
+            response = self.api.get('/api/auth/profile/')
+        self.assertEqual(response.json()['first_name'], 'F')
+
+    def test_profile_update_is_visible(self):
+        self.api.get('/api/auth/profile/')
+        response = self.api.put('/api/auth/profile/update/', {'first_name': 'G'}, format='json')
+        self.assertEqual(response.json()['first_name'], 'G')
+        self.assertEqual(self.api.get('/api/auth/profile/').json()['first_name'], 'G')
+
+    def test_logout_revokes_the_token(self):
+        self.api.get('/api/auth/profile/')
+        self.assertEqual(self.api.post('/api/auth/logout/').status_code, 204)
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(self.api.get('/api/auth/profile/').status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.api.get('/api/auth/profile/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.api.get('/api/auth/profile/').status_code, 401)
+
+    def test_cached_users_are_not_shared(self):
+        self.api.get('/api/auth/profile/')
+        first, token = token_cache.get(self.token.key)
+        first.first_name = 'mutated'
+        first.telegram_user.first_name = 'mutated'
+        second, _ = token_cache.get(self.token.key)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.first_name, '')
+        self.assertEqual(second.telegram_user.first_name, 'F')
+        self.assertEqual(second.pk, self.user.pk)
+        self.assertIs(token.user, first)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_user_without_profile(self):
+        user = User.objects.create_user('plain')
+        token_cache.set('plain', user, self.token, token_cache.generation(user.pk))
+        with self.assertNumQueries(0):
+            cached, _ = token_cache.get('plain')
+            self.assertFalse(hasattr(cached, 'telegram_user'))
+
+    def test_revocation_reaches_other_workers(self):
+        other_worker = TokenCache(maxsize=10, ttl=60)
+        self.api.get('/api/auth/profile/')
+        other_worker.set(self.token.key, self.user, self.token, other_worker.generation(self.user.pk))
+        self.assertIsNotNone(other_worker.get(self.token.key))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.api.post('/api/auth/logout/').status_code, 204)
+        self.assertIsNone(other_worker.get(self.token.key))
+        self.assertEqual(len(other_worker), 0)
+
+    def test_lru_and_ttl(self):
+        token_cache.maxsize, token_cache.ttl = 1, 60
+        self.addCleanup(setattr, token_cache, 'maxsize', token_cache.maxsize)
+        self.addCleanup(setattr, token_cache, 'ttl', token_cache.ttl)
+        other = User.objects.create_user('other')
+        token_cache.set('a', self.user, self.token, token_cache.generation(self.user.pk))
+        token_cache.set('b', other, self.token, token_cache.generation(other.pk))
+        self.assertIsNone(token_cache.get('a'))
+        self.assertIsNotNone(token_cache.get('b'))
+        token_cache.ttl = -1
+        token_cache.set('c', other, self.token, token_cache.generation(other.pk))
+        self.assertIsNone(token_cache.get('c'))
+
+
+class AsyncProfileTests(TransactionTestCase):
+    async def test_profile(self):
+        def create():
+            token_cache.clear()
+            user = User.objects.create_user('async-profile')
+            TelegramUser.objects.create(user=user, telegram_id=99, first_name='Q', auth_date=1)
+            return Token.objects.create(user=user)
+        token = await sync_to_async(create)()
+        response = await AsyncClient().get('/api/auth/async/profile/', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Q')
+        self.assertEqual((await AsyncClient().get('/api/auth/async/profile/')).status_code, 401)
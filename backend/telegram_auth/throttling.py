@@ -0,0 +1,19 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from core.throttling import IPTokenBucketThrottle
+
+
+class TelegramAuthThrottle(IPTokenBucketThrottle):
+    """
+    Logins per client IP; each one verifies a signature and may write a user.
+
+    Only POST is a login. DRF checks throttles before it rejects an unsupported
+    method, so without this the frontend's HEAD probe of the endpoint would use
+    up the login budget.
+    """
+    scope = 'telegram_auth'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return super().get_cache_key(request, view)
@@ -1,8 +1,12 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('telegram/', views.telegram_auth, name='telegram-auth'),
     path('profile/', views.get_user_profile, name='user-profile-get'),
     path('profile/update/', views.update_user_profile, name='user-profile-update'),
+    path('logout/', views.logout, name='logout'),
+
+    # ASGI-native async versions
+    path('async/profile/', async_views.get_user_profile, name='async-user-profile-get'),
 ] 
\ No newline at end of file
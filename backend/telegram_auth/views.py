@@ -8,23 +8,30 @@ API Endpoints:
 - `POST /api/auth/telegram/` → Authenticates a user via Telegram data and returns user details with token.
 - `GET /api/auth/profile/` → Retrieves the authenticated user's profile information.
 - `PUT /api/auth/profile/` → Updates the authenticated user's profile information.
+- `POST /api/auth/logout/` → Revokes the authentication token used for the request.
 """
 from django.shortcuts import render
-import hmac
-import hashlib
-import time
+import json
+import logging
+from urllib.parse import parse_qsl
 from django.conf import settings
-from django.contrib.auth.models import User
-from django.db import transaction
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
+from core.replicas import pin_primary, replica_reads
+from core.throttling import IPTokenBucketThrottle
+
 from .models import TelegramUser
-from .serializers import TelegramUserSerializer
+from .serializers import TelegramUserReadSerializer, TelegramUserSerializer
+from .services import login_telegram_user
+from .throttling import TelegramAuthThrottle
+from .verification import get_verifier
+
+logger = logging.getLogger(__name__)
 
 def validate_telegram_data(data):
     """
@@ -38,47 +45,58 @@ def validate_telegram_data(data):
     """
     # Check if we're in development mode with a mock hash
     if data.get('hash') == 'mock_hash':
-        print("Detected mock hash, skipping validation for development/demo mode")
+        logger.debug("Detected mock hash, skipping validation for development/demo mode")
         return True, "Mock data is valid"
     
     if not settings.TELEGRAM_BOT_TOKEN:
-        print("No bot token set, skipping validation")
+        logger.debug("No bot token set, skipping validation")
         return True, "No bot token set, skipping validation"
     
-    # Check if auth_date is fresh (not older than 24 hours)
-    if int(time.time()) - int(data.get('auth_date', 0)) > 86400:
-        return False, "Authentication data is outdated"
+    return get_verifier().verify(data)
+
 
-    # Create data check string
-    sorted_data = sorted([(k, v) for k, v in data.items() if k != 'hash'])
-    data_check_string = '\n'.join([f"{k}={v}" for k, v in sorted_data])
+def parse_init_data(init_data):
+    """
+    Verify a raw Mini App initData string and flatten it into login fields.
     
-    # Create secret key from bot token
-    secret_key = hashlib.sha256(settings.TELEGRAM_BOT_TOKEN.encode()).digest()
+    Args:
+        init_data (str): The `Telegram.WebApp.initData` query string
+        
+    Returns:
+        tuple: (data, message) where data is a dict of user fields, or None if verification failed
+    """
+    if not isinstance(init_data, str) or not init_data:
+        return None, "Telegram initData must be a non-empty string"
     
-    # Compute hash
-    computed_hash = hmac.new(
-        secret_key,
-        data_check_string.encode(),
-        hashlib.sha256
-    ).hexdigest()
+    if settings.TELEGRAM_BOT_TOKEN:
+        is_valid, message, fields = get_verifier().verify_init_data(init_data)
+        if not is_valid:
+            return None, message
+    else:
+        fields = dict(parse_qsl(init_data, keep_blank_values=True))
     
-    # Compare hash
-    if computed_hash != data.get('hash'):
-        return False, "Data hash is invalid"
+    try:
+        data = json.loads(fields.get('user') or '{}')
+    except json.JSONDecodeError:
+        return None, "Telegram initData user field is not valid JSON"
+    if not isinstance(data, dict):
+        return None, "Telegram initData user field must be an object"
     
-    return True, "Data is valid"
+    data['auth_date'] = fields.get('auth_date')
+    return data, "Data is valid"
 
 
 # Telegram Authentication API
 @api_view(["POST"])
 @permission_classes([AllowAny])
-@transaction.atomic
+@throttle_classes([TelegramAuthThrottle, IPTokenBucketThrottle])
 def telegram_auth(request):
     """
     Authenticate a user via Telegram data and return user details with token.
     
-    Request Body:
+    Request Body (either):
+        - init_data (str): Raw `Telegram.WebApp.initData` query string, verified with the WebApp scheme
+    or the Login Widget fields:
         - id (str): Telegram user ID
         - hash (str): Telegram authentication hash
         - auth_date (str): Authentication date as a timestamp
@@ -90,28 +108,25 @@ def telegram_auth(request):
     Returns:
         - 200 OK: User authenticated successfully, returns user details and token
         - 400 Bad Request: Invalid request data or authentication failed
+        - 429 Too Many Requests: Too many logins from this IP; retry after `Retry-After` seconds
     """
-    # Debug the request
-    print("Request Content-Type:", request.META.get('CONTENT_TYPE'))
-    print("Request Body Type:", type(request.body))
-    
-    if len(request.body) > 200:
-        print("Request Body (truncated):", request.body[:200], "...")
-    else:
-        print("Request Body:", request.body)
+    # Debug the request (payloads are only dumped when LOG_REQUEST_PAYLOADS is enabled)
+    logger.debug("Request Content-Type: %s", request.META.get('CONTENT_TYPE'))
+    if settings.LOG_REQUEST_PAYLOADS and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Request Body (first 200 bytes): %r", request.body[:200])
     
     # Get data from request
     telegram_data = request.data
-    print("Parsed Data Type:", type(telegram_data))
     
-    if isinstance(telegram_data, dict) and len(telegram_data) > 0:
-        print("Parsed Data Keys:", telegram_data.keys())
-    else:
-        print("Parsed Data:", telegram_data)
+    if settings.LOG_REQUEST_PAYLOADS and logger.isEnabledFor(logging.DEBUG):
+        if isinstance(telegram_data, dict) and len(telegram_data) > 0:
+            logger.debug("Parsed Data Keys: %s", list(telegram_data.keys()))
+        else:
+            logger.debug("Parsed Data: %r", telegram_data)
     
     # Check if the data is empty
     if not telegram_data:
-        print("Empty request data received")
+        logger.info("Empty request data received")
         return Response(
             {"error": "Empty request data. Make sure the request contains valid JSON."}, 
             status=status.HTTP_400_BAD_REQUEST
@@ -120,108 +135,69 @@ def telegram_auth(request):
     # If data is not a dict, try to convert from string
     if not isinstance(telegram_data, dict):
         try:
-            print("Attempting to parse non-dict data")
-            import json
+            logger.debug("Attempting to parse non-dict data")
             if isinstance(telegram_data, str):
                 telegram_data = json.loads(telegram_data)
-                print("Successfully converted string to JSON")
+                logger.debug("Successfully converted string to JSON")
             else:
-                print(f"Unexpected data type: {type(telegram_data)}")
+                logger.info("Unexpected data type: %s", type(telegram_data))
                 return Response(
                     {"error": f"Unexpected data type: {type(telegram_data)}. Expected JSON object."}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
         except json.JSONDecodeError as e:
-            print(f"JSON decode error: {str(e)}")
+            logger.info("JSON decode error: %s", e)
             return Response(
                 {"error": f"Invalid JSON format: {str(e)}"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            print(f"Error processing request data: {str(e)}")
+            logger.warning("Error processing request data: %s", e)
             return Response(
                 {"error": f"Error processing request data: {str(e)}"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    # Mini App clients may send the signed initData string as-is
+    if 'init_data' in telegram_data:
+        telegram_data, message = parse_init_data(telegram_data['init_data'])
+        if telegram_data is None:
+            logger.info("Telegram initData validation failed: %s", message)
+            return Response(
+                {"error": message}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
     # Validate data
-    if 'hash' not in telegram_data:
-        print("Hash missing from request data")
+    elif 'hash' not in telegram_data:
+        logger.info("Hash missing from request data")
         return Response(
             {"error": "Telegram authentication hash is missing"}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
     # Skip validation in development if no bot token is set
-    if settings.TELEGRAM_BOT_TOKEN:
+    elif settings.TELEGRAM_BOT_TOKEN:
         is_valid, message = validate_telegram_data(telegram_data)
         if not is_valid:
-            print(f"Telegram data validation failed: {message}")
+            logger.info("Telegram data validation failed: %s", message)
             return Response(
                 {"error": message}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
     else:
-        print("TELEGRAM_BOT_TOKEN not set, skipping validation")
+        logger.debug("TELEGRAM_BOT_TOKEN not set, skipping validation")
     
     telegram_id = telegram_data.get('id')
     if not telegram_id:
-        print("Telegram ID missing from request data")
+        logger.info("Telegram ID missing from request data")
         return Response(
             {"error": "Telegram ID is missing"}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Get or create user
-    try:
-        telegram_user = TelegramUser.objects.get(telegram_id=telegram_id)
-        user = telegram_user.user
-        print(f"Existing user found: {user.username}")
-        
-        # Update user data
-        telegram_user.username = telegram_data.get('username')
-        telegram_user.first_name = telegram_data.get('first_name', '')
-        telegram_user.last_name = telegram_data.get('last_name', '')
-        telegram_user.photo_url = telegram_data.get('photo_url')
-        telegram_user.auth_date = telegram_data.get('auth_date')
-        telegram_user.save()
-        print("User data updated")
-        
-    except TelegramUser.DoesNotExist:
-        # Create a new user
-        username = telegram_data.get('username') or f"tg_{telegram_id}"
-        print(f"Creating new user with username: {username}")
-        
-        # Make sure username is unique
-        if User.objects.filter(username=username).exists():
-            username = f"{username}_{telegram_id}"
-            print(f"Username already exists, using {username} instead")
-        
-        user = User.objects.create_user(
-            username=username,
-            email='',
-            password=None  # We don't need a password for Telegram auth
-        )
-        print(f"User created: {user.id}")
-        
-        # Create TelegramUser
-        telegram_user = TelegramUser.objects.create(
-            user=user,
-            telegram_id=telegram_id,
-            username=telegram_data.get('username'),
-            first_name=telegram_data.get('first_name', ''),
-            last_name=telegram_data.get('last_name', ''),
-            photo_url=telegram_data.get('photo_url'),
-            auth_date=telegram_data.get('auth_date')
-        )
-        print(f"TelegramUser created: {telegram_user.id}")
-    
-    # Create or get token
-    token, created = Token.objects.get_or_create(user=user)
-    if created:
-        print("New token created")
-    else:
-        print("Using existing token")
+    # Get or create user, profile and token
+    telegram_user, token, created = login_telegram_user(telegram_id, telegram_data)
     
     # Return user data and token
     serializer = TelegramUserSerializer(telegram_user)
@@ -229,25 +205,27 @@ def telegram_auth(request):
         'token': token.key,
         'user': serializer.data
     }
-    print("Authentication successful, returning token and user data")
+    logger.debug("Authentication successful, returning token and user data")
     return Response(response_data)
 
 
 # User Profile API
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def get_user_profile(request):
     """
     Get authenticated user's profile data.
     
+    Read from a replica when DATABASE_REPLICA_URLS is set (see core.replicas).
+    
     Returns:
         - 200 OK: Returns user profile data
         - 404 Not Found: User profile not found
     """
     try:
         telegram_user = request.user.telegram_user
-        serializer = TelegramUserSerializer(telegram_user)
-        return Response(serializer.data)
+        return Response(TelegramUserReadSerializer.from_instance(telegram_user))
     except TelegramUser.DoesNotExist:
         return Response(
             {"error": "User profile not found"}, 
@@ -282,6 +260,7 @@ def update_user_profile(request):
         
         if serializer.is_valid():
             serializer.save()
+            pin_primary(request.user.id)
             return Response(serializer.data)
         
         return Response(
@@ -294,3 +273,18 @@ def update_user_profile(request):
             {"error": "User profile not found"}, 
             status=status.HTTP_404_NOT_FOUND
         )
+
+
+# Logout API
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    """
+    Revoke the token used to authenticate this request.
+    
+    Returns:
+        - 204 No Content: Token deleted; the client must authenticate again
+    """
+    if isinstance(request.auth, Token):
+        request.auth.delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark of serve.py against the previous single-threaded server.
+
+Each server runs in its own process on a free port. For each concurrency level,
+client threads fetch index.html, app.js and styles.css in a loop over keep-alive
+connections (sending ``Accept-Encoding: gzip, br`` like a browser) for
+``--duration`` seconds. The ``+slow`` rows add one client that connects and
+never finishes its request, which is enough to stall a single-threaded server.
+
+Usage:
+    python bench_serve.py [--duration 3] [--concurrency 1 16 64]
+"""
+
+import argparse
+import http.client
+import http.server
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import serve
+
+FRONTEND = os.path.dirname(os.path.abspath(__file__))
+FILES = ('index.html', 'app.js', 'styles.css')
+
+
+class LegacyHandler(http.server.SimpleHTTPRequestHandler):
+    """The handler of the previous serve.py, without request logging."""
+
+    def end_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LegacyServer(socketserver.TCPServer):
+    def handle_error(self, request, client_address):
+        pass  # Clients cut off at the end of a run
+
+
+def _run_legacy(ready):
+    os.chdir(FRONTEND)
+    httpd = LegacyServer(('127.0.0.1', 0), LegacyHandler)
+    ready.put(httpd.server_address[1])
+    httpd.serve_forever()
+
+
+def _run_new(ready):
+    httpd = serve.make_server(0, '127.0.0.1', quiet=True)
+    ready.put(httpd.server_address[1])
+    httpd.serve_forever()
+
+
+SERVERS = (
+    ('previous', _run_legacy, '/public/'),
+    ('serve.py', _run_new, '/'),
+)
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def _client(port, prefix, deadline, latencies, counters, lock):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=max(0.1, deadline - time.monotonic()))
+    local_latencies, done, errors, received = [], 0, 0, 0
+    i = 0
+    while time.monotonic() < deadline:
+        path = prefix + FILES[i % len(FILES)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path, headers={'Accept-Encoding': 'gzip, br'})
+            response = connection.getresponse()
+            received += len(response.read())
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        local_latencies.append(time.perf_counter() - start)
+        done += 1
+    connection.close()
+    with lock:
+        latencies.extend(local_latencies)
+        counters['done'] += done
+        counters['errors'] += errors
+        counters['bytes'] += received
+
+
+def run_load(port, prefix, concurrency, duration, slow_client):
+    slow = None
+    if slow_client:
+        slow = socket.create_connection(('127.0.0.1', port))
+        slow.sendall(b'GET ' + prefix.encode() + b' HTTP/1.1\r\nHost: localhost\r\n')  # Never finishes
+        time.sleep(0.1)
+    latencies, counters, lock = [], {'done': 0, 'errors': 0, 'bytes': 0}, threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_client, args=(port, prefix, deadline, latencies, counters, lock))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if slow is not None:
+        slow.close()
+    return latencies, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=3.0, help="Seconds per run")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'server':<10} {'clients':>9} {'req/s':>9} {'p50':>9} {'p95':>9} {'KiB/req':>8} {'errors':>7}")
+    for name, target, prefix in SERVERS:
+        ready = context.Queue()
+        process = context.Process(target=target, args=(ready,), daemon=True)
+        process.start()
+        port = ready.get()
+        try:
+            for concurrency in args.concurrency:
+                for slow_client in (False, True):
+                    latencies, counters = run_load(port, prefix, concurrency, args.duration, slow_client)
+                    per_request = counters['bytes'] / counters['done'] / 1024 if counters['done'] else 0
+                    label = f"{concurrency}{'+slow' if slow_client else ''}"
+                    print(
+                        f"{name:<10} {label:>9} {counters['done'] / args.duration:>9.0f} "
+                        f"{_percentile(latencies, 50) * 1000:>7.2f}ms {_percentile(latencies, 95) * 1000:>7.2f}ms "
+                        f"{per_request:>8.1f} {counters['errors']:>7}"
+                    )
+        finally:
+            process.kill()
+
+
+if __name__ == '__main__':
+    main()
@@ -70,6 +70,9 @@ let token = localStorage.getItem('token');
 let userData = JSON.parse(localStorage.getItem('userData') || '{}');
 let currentSection = 'game-section';
 let apiUrlTested = false;
+let gameEvents = null; // EventSource pushing game results and stats deltas
+let currentStats = null; // Last stats shown, so pushed deltas can be applied
+let lastGameId = null; // Newest round counted in currentStats, so covered deltas are dropped
 
 // Additional DOM elements
 const botQrCode = document.getElementById('bot-qr-code');
@@ -195,7 +198,7 @@ function initializeApp() {
         showAuthenticatedUI();
         updateAllUserInfo();
         showSection(currentSection);
-        fetchGameStats();
+        connectGameEvents();
     }
 }
 
@@ -675,9 +678,7 @@ async function authenticateWithTelegram(initData) {
         
         // Load game stats after authentication
         console.log('Loading game stats after authentication...');
-        setTimeout(() => {
-            fetchGameStats();
-        }, 500); // Small delay to ensure UI is ready
+        setTimeout(connectGameEvents, 500); // Small delay to ensure UI is ready
     } catch (error) {
         console.error('Authentication error:', error);
         
@@ -740,8 +741,8 @@ function updateAllUserInfo() {
 /**
  * Fetches game statistics from the backend API
  * This function retrieves the user's game statistics (wins, losses, draws, etc.)
- * and updates the UI accordingly. It includes error handling and retry logic
- * if the DOM elements aren't ready yet.
+ * and updates the UI accordingly. It is only used while the game event stream
+ * is not connected; the stream delivers the statistics otherwise.
  */
 async function fetchGameStats() {
     try {
@@ -760,9 +761,7 @@ async function fetchGameStats() {
             winRateElement;
             
         if (!statsElementsReady) {
-            console.error('Stats DOM elements not ready yet, retrying in 1s');
-            // Retry after a short delay
-            setTimeout(fetchGameStats, 1000);
+            console.error('Stats DOM elements not ready yet');
             return;
         }
         
@@ -844,6 +843,8 @@ function updateStatsDisplay(stats) {
         return;
     }
     
+    currentStats = { total_games: totalGames, wins, losses, draws };
+    
     // Update DOM elements
     totalGamesElement.textContent = totalGames;
     winsElement.textContent = wins;
@@ -854,6 +855,102 @@ function updateStatsDisplay(stats) {
     console.log('Stats display updated:', { totalGames, wins, losses, draws, winRate });
 }
 
+/**
+ * Opens the Server-Sent Events stream of game results and stats deltas.
+ * The stream is opened with a short-lived ticket rather than the API token,
+ * so the token never appears in a URL. The server sends a full `stats` snapshot
+ * when the stream opens, then a `game` event with a `stats_delta` after every
+ * round, including rounds played on other devices. If the stream drops, it is
+ * reopened with a fresh ticket and a fresh snapshot; if it is unavailable
+ * (e.g. the backend runs under WSGI), the app fetches stats instead.
+ */
+async function connectGameEvents() {
+    if (gameEvents || !token) {
+        return;
+    }
+    if (!window.EventSource) {
+        fetchGameStats();
+        return;
+    }
+    
+    let ticket;
+    try {
+        const response = await fetch(`${API_URL}/game/events/ticket/`, {
+            method: 'POST',
+            headers: { 'Authorization': `Token ${token}` }
+        });
+        if (!response.ok) {
+            console.warn(`Game event stream unavailable. Status: ${response.status}`);
+            fetchGameStats();
+            return;
+        }
+        ({ ticket } = await response.json());
+    } catch (error) {
+        console.warn('Failed to get a game event stream ticket:', error);
+        fetchGameStats();
+        return;
+    }
+    if (gameEvents || !token) {
+        return;
+    }
+    
+    gameEvents = new EventSource(`${API_URL}/game/events/?ticket=${encodeURIComponent(ticket)}`);
+    
+    gameEvents.addEventListener('stats', (event) => {
+        const stats = JSON.parse(event.data);
+        lastGameId = stats.last_game_id;
+        updateStatsDisplay(stats);
+    });
+    
+    gameEvents.addEventListener('game', (event) => {
+        const { games, stats_delta: delta } = JSON.parse(event.data);
+        // Rounds queued by write-behind have no id yet and are always applied
+        const ids = games.map((game) => game.id).filter((id) => id !== null);
+        if (ids.length > 0 && lastGameId !== null && ids.every((id) => id <= lastGameId)) {
+            return; // Already counted in the snapshot
+        }
+        applyStatsDelta(delta);
+        if (ids.length > 0) {
+            lastGameId = Math.max(lastGameId || 0, ...ids);
+        }
+    });
+    
+    gameEvents.onerror = () => {
+        // The ticket has expired by the time EventSource reconnects: open a new stream instead
+        console.warn('Game event stream closed, reconnecting');
+        disconnectGameEvents();
+        setTimeout(connectGameEvents, 5000);
+    };
+}
+
+/**
+ * Closes the game event stream, if open
+ */
+function disconnectGameEvents() {
+    if (gameEvents) {
+        gameEvents.close();
+        gameEvents = null;
+    }
+}
+
+/**
+ * Adds a pushed stats delta to the displayed statistics
+ * @param {Object} delta - Increments for total_games, wins, losses and draws
+ */
+function applyStatsDelta(delta) {
+    const stats = currentStats || { total_games: 0, wins: 0, losses: 0, draws: 0 };
+    const updated = {
+        total_games: stats.total_games + delta.total_games,
+        wins: stats.wins + delta.wins,
+        losses: stats.losses + delta.losses,
+        draws: stats.draws + delta.draws
+    };
+    updated.win_percentage = updated.total_games > 0
+        ? Math.round((updated.wins / updated.total_games) * 10000) / 100
+        : 0;
+    updateStatsDisplay(updated);
+}
+
 /**
  * Handles the user's choice (rock, paper, or scissors)
  * Sends the choice to the backend, processes the result, and updates the UI
@@ -909,10 +1006,10 @@ async function handleChoice(choice) {
             // Update the UI to show the result
             displayResult(gameResult);
             
-            // Fetch updated game stats
-            setTimeout(() => {
+            // The event stream pushes the stats delta; fetch only without one
+            if (!gameEvents) {
                 fetchGameStats();
-            }, 500);
+            }
             
         } catch (parseError) {
             console.error('Error parsing game result JSON:', parseError);
@@ -1042,6 +1139,9 @@ function handleLogout() {
         localStorage.removeItem('token');
         localStorage.removeItem('userData');
         
+        // Stop the event stream
+        disconnectGameEvents();
+        
         // Reset state
         token = null;
         userData = {};
@@ -1,16 +1,205 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server for serving the frontend files.
+HTTP server for the frontend files in ``public/``.
+
+Each connection is handled by its own thread, so a slow client never holds up
+the others, and connections are kept alive (HTTP/1.1). Files are read into
+memory once, together with gzip (and brotli, when the ``brotli`` package is
+installed) variants, and reloaded when their modification time changes.
+Precompressed ``app.js.gz`` / ``app.js.br`` files next to the originals are used
+instead of compressing at startup when they are up to date.
+
+Responses carry a strong ETag per variant, ``Last-Modified`` and
+``Cache-Control``; ``If-None-Match`` is answered with 304 and single byte ranges
+(``Range``, ``If-Range``) with 206.
+
+Usage:
+    python serve.py [--port 8080] [--bind ADDRESS] [--quiet]
 """
 
+import argparse
+import email.utils
+import gzip
+import hashlib
 import http.server
-import socketserver
+import mimetypes
 import os
 import sys
+import threading
+import time
+import urllib.parse
+
+try:
+    import brotli
+except ImportError:  # Optional: serve gzip only
+    brotli = None
 
 PORT = 8080
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public')
+INDEX = 'index.html'
+
+# HTML is always revalidated (cheap with ETags), so a deploy shows up on the next load.
+# Other files are not fingerprinted, so they are only cached for a short time.
+CACHE_CONTROL = {'text/html': 'no-cache'}
+DEFAULT_CACHE_CONTROL = 'public, max-age=300'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 256  # Bytes; smaller files are not worth a compressed variant
+RECHECK_INTERVAL = 1.0  # Seconds between modification-time checks of a cached file
+KEEP_ALIVE_TIMEOUT = 30  # Seconds an idle connection is kept open
+
+COMPRESSORS = {
+    'br': (lambda body: brotli.compress(body, quality=11)) if brotli is not None else None,
+    'gzip': lambda body: gzip.compress(body, compresslevel=9, mtime=0),
+}
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+class StaticFile:
+    """A file held in memory with its compressed variants, keyed by content encoding."""
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.mtime = stat.st_mtime_ns
+        self.checked_at = time.monotonic()
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.cache_control = CACHE_CONTROL.get(content_type, DEFAULT_CACHE_CONTROL)
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+        if compressible and not content_type.startswith('image/'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+
+        # Strong ETags must differ between representations, so each encoding gets its own
+        digest = hashlib.sha256(body).hexdigest()[:24]
+        self.variants = {None: (body, f'"{digest}"')}
+        if compressible and len(body) >= MIN_COMPRESS_SIZE:
+            for encoding, compress in COMPRESSORS.items():
+                compressed = self._precompressed(encoding)
+                if compressed is None and compress is not None:
+                    compressed = compress(body)
+                if compressed is not None and len(compressed) < len(body):
+                    self.variants[encoding] = (compressed, f'"{digest}-{encoding}"')
+
+    def _precompressed(self, encoding):
+        path = self.path + EXTENSIONS[encoding]
+        try:
+            if os.stat(path).st_mtime_ns < self.mtime:
+                return None  # Older than the original
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def is_stale(self):
+        now = time.monotonic()
+        if now - self.checked_at < RECHECK_INTERVAL:
+            return False
+        self.checked_at = now
+        try:
+            return os.stat(self.path).st_mtime_ns != self.mtime
+        except FileNotFoundError:
+            return True
+
+    def negotiate(self, accept_encoding):
+        """Pick the smallest variant the client accepts."""
+        if len(self.variants) == 1 or not accept_encoding:
+            return None
+        accepted = set()
+        for part in accept_encoding.split(','):
+            coding, _, params = part.partition(';')
+            params = params.strip().replace(' ', '')
+            if params.startswith('q=') and params[2:] in ('0', '0.0', '0.00', '0.000'):
+                continue
+            accepted.add(coding.strip().lower())
+        for encoding in COMPRESSORS:
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return None
+
+
+class FileCache:
+    """Maps URL paths to ``StaticFile``s under ``root``, loading them on first use."""
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def get(self, url_path):
+        entry = self._files.get(url_path)
+        if entry is not None and not entry.is_stale():
+            return entry
+        path = self._resolve(url_path)
+        with self._lock:
+            if path is None:
+                self._files.pop(url_path, None)
+                return None
+            entry = self._files.get(url_path)
+            if entry is None or entry.path != path or entry.is_stale():
+                entry = self._files[url_path] = StaticFile(path)
+            return entry
+
+    def _resolve(self, url_path):
+        relative = urllib.parse.unquote(url_path).lstrip('/')
+        path = os.path.realpath(os.path.join(self.root, relative))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None  # Outside the document root
+        if os.path.isdir(path):
+            path = os.path.join(path, INDEX)
+        return path if os.path.isfile(path) else None
+
+    def preload(self):
+        """Load every file up front, so the first requests do not pay for compression."""
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(tuple(EXTENSIONS.values())):
+                    continue
+                relative = os.path.relpath(os.path.join(directory, filename), self.root)
+                self.get('/' + relative.replace(os.sep, '/'))
+        self.get('/')
+        return len(self._files)
+
+
+def _parse_range(header, size):
+    """
+    Parse a single ``bytes=`` range.
+
+    Returns ``(start, end)`` (inclusive), ``None`` when the header should be
+    ignored (malformed or several ranges) and ``()`` when it cannot be satisfied.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:  # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return ()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return ()
+    return start, end
+
+
+class StaticHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FrontendServer/1.0'
+    timeout = KEEP_ALIVE_TIMEOUT
+    disable_nagle_algorithm = True  # Headers and body are separate writes; do not hold the body back
+    files = None
+    quiet = False
 
-class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
@@ -18,20 +207,110 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         super().end_headers()
 
     def do_OPTIONS(self):
-        self.send_response(200)
+        self.send_response(204)
+        self.end_headers()
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def _serve(self, head):
+        entry = self.files.get(urllib.parse.urlsplit(self.path).path)
+        if entry is None:
+            self.send_error(404, "File not found")
+            return
+
+        encoding = entry.negotiate(self.headers.get('Accept-Encoding', ''))
+        body, etag = entry.variants[encoding]
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            if '*' in tags or etag in tags:
+                self.send_response(304)
+                self._send_entity_headers(entry, etag, encoding)
+                self.end_headers()
+                return
+
+        status = 200
+        content_range = None
+        range_header = self.headers.get('Range')
+        if range_header is not None and self.headers.get('If-Range', entry.variants[None][1]) == entry.variants[None][1]:
+            # Ranges are served from the uncompressed file
+            body, etag = entry.variants[None]
+            encoding = None
+            byte_range = _parse_range(range_header, len(body))
+            if byte_range == ():
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+                content_range = f'bytes {start}-{end}/{len(body)}'
+                body = memoryview(body)[start:end + 1]
+
+        self.send_response(status)
+        self.send_header('Content-Type', entry.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if content_range:
+            self.send_header('Content-Range', content_range)
+        self._send_entity_headers(entry, etag, encoding)
         self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _send_entity_headers(self, entry, etag, encoding):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', entry.last_modified)
+        self.send_header('Cache-Control', entry.cache_control)
+        self.send_header('Accept-Ranges', 'bytes')
+        if len(entry.variants) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class StaticServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return  # The client went away mid-response
+        super().handle_error(request, client_address)
+
+
+def make_server(port=PORT, bind='', root=ROOT, quiet=False):
+    """Create a server for ``root`` with every file already loaded."""
+    files = FileCache(root)
+    files.preload()
+    handler = type('Handler', (StaticHandler,), {'files': files, 'quiet': quiet})
+    return StaticServer((bind, port), handler)
+
 
 def run_server():
-    # Change to the directory containing the script
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
-    # Create the server
-    handler = MyHTTPRequestHandler
-    httpd = socketserver.TCPServer(("", PORT), handler)
-    
-    print(f"Serving at http://localhost:{PORT}")
+    parser = argparse.ArgumentParser(description="Serve the frontend files")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--bind', default='', help="Address to listen on (default: all interfaces)")
+    parser.add_argument('--quiet', action='store_true', help="Do not log requests")
+    args = parser.parse_args()
+
+    httpd = make_server(args.port, args.bind, quiet=args.quiet)
+
+    print(f"Serving {ROOT} at http://localhost:{args.port}")
+    if brotli is None:
+        print("brotli is not installed: serving gzip variants only")
     print("Press Ctrl+C to stop the server")
-    
+
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
@@ -40,4 +319,4 @@ def run_server():
         sys.exit(0)
 
 if __name__ == "__main__":
-    run_server() 
\ No newline at end of file
+    run_server()